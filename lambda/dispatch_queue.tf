@@ -0,0 +1,87 @@
+###
+# Optional SQS dispatch queue between the receiver and worker
+# Enabled with dispatch_backend = "sqs". The FIFO queue keeps events in a Slack thread in order,
+# and the event source mapping caps how many workers consume it at once
+###
+
+resource "aws_sqs_queue" "dispatch" {
+  count = var.dispatch_backend == "sqs" ? 1 : 0
+
+  name                       = "${local.lambda_function_name}Dispatch.fifo"
+  fifo_queue                 = true
+  deduplication_scope        = "messageGroup"
+  fifo_throughput_limit      = "perMessageGroupId"
+  visibility_timeout_seconds = 960 # Must be at least the worker timeout
+  message_retention_seconds  = 3600
+
+  # Events that keep failing, e.g. a Slack signature that doesn't verify, are moved aside instead of retried until they expire
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.dispatch_dead_letter[0].arn
+    maxReceiveCount     = 3
+  })
+}
+
+resource "aws_sqs_queue" "dispatch_dead_letter" {
+  count = var.dispatch_backend == "sqs" ? 1 : 0
+
+  name                      = "${local.lambda_function_name}DispatchDeadLetter.fifo"
+  fifo_queue                = true
+  message_retention_seconds = 1209600
+}
+
+resource "aws_lambda_event_source_mapping" "worker_dispatch" {
+  count = var.dispatch_backend == "sqs" ? 1 : 0
+
+  event_source_arn        = aws_sqs_queue.dispatch[0].arn
+  function_name           = aws_lambda_function.worker.arn
+  batch_size              = 1
+  function_response_types = ["ReportBatchItemFailures"]
+
+  scaling_config {
+    maximum_concurrency = var.worker_consumer_concurrency
+  }
+}
+
+resource "aws_iam_role_policy" "receiver_dispatch_queue" {
+  count = var.dispatch_backend == "sqs" ? 1 : 0
+
+  name = "DispatchQueue"
+  role = aws_iam_role.receiver_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = [aws_sqs_queue.dispatch[0].arn]
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy" "worker_dispatch_queue" {
+  count = var.dispatch_backend == "sqs" ? 1 : 0
+
+  name = "DispatchQueue"
+  role = aws_iam_role.worker_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:ChangeMessageVisibility",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = [aws_sqs_queue.dispatch[0].arn]
+      }
+    ]
+  })
+}
@@ -89,6 +89,8 @@ resource "aws_lambda_function" "receiver" {
     variables = {
       PROCESSOR_FUNCTION_NAME = aws_lambda_function.worker.function_name
       BOT_NAME                = var.bot_name
+      DISPATCH_BACKEND        = var.dispatch_backend
+      DISPATCH_QUEUE_URL      = var.dispatch_backend == "sqs" ? aws_sqs_queue.dispatch[0].url : ""
     }
   }
 }
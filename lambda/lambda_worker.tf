@@ -110,6 +110,9 @@ resource "aws_iam_role_policy" "Worker_Bedrock" {
           "Action" : [
             "bedrock:Retrieve",
             "bedrock:RetrieveAndGenerate",
+            # Read the latest ingestion jobs, so a knowledge base sync expires cached answers
+            "bedrock:ListDataSources",
+            "bedrock:ListIngestionJobs",
           ],
           "Resource" : "arn:aws:bedrock:us-west-2:${data.aws_caller_identity.current.account_id}:knowledge-base/*"
         },
@@ -204,6 +207,9 @@ resource "aws_lambda_function" "worker" {
       MODEL_ID          = var.model_id
       BOT_NAME          = var.bot_name
 
+      # Bedrock throttling failover
+      BEDROCK_FAILOVER_TARGETS = var.bedrock_failover_targets
+
       # MCP
       ENABLE_PAGERDUTY_MCP = var.enable_pagerduty_mcp
       PAGERDUTY_API_URL    = var.pagerduty_api_url
@@ -0,0 +1,176 @@
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Reference entities served from the cache, and how long each is kept in seconds
+REFERENCE_TTL_SECONDS = {
+    "services": 600,
+    "teams": 600,
+    "schedules": 300,
+    "escalation_policies": 600,
+    "users": 600,
+}
+
+# Single reference entities, e.g. /services/PABC123
+REFERENCE_PATH = re.compile(r"^/(?P<entity>[a-z_]+)/(?P<entity_id>[^/]+)$")
+
+# The disk layer is shared by every server process on the host. Set PAGERDUTY_REFERENCE_CACHE_PATH to an
+# empty string to keep the cache in memory only
+DEFAULT_CACHE_PATH = "/tmp/pagerduty-mcp-reference-cache.sqlite3"
+CACHE_PATH = os.getenv("PAGERDUTY_REFERENCE_CACHE_PATH", DEFAULT_CACHE_PATH)
+
+# Most entries kept in memory, the oldest are dropped first
+MAX_MEMORY_ENTRIES = 1000
+
+
+def reference_entity(path: str) -> tuple[str, str] | None:
+    """Get the (entity, ID) a path refers to, or None if it isn't a cached reference entity."""
+    match = REFERENCE_PATH.match(path)
+    if match is None or match["entity"] not in REFERENCE_TTL_SECONDS or match["entity_id"] == "me":
+        return None
+    return match["entity"], match["entity_id"]
+
+
+def referenced_entities(path: str) -> list[tuple[str, str]]:
+    """Get every (entity, ID) a path refers to, e.g. both the team and user in /teams/P1/users/P2."""
+    nodes = path.strip("/").split("/")
+    return [
+        (entity, entity_id)
+        for entity, entity_id in itertools.pairwise(nodes)
+        if entity in REFERENCE_TTL_SECONDS and entity_id != "me"
+    ]
+
+
+def credential_hash(api_host: str, api_key: str) -> str:
+    """Identify a credential without storing the key itself."""
+    return hashlib.sha256(f"{api_host}\n{api_key}".encode()).hexdigest()
+
+
+class ReferenceCache:
+    """Cache of GET responses for reference entities.
+
+    Responses are kept in memory and in a SQLite file, so a new server process starts with the responses
+    fetched by earlier ones. Entries are scoped to a credential, expire after their entity's TTL, and are
+    invalidated when a write to the entity succeeds.
+    """
+
+    def __init__(self, path: str | None = CACHE_PATH):
+        self.path = path or None
+        # Guards the memory layer and stats. The disk layer has its own lock, so memory hits never wait on disk I/O.
+        # The disk lock may be taken before the memory lock, never the other way around
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        # (credential, path, params) -> (expires at, body)
+        self._memory: dict[tuple[str, str, str], tuple[float, str]] = {}
+        # Bumped by every invalidation, so a disk read that raced one isn't kept in memory
+        self._generation = 0
+        self._connection: sqlite3.Connection | None = None
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, credential: str, path: str, params: str) -> Any | None:
+        """Get a cached response body, or None if there is no fresh entry."""
+        key = (credential, path, params)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > now:
+                self._stats["memory_hits"] += 1
+                return json.loads(entry[1])
+            generation = self._generation
+
+        row = self._disk_execute(
+            "SELECT expires_at, body FROM responses WHERE credential = ? AND path = ? AND params = ?"
+            " AND expires_at > ?",
+            (credential, path, params, now),
+        )
+
+        with self._lock:
+            if not row:
+                self._stats["misses"] += 1
+                return None
+            if generation == self._generation:
+                self._remember(key, row[0][0], row[0][1])
+            self._stats["disk_hits"] += 1
+        return json.loads(row[0][1])
+
+    def set(self, credential: str, path: str, params: str, body: Any, ttl_seconds: float) -> None:
+        """Cache a response body."""
+        expires_at = time.time() + ttl_seconds
+        serialized = json.dumps(body)
+        with self._lock:
+            self._remember((credential, path, params), expires_at, serialized)
+            generation = self._generation
+
+        with self._disk_lock:
+            # An invalidation since the memory update has dropped this entry, or is about to delete it from disk
+            with self._lock:
+                if generation != self._generation:
+                    return
+            self._disk_execute_locked(
+                "INSERT OR REPLACE INTO responses (credential, path, params, expires_at, body) VALUES (?, ?, ?, ?, ?)",
+                (credential, path, params, expires_at, serialized),
+            )
+
+    def invalidate(self, credential: str, path: str) -> None:
+        """Drop every cached response for a path, whatever its parameters."""
+        with self._lock:
+            for key in [key for key in self._memory if key[0] == credential and key[1] == path]:
+                del self._memory[key]
+            self._generation += 1
+            self._stats["invalidations"] += 1
+        self._disk_execute("DELETE FROM responses WHERE credential = ? AND path = ?", (credential, path))
+
+    def clear(self) -> None:
+        """Drop every cached response."""
+        with self._lock:
+            self._memory.clear()
+            self._generation += 1
+        self._disk_execute("DELETE FROM responses", ())
+
+    def stats(self) -> dict[str, int]:
+        """Get hit, miss, and invalidation counts since the cache was created."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _remember(self, key: tuple[str, str, str], expires_at: float, body: str) -> None:
+        self._memory.pop(key, None)
+        self._memory[key] = (expires_at, body)
+        while len(self._memory) > MAX_MEMORY_ENTRIES:
+            del self._memory[next(iter(self._memory))]
+
+    def _disk_execute(self, statement: str, parameters: tuple) -> list:
+        """Run a statement against the disk layer. The disk layer is turned off if it fails."""
+        with self._disk_lock:
+            return self._disk_execute_locked(statement, parameters)
+
+    def _disk_execute_locked(self, statement: str, parameters: tuple) -> list:
+        if self.path is None:
+            return []
+        try:
+            if self._connection is None:
+                self._connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                # Cached responses include user details, keep them readable by this user only
+                os.chmod(self.path, 0o600)
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS responses (credential TEXT, path TEXT, params TEXT,"
+                    " expires_at REAL, body TEXT, PRIMARY KEY (credential, path, params))"
+                )
+            with self._connection:
+                return self._connection.execute(statement, parameters).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Reference cache at %s is unavailable, keeping it in memory only: %s", self.path, e)
+            self.path = None
+            return []
+
+
+reference_cache = ReferenceCache()
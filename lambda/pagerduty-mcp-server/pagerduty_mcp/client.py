@@ -1,3 +1,4 @@
+import json
 import logging
 import os
 from collections.abc import Callable
@@ -9,6 +10,13 @@ from dotenv import load_dotenv
 from pagerduty.rest_api_v2_client import RestApiV2Client
 
 from pagerduty_mcp import DIST_NAME
+from pagerduty_mcp.cache import (
+    REFERENCE_TTL_SECONDS,
+    credential_hash,
+    reference_cache,
+    reference_entity,
+    referenced_entities,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,10 +28,54 @@ API_HOST = os.getenv("PAGERDUTY_API_HOST", "https://api.pagerduty.com")
 
 
 class PagerdutyMCPClient(RestApiV2Client):
+    def __init__(self, api_key: str, *args, **kwargs):
+        super().__init__(api_key, *args, **kwargs)
+        # Later major versions of the pagerduty library don't keep the key on the client, keep our own copy
+        self.credential_api_key = api_key
+
     @property
     def user_agent(self) -> str:
         return f"{DIST_NAME}/{metadata.version(DIST_NAME)} {super().user_agent}"
 
+    def rget(self, resource, **kw):
+        """Get a resource, serving reference entities such as services and teams from the reference cache."""
+        path = self._api_path(resource) if isinstance(resource, str) else None
+        entity = reference_entity(path) if path and set(kw) <= {"params"} else None
+        if entity is None:
+            return super().rget(resource, **kw)
+
+        credential = credential_hash(self.url, self.credential_api_key)
+        params = json.dumps(kw.get("params") or {}, sort_keys=True)
+        cached = reference_cache.get(credential, path, params)
+        if cached is not None:
+            logger.debug("Reference cache hit for %s, %s", path, reference_cache.stats())
+            return cached
+
+        response = super().rget(resource, **kw)
+        reference_cache.set(credential, path, params, response, REFERENCE_TTL_SECONDS[entity[0]])
+        return response
+
+    def request(self, method, url, **kwargs):
+        """Make an API request, invalidating cached reference entities that a successful write changed."""
+        response = super().request(method, url, **kwargs)
+        if method.strip().upper() != "GET" and response.ok:
+            credential = credential_hash(self.url, self.credential_api_key)
+            for entity, entity_id in referenced_entities(self._api_path(url)):
+                reference_cache.invalidate(credential, f"/{entity}/{entity_id}")
+        return response
+
+    def _api_path(self, url: str) -> str:
+        """Get the API path of a path or full URL, e.g. /services/PABC123."""
+        full_url = self.normalize_url(url).split("?")[0]
+        return "/" + full_url.removeprefix(self.url.rstrip("/")).strip("/")
+
+
+def client_api_key(client: RestApiV2Client) -> str:
+    """Get the API key a client was created with."""
+    if isinstance(client, PagerdutyMCPClient):
+        return client.credential_api_key
+    return client.api_key
+
 
 ClientFactory = Callable[[], RestApiV2Client]
 pd_client_factory: ContextVar[ClientFactory | None] = ContextVar("pd_client_factory", default=None)
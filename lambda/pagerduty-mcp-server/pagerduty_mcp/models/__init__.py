@@ -1,4 +1,4 @@
-from .base import MAX_RESULTS, ListResponseModel
+from .base import MAX_RESULTS, ListResponseModel, validate_list
 from .context import MCPContext
 from .escalation_policies import EscalationPolicy, EscalationPolicyQuery
 from .incidents import (
@@ -59,4 +59,5 @@ __all__ = [
     "User",
     "UserQuery",
     "UserReference",
+    "validate_list",
 ]
@@ -1,6 +1,7 @@
-from typing import Literal, TypeVar
+from functools import cache
+from typing import Literal
 
-from pydantic import BaseModel, computed_field
+from pydantic import BaseModel, TypeAdapter, computed_field
 
 RequestScope = Literal["all", "my"]
 
@@ -8,7 +9,27 @@ DEFAULT_PAGINATION_LIMIT = 20
 MAXIMUM_PAGINATION_LIMIT = 100
 MAX_RESULTS = 1000
 
-T = TypeVar("T", bound=BaseModel)
+
+@cache
+def _list_adapter(model: type[BaseModel]) -> TypeAdapter:
+    """Get the TypeAdapter for a list of a model, built once per model."""
+    return TypeAdapter(list[model])
+
+
+def validate_list[T: BaseModel](model: type[T], records: list[dict]) -> list[T]:
+    """Validate a list of records into models in a single pass.
+
+    The whole list is validated by pydantic-core in one call, instead of constructing each model from
+    Python. Building models without validation (model_construct) was measured to be slower than this, so
+    there is no unvalidated path.
+
+    Args:
+        model: The model to validate each record with (e.g., Incident)
+        records: The records returned by the API
+    Returns:
+        The validated models, in the order of records
+    """
+    return _list_adapter(model).validate_python(records)
 
 
 class ListResponseModel[T: BaseModel](BaseModel):
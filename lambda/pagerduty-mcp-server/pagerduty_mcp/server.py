@@ -29,6 +29,8 @@ live environment. Always confirm with the user before using any tool marked as d
 async def app_lifespan(server: FastMCP) -> AsyncIterator[MCPContext]:
     """Lifespan context manager for the MCP server.
 
+    Resolving the context caches the current user, so tools scoped to the user don't look it up again.
+
     Args:
         server: The MCP server instance
     Returns:
@@ -1,5 +1,5 @@
 from pagerduty_mcp.client import get_client
-from pagerduty_mcp.models import EscalationPolicy, EscalationPolicyQuery, ListResponseModel
+from pagerduty_mcp.models import EscalationPolicy, EscalationPolicyQuery, ListResponseModel, validate_list
 from pagerduty_mcp.utils import paginate
 
 
@@ -12,7 +12,7 @@ def list_escalation_policies(
         List of escalation policies matching the query parameters
     """
     response = paginate(client=get_client(), entity="escalation_policies", params=query_model.to_params())
-    policies = [EscalationPolicy(**policy) for policy in response]
+    policies = validate_list(EscalationPolicy, response)
     return ListResponseModel[EscalationPolicy](response=policies)
 
 
@@ -15,27 +15,31 @@ from pagerduty_mcp.models import (
     ListResponseModel,
     MCPContext,
     UserReference,
+    validate_list,
 )
 from pagerduty_mcp.tools.users import get_user_data
-from pagerduty_mcp.utils import paginate
+from pagerduty_mcp.utils import paginate_models
 
 
 def list_incidents(query_model: IncidentQuery) -> ListResponseModel[Incident]:
     """List incidents with optional filtering."""
     params = query_model.to_params()
-    user_data = get_user_data()
 
+    # The current user is cached, so scoped queries don't cost an extra request
     if query_model.request_scope == "assigned":
-        params["user_ids[]"] = [user_data.id]
+        params["user_ids[]"] = [get_user_data().id]
     elif query_model.request_scope == "teams":
-        user_team_ids = [team.id for team in user_data.teams]
+        user_team_ids = [team.id for team in get_user_data().teams]
         params["teams_ids[]"] = user_team_ids
 
-    response = paginate(
-        client=get_client(), entity="incidents", params=params, maximum_records=query_model.limit or 100
+    incidents = paginate_models(
+        client=get_client(),
+        entity="incidents",
+        params=params,
+        model=Incident,
+        maximum_records=query_model.limit or 100,
     )
-    incidents = [Incident(**incident) for incident in response]
-    return ListResponseModel[Incident](response=incidents)
+    return ListResponseModel[Incident](response=list(incidents))
 
 
 def get_incident(incident_id: str) -> Incident:
@@ -146,7 +150,7 @@ def manage_incidents(
 
     # TODO: Reconsider approach - We're overwriting the response
     if response:
-        incidents = [Incident(**incident) for incident in response]
+        incidents = validate_list(Incident, response)
         return ListResponseModel[Incident](response=incidents)
     return ListResponseModel[Incident](response=[])
 
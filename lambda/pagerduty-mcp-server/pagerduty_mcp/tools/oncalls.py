@@ -3,6 +3,7 @@ from pagerduty_mcp.models import (
     ListResponseModel,
     Oncall,
     OncallQuery,
+    validate_list,
 )
 from pagerduty_mcp.utils import paginate
 
@@ -14,5 +15,5 @@ def list_oncalls(query_model: OncallQuery) -> ListResponseModel[Oncall]:
         List of on-call schedules matching the query parameters
     """
     response = paginate(client=get_client(), entity="oncalls", params=query_model.to_params())
-    oncalls = [Oncall(**oncall) for oncall in response]
+    oncalls = validate_list(Oncall, response)
     return ListResponseModel[Oncall](response=oncalls)
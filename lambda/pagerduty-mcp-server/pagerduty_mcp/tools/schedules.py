@@ -5,6 +5,7 @@ from pagerduty_mcp.models import (
     ScheduleOverrideCreate,
     ScheduleQuery,
     User,
+    validate_list,
 )
 from pagerduty_mcp.utils import paginate
 
@@ -16,7 +17,7 @@ def list_schedules(query_model: ScheduleQuery) -> ListResponseModel[Schedule]:
         List of schedules matching the query parameters
     """
     response = paginate(client=get_client(), entity="schedules", params=query_model.to_params())
-    schedules = [Schedule(**schedule) for schedule in response]
+    schedules = validate_list(Schedule, response)
     return ListResponseModel[Schedule](response=schedules)
 
 
@@ -60,5 +61,5 @@ def list_schedule_users(schedule_id: str) -> ListResponseModel[User]:
         List of users in the schedule
     """
     response = get_client().rget(f"/schedules/{schedule_id}/users")
-    users = [User(**user) for user in response]
+    users = validate_list(User, response)
     return ListResponseModel[User](response=users)
@@ -1,5 +1,5 @@
 from pagerduty_mcp.client import get_client
-from pagerduty_mcp.models import ListResponseModel, Service, ServiceCreate, ServiceQuery
+from pagerduty_mcp.models import ListResponseModel, Service, ServiceCreate, ServiceQuery, validate_list
 from pagerduty_mcp.utils import paginate
 
 
@@ -13,7 +13,7 @@ def list_services(query_model: ServiceQuery) -> ListResponseModel[Service]:
         List of services matching the query parameters
     """
     response = paginate(client=get_client(), entity="services", params=query_model.to_params())
-    services = [Service(**service) for service in response]
+    services = validate_list(Service, response)
     return ListResponseModel[Service](response=services)
 
 
@@ -1,3 +1,10 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pagerduty import RestApiV2Client
+from pagerduty.errors import HttpError
+
 from pagerduty_mcp.client import get_client
 from pagerduty_mcp.models import (
     ListResponseModel,
@@ -6,9 +13,93 @@ from pagerduty_mcp.models import (
     TeamMemberAdd,
     TeamQuery,
     UserReference,
+    validate_list,
 )
 from pagerduty_mcp.tools.users import get_user_data
-from pagerduty_mcp.utils import paginate
+from pagerduty_mcp.utils import credential_key, invalidate_current_user, paginate
+
+# How long a fetched team is served from the team index
+TEAM_INDEX_TTL_SECONDS = 300
+# Maximum number of teams fetched at the same time
+MAX_CONCURRENT_TEAM_FETCHES = 5
+
+
+class TeamIndex:
+    """Teams by ID, cached per credential.
+
+    The API can't fetch several teams by ID in one request, so teams missing from the index are fetched
+    individually and concurrently. Entries expire after a TTL, and are invalidated when a team is changed
+    through this server.
+    """
+
+    def __init__(self, ttl_seconds: float = TEAM_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # (api host, api key, team ID) -> (expires at, team)
+        self._teams: dict[tuple, tuple[float, Team]] = {}
+
+    def get_teams(self, client: RestApiV2Client, team_ids: list[str]) -> list[Team]:
+        """Get teams by ID, fetching only those missing from the index.
+
+        Args:
+            client: The PagerDuty API client
+            team_ids: The IDs of the teams to get
+        Returns:
+            The teams, in the order of team_ids. Teams that no longer exist are left out.
+        """
+        now = time.monotonic()
+        teams = {}
+        with self._lock:
+            for team_id in team_ids:
+                entry = self._teams.get(self._key(client, team_id))
+                if entry is not None and entry[0] > now:
+                    teams[team_id] = entry[1]
+
+        missing_ids = [team_id for team_id in team_ids if team_id not in teams]
+        if missing_ids:
+            with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_TEAM_FETCHES, len(missing_ids))) as executor:
+                fetched = dict(
+                    zip(
+                        missing_ids,
+                        executor.map(lambda team_id: _fetch_team(client, team_id), missing_ids),
+                        strict=True,
+                    )
+                )
+            expires_at = time.monotonic() + self.ttl_seconds
+            with self._lock:
+                for team_id, team in fetched.items():
+                    if team is not None:
+                        self._teams[self._key(client, team_id)] = (expires_at, team)
+                        teams[team_id] = team
+
+        return [teams[team_id] for team_id in team_ids if team_id in teams]
+
+    def invalidate(self, client: RestApiV2Client, team_id: str) -> None:
+        """Drop a team from the index, after it was changed or deleted."""
+        with self._lock:
+            self._teams.pop(self._key(client, team_id), None)
+
+    def clear(self) -> None:
+        """Drop every team from the index."""
+        with self._lock:
+            self._teams.clear()
+
+    @staticmethod
+    def _key(client: RestApiV2Client, team_id: str) -> tuple:
+        return (*credential_key(client), team_id)
+
+
+def _fetch_team(client: RestApiV2Client, team_id: str) -> Team | None:
+    """Fetch a team by ID, or None if it no longer exists."""
+    try:
+        return Team.model_validate(client.rget(f"/teams/{team_id}"))
+    except HttpError as e:
+        if e.response.status_code == 404:
+            return None
+        raise
+
+
+team_index = TeamIndex()
 
 
 def list_teams(query_model: TeamQuery) -> ListResponseModel[Team]:
@@ -23,14 +114,12 @@ def list_teams(query_model: TeamQuery) -> ListResponseModel[Team]:
         # get my team references from /users/me
         user_data = get_user_data()
         user_team_ids = [team.id for team in user_data.teams]
-        # Now get all team resources. Paginate limits to 1000 results by default
-        # TODO: Alternative approach. Fetch each team by ID.
+        # Fetch only the user's teams, rather than paginating through every team in the account
         # TODO: No way to fetch multiple teams by ID in a single request - API improvement area
-        results = paginate(client=get_client(), entity="teams", params={})
-        teams = [Team(**team) for team in results if team["id"] in user_team_ids]
+        teams = team_index.get_teams(get_client(), user_team_ids)
     else:
         response = paginate(client=get_client(), entity="teams", params=query_model.to_params())
-        teams = [Team(**team) for team in response]
+        teams = validate_list(Team, response)
     return ListResponseModel[Team](response=teams)
 
 
@@ -69,7 +158,9 @@ def update_team(team_id: str, update_model: TeamCreateRequest) -> Team:
     Returns:
         The updated team
     """
-    response = get_client().rput(f"/teams/{team_id}", json=update_model.model_dump())
+    client = get_client()
+    response = client.rput(f"/teams/{team_id}", json=update_model.model_dump())
+    team_index.invalidate(client, team_id)
 
     if type(response) is dict and "team" in response:
         return Team.model_validate(response["team"])
@@ -83,7 +174,9 @@ def delete_team(team_id: str) -> None:
     Args:
         team_id: The ID of the team to delete
     """
-    get_client().rdelete(f"/teams/{team_id}")
+    client = get_client()
+    client.rdelete(f"/teams/{team_id}")
+    team_index.invalidate(client, team_id)
 
 
 def list_team_members(team_id: str) -> ListResponseModel[UserReference]:
@@ -111,7 +204,10 @@ def add_team_member(team_id: str, member_data: TeamMemberAdd) -> str:
     Returns:
         The API response confirming the addition
     """
-    response = get_client().put(f"/teams/{team_id}/users/{member_data.user_id}", json=member_data.model_dump())
+    client = get_client()
+    response = client.put(f"/teams/{team_id}/users/{member_data.user_id}", json=member_data.model_dump())
+    # The current user's teams may have changed
+    invalidate_current_user(client)
     if response:
         return "Successfully added user to team"
     return f"Failed to add user to team: {response.reason}"
@@ -124,5 +220,8 @@ def remove_team_member(team_id: str, user_id: str) -> None:
         team_id: The ID of the team to remove the user from
         user_id: The ID of the user to remove
     """
-    get_client().rdelete(f"/teams/{team_id}/users/{user_id}")
+    client = get_client()
+    client.rdelete(f"/teams/{team_id}/users/{user_id}")
+    # The current user's teams may have changed
+    invalidate_current_user(client)
     # The API doesn't return any content for successful deletion
@@ -1,5 +1,6 @@
 from pagerduty_mcp.client import get_client
-from pagerduty_mcp.models import ListResponseModel, User, UserQuery
+from pagerduty_mcp.models import ListResponseModel, User, UserQuery, validate_list
+from pagerduty_mcp.utils import get_current_user
 
 
 def get_user_data() -> User:
@@ -8,8 +9,7 @@ def get_user_data() -> User:
     Returns:
         User: User name, role, id, and summary and teams
     """
-    response = get_client().rget("/users/me")
-    return User.model_validate(response)
+    return get_current_user(get_client())
 
 
 def list_users(
@@ -27,5 +27,5 @@ def list_users(
     """
     user_query = UserQuery(query=query, teams_ids=teams_ids, limit=limit)
     response = get_client().rget("/users", params=user_query.to_params())
-    users = [User(**user) for user in response]
+    users = validate_list(User, response)
     return ListResponseModel[User](response=users)
@@ -1,7 +1,70 @@
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+
 from pagerduty import RestApiV2Client
 from pagerduty.errors import HttpError
+from pagerduty.rest_api_v2_client import CURSOR_BASED_PAGINATION_PATHS, canonical_path, entity_wrappers
+from pydantic import BaseModel
+
+from pagerduty_mcp.client import client_api_key
+from pagerduty_mcp.models import MAX_RESULTS, MCPContext, User, validate_list
+from pagerduty_mcp.models.base import MAXIMUM_PAGINATION_LIMIT
+
+# Maximum number of pages requested at the same time
+MAX_CONCURRENT_PAGES = 5
+# How long the current user is reused before it is fetched again
+CURRENT_USER_TTL_SECONDS = 900
+
+# (api host, api key) -> (expires at, user)
+_current_users: dict[tuple[str, str], tuple[float, User]] = {}
+_current_users_lock = threading.Lock()
+
+
+def credential_key(client: RestApiV2Client) -> tuple[str, str]:
+    """Key for data that can be shared by every client using the same credential against the same account."""
+    return (client.url, client_api_key(client))
 
-from pagerduty_mcp.models import MAX_RESULTS, MCPContext, User
+
+def get_current_user(client: RestApiV2Client, *, refresh: bool = False) -> User:
+    """Get the user the client's credential belongs to.
+
+    The user is fetched from /users/me once per credential and reused until it expires, is refreshed, or
+    is invalidated. Requests made with the client are then sent on behalf of the user.
+
+    Args:
+        client: The PagerDuty API client
+        refresh: Fetch the user again even if it is cached
+    Returns:
+        The current user
+    Raises:
+        HttpError: If the credential isn't bound to a user
+    """
+    key = credential_key(client)
+    with _current_users_lock:
+        entry = _current_users.get(key)
+
+    if entry is None or entry[0] <= time.monotonic() or refresh:
+        user = User.model_validate(client.rget("/users/me"))
+        with _current_users_lock:
+            _current_users[key] = (time.monotonic() + CURRENT_USER_TTL_SECONDS, user)
+    else:
+        user = entry[1]
+
+    # add the from header so all requests are made from the user
+    client.headers["From"] = user.email
+    return user
+
+
+def invalidate_current_user(client: RestApiV2Client | None = None) -> None:
+    """Drop the cached current user for a client's credential, or for every credential."""
+    with _current_users_lock:
+        if client is None:
+            _current_users.clear()
+        else:
+            _current_users.pop(credential_key(client), None)
 
 
 def get_mcp_context(client: RestApiV2Client) -> MCPContext:
@@ -10,16 +73,11 @@ def get_mcp_context(client: RestApiV2Client) -> MCPContext:
     This function takes the user credentials and determines if this is an account or user level
     auth mode.
 
-    If the credentials are bound to a user, it will return the user Schema. Otherwise None.
+    If the credentials are bound to a user, it will return the user Schema. Otherwise None. The user is
+    shared with get_current_user, so resolving the context at startup saves tools the lookup.
     """
     try:
-        response = client.rget("/users/me")
-        # add the from header so all requests are made from the user
-        if type(response) is dict:
-            user_email = response.get("email", "no-email-provided")
-            client.headers["From"] = user_email
-        return MCPContext(user=User.model_validate(response))
-
+        return MCPContext(user=get_current_user(client))
     except HttpError:
         return MCPContext(user=None)
 
@@ -30,17 +88,108 @@ def paginate(*, client: RestApiV2Client, entity: str, params: dict, maximum_reco
     Paginate through the results of a request to the PagerDuty API, while allowing for early termination
     if the maximum number of records is reached.
 
+    Pages are sized from maximum_records, so a small query costs a single request for just the records
+    it needs. For larger queries the first page is requested with the total number of records. The
+    remaining pages are then known up front and are requested concurrently, so a large result costs
+    about one round trip instead of one per page. Endpoints that use cursor pagination or don't report a
+    total are paginated page by page.
+
     Args:
         client: The PagerDuty API client
         entity: The entity to paginate through (e.g., "incidents")
         params: The parameters to pass to the API request
         maximum_records: The maximum number of records to return
     Returns:
-        A list of results
+        A list of results, in the order returned by the API
     """
     results = []
+    for page in _iter_pages(client=client, entity=entity, params=params, maximum_records=maximum_records):
+        results.extend(page)
+    return results
+
+
+def paginate_models[T: BaseModel](
+    *, client: RestApiV2Client, entity: str, params: dict, model: type[T], maximum_records: int = MAX_RESULTS
+) -> Iterator[T]:
+    """Paginate results as validated models.
+
+    Works like paginate, but yields each record as a model as soon as its page arrives. Each page is
+    validated in a single pass, and its raw records can be freed once they are validated, rather than
+    holding every raw record and every model at the same time.
+
+    Args:
+        client: The PagerDuty API client
+        entity: The entity to paginate through (e.g., "incidents")
+        params: The parameters to pass to the API request
+        model: The model to validate each record with (e.g., Incident)
+        maximum_records: The maximum number of records to return
+    Yields:
+        Validated models, in the order returned by the API
+    """
+    for page in _iter_pages(client=client, entity=entity, params=params, maximum_records=maximum_records):
+        yield from validate_list(model, page)
+
+
+def _iter_pages(*, client: RestApiV2Client, entity: str, params: dict, maximum_records: int) -> Iterator[list[dict]]:
+    """Yield pages of raw records in order, stopping at exactly maximum_records."""
+    path = canonical_path(client.url, entity)
+    if path in CURSOR_BASED_PAGINATION_PATHS:
+        yield _paginate_sequentially(client=client, entity=entity, params=params, maximum_records=maximum_records)
+        return
+
+    _, wrapper = entity_wrappers("GET", path)
+    start = int(params.get("offset", 0))
+    page_size = min(int(params.get("limit") or MAXIMUM_PAGINATION_LIMIT), maximum_records)
+
+    # The total costs the API extra work, only ask for it when more than one page is needed
+    first_page_params = {**params, "offset": start, "limit": page_size}
+    if maximum_records > page_size:
+        first_page_params["total"] = "true"
+    first_page = client.jget(entity, params=first_page_params)
+    results = first_page[wrapper][:maximum_records]
+    yield results
+    if not first_page.get("more") or not results or len(results) >= maximum_records:
+        return
+
+    if first_page.get("total") is None:
+        yield _paginate_sequentially(
+            client=client,
+            entity=entity,
+            params={**params, "offset": start + len(results)},
+            maximum_records=maximum_records - len(results),
+        )
+        return
+
+    # The API may return fewer records than requested, later pages use the size it actually returned
+    page_size = len(results)
+    end = start + min(first_page["total"] - start, maximum_records)
+    offsets = range(start + page_size, end, page_size)
+    if not offsets:
+        return
+
+    def fetch_page(offset: int) -> list[dict]:
+        page_params = {**params, "offset": offset, "limit": min(page_size, end - offset)}
+        return client.jget(entity, params=page_params)[wrapper][: end - offset]
+
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_PAGES, len(offsets))) as executor:
+        # At most MAX_CONCURRENT_PAGES pages are in flight or waiting to be consumed. The next page is only
+        # requested once the oldest is yielded, so pages come out in offset order and a slow consumer holds
+        # a bounded number of raw pages
+        pending: deque[Future[list[dict]]] = deque()
+        for offset in offsets:
+            if len(pending) == MAX_CONCURRENT_PAGES:
+                yield pending.popleft().result()
+            pending.append(executor.submit(fetch_page, offset))
+        while pending:
+            yield pending.popleft().result()
+
+
+def _paginate_sequentially(*, client: RestApiV2Client, entity: str, params: dict, maximum_records: int):
+    """Paginate page by page with the client's iterator."""
+    page_size = min(int(params.get("limit") or MAXIMUM_PAGINATION_LIMIT), maximum_records)
+    results = []
     count = 0
-    for incident in client.iter_all(entity, params=params):
+    for incident in client.iter_all(entity, params={**params, "limit": page_size}):
         results.append(incident)
         count += 1  # noqa: SIM113
         if count >= maximum_records:
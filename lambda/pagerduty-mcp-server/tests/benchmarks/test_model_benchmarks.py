@@ -0,0 +1,121 @@
+"""Benchmarks for building and serializing list tool responses.
+
+List tools return up to 1000 records, so validating them into models and serializing the
+ListResponseModel dominates their cost once the API has answered. Run with:
+
+    make benchmark
+"""
+
+import pydantic_core
+import pytest
+
+from pagerduty_mcp.models import Incident, ListResponseModel, Schedule, Service, User, validate_list
+
+pytest.importorskip("pytest_benchmark")
+
+RECORD_COUNTS = [10, 100, 1000]
+
+
+def incident_record(index: int) -> dict:
+    """An incident as returned by GET /incidents."""
+    return {
+        "id": f"PINC{index}",
+        "incident_number": index,
+        "title": f"High error rate on checkout {index}",
+        "description": "Error rate above 5% for 10 minutes",
+        "status": "triggered",
+        "urgency": "high",
+        "created_at": "2023-01-01T00:00:00Z",
+        "updated_at": "2023-01-01T00:05:00Z",
+        "service": {"id": "PSERVICE1", "summary": "Checkout", "type": "service_reference"},
+        "assignments": [
+            {
+                "at": "2023-01-01T00:00:00Z",
+                "assignee": {"id": "PUSER1", "summary": "John Doe", "type": "user_reference"},
+            }
+        ],
+        "escalation_policy": {"id": "PESC1", "summary": "Checkout on-call", "type": "escalation_policy_reference"},
+        "teams": [{"id": "PTEAM1", "summary": "Payments", "type": "team_reference"}],
+        "alert_counts": {"all": 2, "triggered": 2, "resolved": 0},
+        "incident_key": f"checkout-error-rate-{index}",
+        "html_url": f"https://example.pagerduty.com/incidents/PINC{index}",
+    }
+
+
+def service_record(index: int) -> dict:
+    """A service as returned by GET /services."""
+    return {
+        "id": f"PSERVICE{index}",
+        "name": f"Service {index}",
+        "description": "Handles checkout payments",
+        "escalation_policy": {"id": "PESC1", "summary": "Checkout on-call", "type": "escalation_policy_reference"},
+        "teams": [{"id": "PTEAM1", "summary": "Payments", "type": "team_reference"}],
+    }
+
+
+def schedule_record(index: int) -> dict:
+    """A schedule as returned by GET /schedules."""
+    return {
+        "id": f"PSCHED{index}",
+        "summary": f"Schedule {index}",
+        "name": f"Schedule {index}",
+        "description": "Primary on-call rotation",
+        "time_zone": "America/New_York",
+        "html_url": f"https://example.pagerduty.com/schedules/PSCHED{index}",
+        "created_at": "2023-01-01T12:00:00Z",
+        "updated_at": "2023-06-01T12:00:00Z",
+        "users": [
+            {"id": "PUSER1", "summary": "John Doe", "type": "user_reference"},
+            {"id": "PUSER2", "summary": "Jane Smith", "type": "user_reference"},
+        ],
+        "teams": [{"id": "PTEAM1", "summary": "Payments", "type": "team_reference"}],
+    }
+
+
+def user_record(index: int) -> dict:
+    """A user as returned by GET /users."""
+    return {
+        "id": f"PUSER{index}",
+        "summary": f"User {index}",
+        "name": f"User {index}",
+        "email": f"user{index}@example.com",
+        "role": "user",
+        "teams": [{"id": "PTEAM1", "summary": "Payments", "type": "team_reference"}],
+    }
+
+
+ENTITIES = {
+    "incidents": (Incident, incident_record),
+    "services": (Service, service_record),
+    "schedules": (Schedule, schedule_record),
+    "users": (User, user_record),
+}
+
+
+@pytest.fixture(params=list(ENTITIES))
+def entity(request):
+    """The model and record factory of each benchmarked entity."""
+    return ENTITIES[request.param]
+
+
+@pytest.mark.parametrize("record_count", RECORD_COUNTS)
+def test_validate_records(benchmark, entity, record_count):
+    """Validate API records into models, as list tools do."""
+    model, make_record = entity
+    records = [make_record(index) for index in range(record_count)]
+
+    models = benchmark(validate_list, model, records)
+
+    assert len(models) == record_count
+    assert isinstance(models[0], model)
+
+
+@pytest.mark.parametrize("record_count", RECORD_COUNTS)
+def test_serialize_response(benchmark, entity, record_count):
+    """Serialize a list response the way the MCP server returns tool results."""
+    model, make_record = entity
+    response = ListResponseModel[model](response=validate_list(model, [make_record(i) for i in range(record_count)]))
+
+    serialized = benchmark(pydantic_core.to_json, response, fallback=str, indent=2)
+
+    assert serialized.startswith(b"{")
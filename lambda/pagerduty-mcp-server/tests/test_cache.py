@@ -0,0 +1,101 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pagerduty_mcp.cache import ReferenceCache, reference_entity, referenced_entities
+from pagerduty_mcp.client import PagerdutyMCPClient
+
+
+class TestReferenceCache(unittest.TestCase):
+    """Test cases for the reference data cache."""
+
+    def setUp(self):
+        """Set up a cache backed by a temporary SQLite file."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, "cache.sqlite3")
+        self.cache = ReferenceCache(self.cache_path)
+        self.service = {"id": "PSERVICE1", "name": "Checkout"}
+
+    def tearDown(self):
+        """Remove the temporary SQLite file."""
+        self.temp_dir.cleanup()
+
+    def test_reference_paths(self):
+        """Test which paths are cached and which entities a write invalidates."""
+        self.assertEqual(reference_entity("/services/PSERVICE1"), ("services", "PSERVICE1"))
+        self.assertIsNone(reference_entity("/users/me"))
+        self.assertIsNone(reference_entity("/incidents/PINC1"))
+        self.assertIsNone(reference_entity("/schedules/PSCHED1/users"))
+        self.assertEqual(referenced_entities("/teams/PTEAM1/users/PUSER1"), [("teams", "PTEAM1"), ("users", "PUSER1")])
+
+    def test_entries_are_shared_across_processes_through_disk(self):
+        """Test that a new cache, as in a new server process, is served from the disk layer."""
+        self.cache.set("credential", "/services/PSERVICE1", "{}", self.service, ttl_seconds=60)
+        self.assertEqual(self.cache.get("credential", "/services/PSERVICE1", "{}"), self.service)
+
+        restarted_cache = ReferenceCache(self.cache_path)
+        self.assertEqual(restarted_cache.get("credential", "/services/PSERVICE1", "{}"), self.service)
+        self.assertEqual(restarted_cache.get("credential", "/services/PSERVICE1", "{}"), self.service)
+        self.assertIsNone(restarted_cache.get("other-credential", "/services/PSERVICE1", "{}"))
+        self.assertEqual(restarted_cache.stats(), {"memory_hits": 1, "disk_hits": 1, "misses": 1, "invalidations": 0})
+
+    def test_expired_and_invalidated_entries_are_not_served(self):
+        """Test that entries are dropped after their TTL and on invalidation."""
+        self.cache.set("credential", "/services/PSERVICE1", "{}", self.service, ttl_seconds=-1)
+        self.assertIsNone(self.cache.get("credential", "/services/PSERVICE1", "{}"))
+
+        self.cache.set("credential", "/services/PSERVICE1", "{}", self.service, ttl_seconds=60)
+        self.cache.invalidate("credential", "/services/PSERVICE1")
+        self.assertIsNone(self.cache.get("credential", "/services/PSERVICE1", "{}"))
+        self.assertIsNone(ReferenceCache(self.cache_path).get("credential", "/services/PSERVICE1", "{}"))
+
+    def test_memory_hits_do_not_wait_on_disk(self):
+        """Test that a memory hit is served while other threads are reading or writing the disk layer."""
+        self.cache.set("credential", "/services/PSERVICE1", "{}", self.service, ttl_seconds=60)
+
+        results = []
+        with self.cache._disk_lock:
+            writes = [
+                threading.Thread(
+                    target=self.cache.set, args=("credential", "/teams/PTEAM1", "{}", {"id": "PTEAM1"}, 60)
+                ),
+                threading.Thread(target=self.cache.invalidate, args=("credential", "/teams/PTEAM2")),
+            ]
+            for write in writes:
+                write.start()
+            lookup = threading.Thread(
+                target=lambda: results.append(self.cache.get("credential", "/services/PSERVICE1", "{}"))
+            )
+            lookup.start()
+            lookup.join(timeout=1)
+        self.assertEqual(results, [self.service])
+        for write in writes:
+            write.join(timeout=1)
+
+    def test_client_serves_reference_gets_from_cache_and_invalidates_on_write(self):
+        """Test that the client caches reference GETs and invalidates them after a successful write."""
+        client = PagerdutyMCPClient("token")
+        # Later major versions of the pagerduty library don't keep the key on the client
+        del client._api_key
+        with (
+            patch("pagerduty_mcp.client.reference_cache", self.cache),
+            patch("pagerduty.rest_api_v2_client.RestApiV2Client.rget", return_value=self.service) as mock_rget,
+            patch("pagerduty.api_client.ApiClient.request", return_value=MagicMock(ok=True)),
+        ):
+            self.assertEqual(client.rget("/services/PSERVICE1"), self.service)
+            self.assertEqual(client.rget("/services/PSERVICE1"), self.service)
+            self.assertEqual(mock_rget.call_count, 1)
+
+            # Incidents aren't reference data
+            client.rget("/incidents/PINC1")
+            self.assertEqual(mock_rget.call_count, 2)
+
+            client.request("PUT", "/services/PSERVICE1", json={"service": self.service})
+            client.rget("/services/PSERVICE1")
+            self.assertEqual(mock_rget.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -67,11 +67,11 @@ class TestIncidentTools(unittest.TestCase):
 
     @patch("pagerduty_mcp.tools.incidents.get_client")
     @patch("pagerduty_mcp.tools.incidents.get_user_data")
-    @patch("pagerduty_mcp.tools.incidents.paginate")
+    @patch("pagerduty_mcp.tools.incidents.paginate_models")
     def test_list_incidents_basic(self, mock_paginate, mock_get_user_data, mock_get_client):
         """Test basic incident listing."""
         # Setup mocks
-        mock_paginate.return_value = [self.sample_incident_data]
+        mock_paginate.return_value = iter([Incident.model_validate(self.sample_incident_data)])
         mock_get_user_data.return_value = self.sample_user_data
 
         # Test with basic query
@@ -88,15 +88,16 @@ class TestIncidentTools(unittest.TestCase):
         mock_paginate.assert_called_once()
         call_args = mock_paginate.call_args
         self.assertEqual(call_args[1]["entity"], "incidents")
+        self.assertEqual(call_args[1]["model"], Incident)
         self.assertEqual(call_args[1]["maximum_records"], MAX_RESULTS)
 
     @patch("pagerduty_mcp.tools.incidents.get_client")
     @patch("pagerduty_mcp.tools.incidents.get_user_data")
-    @patch("pagerduty_mcp.tools.incidents.paginate")
+    @patch("pagerduty_mcp.tools.incidents.paginate_models")
     def test_list_incidents_assigned_scope(self, mock_paginate, mock_get_user_data, mock_get_client):
         """Test listing incidents with assigned scope."""
         # Setup mocks
-        mock_paginate.return_value = [self.sample_incident_data]
+        mock_paginate.return_value = iter([Incident.model_validate(self.sample_incident_data)])
         mock_get_user_data.return_value = self.sample_user_data
 
         # Test with assigned scope
@@ -110,11 +111,11 @@ class TestIncidentTools(unittest.TestCase):
 
     @patch("pagerduty_mcp.tools.incidents.get_client")
     @patch("pagerduty_mcp.tools.incidents.get_user_data")
-    @patch("pagerduty_mcp.tools.incidents.paginate")
+    @patch("pagerduty_mcp.tools.incidents.paginate_models")
     def test_list_incidents_teams_scope(self, mock_paginate, mock_get_user_data, mock_get_client):
         """Test listing incidents with teams scope."""
         # Setup mocks
-        mock_paginate.return_value = [self.sample_incident_data]
+        mock_paginate.return_value = iter([Incident.model_validate(self.sample_incident_data)])
         mock_get_user_data.return_value = self.sample_user_data
 
         # Test with teams scope
@@ -128,11 +129,11 @@ class TestIncidentTools(unittest.TestCase):
 
     @patch("pagerduty_mcp.tools.incidents.get_client")
     @patch("pagerduty_mcp.tools.incidents.get_user_data")
-    @patch("pagerduty_mcp.tools.incidents.paginate")
+    @patch("pagerduty_mcp.tools.incidents.paginate_models")
     def test_list_incidents_with_filters(self, mock_paginate, mock_get_user_data, mock_get_client):
         """Test listing incidents with various filters."""
         # Setup mocks
-        mock_paginate.return_value = [self.sample_incident_data]
+        mock_paginate.return_value = iter([Incident.model_validate(self.sample_incident_data)])
         mock_get_user_data.return_value = self.sample_user_data
 
         # Test with filters
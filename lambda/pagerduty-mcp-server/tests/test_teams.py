@@ -1,6 +1,8 @@
 import unittest
 from unittest.mock import MagicMock, patch
 
+from pagerduty.errors import HttpError
+
 from pagerduty_mcp.models.base import DEFAULT_PAGINATION_LIMIT, MAXIMUM_PAGINATION_LIMIT
 from pagerduty_mcp.models.references import UserReference
 from pagerduty_mcp.models.teams import Team, TeamCreate, TeamCreateRequest, TeamMemberAdd, TeamQuery
@@ -13,6 +15,7 @@ from pagerduty_mcp.tools.teams import (
     list_team_members,
     list_teams,
     remove_team_member,
+    team_index,
     update_team,
 )
 
@@ -75,6 +78,7 @@ class TestTeamTools(unittest.TestCase):
         self.mock_client.rput.side_effect = None
         self.mock_client.rdelete.side_effect = None
         self.mock_client.put.side_effect = None
+        team_index.clear()
 
     @patch("pagerduty_mcp.tools.teams.paginate")
     @patch("pagerduty_mcp.tools.teams.get_client")
@@ -104,7 +108,7 @@ class TestTeamTools(unittest.TestCase):
     def test_list_teams_my_scope(self, mock_get_client, mock_paginate, mock_get_user_data):
         """Test listing teams with 'my' scope."""
         mock_get_client.return_value = self.mock_client
-        mock_paginate.return_value = self.sample_teams_list_response
+        self.mock_client.rget.side_effect = self._get_team_by_path
         mock_get_user_data.return_value = User.model_validate(self.sample_user_data)
 
         query = TeamQuery(scope="my")
@@ -113,13 +117,61 @@ class TestTeamTools(unittest.TestCase):
         # Verify get_user_data was called
         mock_get_user_data.assert_called_once()
 
-        # Verify paginate call to get all teams
-        mock_paginate.assert_called_once_with(client=self.mock_client, entity="teams", params={})
+        # Verify only the user's teams were fetched, by ID
+        mock_paginate.assert_not_called()
+        fetched_paths = sorted(call.args[0] for call in self.mock_client.rget.call_args_list)
+        self.assertEqual(fetched_paths, ["/teams/TEAM123", "/teams/TEAM789"])
 
-        # Verify result - should only include teams user is member of
-        self.assertEqual(len(result.response), 1)  # Only TEAM123 matches user's teams
+        # Verify result - the user's teams, in the order of the user's team references
+        self.assertEqual(len(result.response), 2)
         self.assertEqual(result.response[0].id, "TEAM123")
         self.assertEqual(result.response[0].name, "Backend Engineering")
+        self.assertEqual(result.response[1].id, "TEAM789")
+
+    @patch("pagerduty_mcp.tools.teams.get_user_data")
+    @patch("pagerduty_mcp.tools.teams.get_client")
+    def test_list_teams_my_scope_serves_repeat_lookups_from_index(self, mock_get_client, mock_get_user_data):
+        """Test that repeat 'my' scope lookups are served from the team index."""
+        mock_get_client.return_value = self.mock_client
+        self.mock_client.rget.side_effect = self._get_team_by_path
+        mock_get_user_data.return_value = User.model_validate(self.sample_user_data)
+
+        list_teams(TeamQuery(scope="my"))
+        result = list_teams(TeamQuery(scope="my"))
+
+        self.assertEqual(self.mock_client.rget.call_count, 2)
+        self.assertEqual([team.id for team in result.response], ["TEAM123", "TEAM789"])
+
+        # Updating a team drops it from the index, so it is fetched again
+        team_index.invalidate(self.mock_client, "TEAM123")
+        list_teams(TeamQuery(scope="my"))
+        self.assertEqual(self.mock_client.rget.call_count, 3)
+
+    @patch("pagerduty_mcp.tools.teams.get_user_data")
+    @patch("pagerduty_mcp.tools.teams.get_client")
+    def test_list_teams_my_scope_skips_deleted_teams(self, mock_get_client, mock_get_user_data):
+        """Test that teams which no longer exist are left out."""
+        mock_get_client.return_value = self.mock_client
+
+        def get_team_or_not_found(path):
+            if path == "/teams/TEAM789":
+                raise HttpError("Not found", MagicMock(status_code=404))
+            return self._get_team_by_path(path)
+
+        self.mock_client.rget.side_effect = get_team_or_not_found
+        mock_get_user_data.return_value = User.model_validate(self.sample_user_data)
+
+        result = list_teams(TeamQuery(scope="my"))
+
+        self.assertEqual([team.id for team in result.response], ["TEAM123"])
+
+    def _get_team_by_path(self, path):
+        """Serve a team by its /teams/{id} path."""
+        teams = {
+            "TEAM123": self.sample_team_response,
+            "TEAM789": {"id": "TEAM789", "summary": "QA Team", "name": "QA", "type": "team"},
+        }
+        return teams[path.rsplit("/", 1)[-1]]
 
     @patch("pagerduty_mcp.tools.teams.paginate")
     @patch("pagerduty_mcp.tools.teams.get_client")
@@ -5,6 +5,7 @@ from pagerduty_mcp.models.base import DEFAULT_PAGINATION_LIMIT, MAXIMUM_PAGINATI
 from pagerduty_mcp.models.references import TeamReference
 from pagerduty_mcp.models.users import User, UserQuery
 from pagerduty_mcp.tools.users import get_user_data, list_users
+from pagerduty_mcp.utils import invalidate_current_user
 
 
 class TestUserTools(unittest.TestCase):
@@ -51,6 +52,7 @@ class TestUserTools(unittest.TestCase):
         self.mock_client.reset_mock()
         # Clear any side effects
         self.mock_client.rget.side_effect = None
+        invalidate_current_user()
 
     @patch("pagerduty_mcp.tools.users.get_client")
     def test_get_user_data_success(self, mock_get_client):
@@ -0,0 +1,191 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from pagerduty.errors import HttpError
+from pydantic import BaseModel
+
+from pagerduty_mcp.utils import (
+    MAX_CONCURRENT_PAGES,
+    get_current_user,
+    get_mcp_context,
+    invalidate_current_user,
+    paginate,
+    paginate_models,
+)
+
+
+class Record(BaseModel):
+    id: str
+
+
+class TestPaginate(unittest.TestCase):
+    """Test cases for paginate."""
+
+    def setUp(self):
+        """Set up a client serving a collection of 450 incidents."""
+        self.records = [{"id": f"INC{index}"} for index in range(450)]
+        self.requested_params = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+        self.mock_client = MagicMock()
+        self.mock_client.url = "https://api.pagerduty.com"
+        self.mock_client.default_page_size = 100
+        self.mock_client.jget.side_effect = self.serve_page
+
+    def serve_page(self, entity, params):
+        """Serve one offset page, slower for earlier pages so they finish out of order."""
+        with self.lock:
+            self.requested_params.append(params)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05 - params["offset"] / 20000)
+        with self.lock:
+            self.in_flight -= 1
+
+        offset, limit = params["offset"], params["limit"]
+        page = {
+            "incidents": self.records[offset : offset + limit],
+            "more": offset + limit < len(self.records),
+        }
+        if params.get("total"):
+            page["total"] = len(self.records)
+        return page
+
+    def test_paginate_fetches_remaining_pages_concurrently(self):
+        """Test that pages after the first are requested concurrently and returned in order."""
+        result = paginate(client=self.mock_client, entity="incidents", params={"statuses[]": ["triggered"]})
+
+        self.assertEqual(result, self.records)
+        self.assertEqual(self.requested_params[0]["total"], "true")
+        self.assertEqual(sorted(params["offset"] for params in self.requested_params), [0, 100, 200, 300, 400])
+        self.assertGreater(self.max_in_flight, 1)
+        for params in self.requested_params:
+            self.assertEqual(params["statuses[]"], ["triggered"])
+
+    def test_paginate_stops_at_maximum_records(self):
+        """Test that the last page is trimmed to the maximum number of records."""
+        result = paginate(client=self.mock_client, entity="incidents", params={}, maximum_records=250)
+
+        self.assertEqual(result, self.records[:250])
+        last_page = max(self.requested_params, key=lambda params: params["offset"])
+        self.assertEqual(last_page["offset"], 200)
+        self.assertEqual(last_page["limit"], 50)
+
+    def test_paginate_single_page(self):
+        """Test that a result that fits in the first page costs a single request."""
+        self.records = self.records[:30]
+
+        result = paginate(client=self.mock_client, entity="incidents", params={})
+
+        self.assertEqual(result, self.records)
+        self.mock_client.jget.assert_called_once()
+
+    def test_paginate_sizes_small_queries_to_the_limit(self):
+        """Test that a small query costs a single request for just the records it needs."""
+        result = paginate(client=self.mock_client, entity="incidents", params={}, maximum_records=5)
+
+        self.assertEqual(result, self.records[:5])
+        self.mock_client.jget.assert_called_once_with("incidents", params={"offset": 0, "limit": 5})
+
+    def test_paginate_models_yields_validated_models_in_order(self):
+        """Test that paginate_models validates each record as its page arrives."""
+        models = paginate_models(
+            client=self.mock_client, entity="incidents", params={}, model=Record, maximum_records=250
+        )
+
+        first = next(models)
+        self.assertIsInstance(first, Record)
+        self.assertEqual(first.id, "INC0")
+        self.assertEqual([model.id for model in models], [record["id"] for record in self.records[1:250]])
+
+    def test_paginate_models_bounds_pages_ahead_of_the_consumer(self):
+        """Test that only MAX_CONCURRENT_PAGES pages are requested ahead of what has been consumed."""
+        models = paginate_models(
+            client=self.mock_client, entity="incidents", params={"limit": 10}, model=Record, maximum_records=450
+        )
+
+        consumed = [next(models) for _ in range(11)]
+
+        self.assertEqual(consumed[-1].id, "INC10")
+        self.assertLessEqual(len(self.requested_params), 1 + MAX_CONCURRENT_PAGES)
+        self.assertEqual(len(list(models)), 450 - 11)
+
+    def test_paginate_without_total_falls_back_to_sequential(self):
+        """Test that endpoints not reporting a total continue page by page."""
+        self.mock_client.jget.side_effect = None
+        self.mock_client.jget.return_value = {"incidents": self.records[:100], "more": True}
+        self.mock_client.iter_all.return_value = iter(self.records[100:])
+
+        result = paginate(client=self.mock_client, entity="incidents", params={}, maximum_records=150)
+
+        self.assertEqual(result, self.records[:150])
+        self.mock_client.iter_all.assert_called_once_with("incidents", params={"offset": 100, "limit": 50})
+
+    def test_paginate_cursor_endpoint_is_sequential(self):
+        """Test that cursor paginated endpoints use the client's iterator."""
+        self.mock_client.iter_all.return_value = iter(self.records)
+
+        result = paginate(client=self.mock_client, entity="/audit/records", params={}, maximum_records=10)
+
+        self.assertEqual(result, self.records[:10])
+        self.mock_client.jget.assert_not_called()
+
+
+class TestCurrentUser(unittest.TestCase):
+    """Test cases for the cached current user."""
+
+    def setUp(self):
+        """Set up a client whose credential belongs to a user."""
+        invalidate_current_user()
+        self.mock_client = MagicMock()
+        self.mock_client.url = "https://api.pagerduty.com"
+        self.mock_client.api_key = "user-token"
+        self.mock_client.headers = {}
+        self.mock_client.rget.return_value = {
+            "id": "USER123",
+            "name": "John Doe",
+            "email": "john.doe@example.com",
+            "role": "user",
+            "teams": [],
+        }
+
+    def test_current_user_is_fetched_once_per_credential(self):
+        """Test that the user is fetched once and reused by the MCP context and later lookups."""
+        context = get_mcp_context(self.mock_client)
+        user = get_current_user(self.mock_client)
+
+        self.assertEqual(context.user.id, "USER123")
+        self.assertEqual(user.id, "USER123")
+        self.mock_client.rget.assert_called_once_with("/users/me")
+
+        # A new client for the same credential reuses the user, and is sent on behalf of it
+        other_client = MagicMock(url=self.mock_client.url, api_key="user-token", headers={})
+        get_current_user(other_client)
+        other_client.rget.assert_not_called()
+        self.assertEqual(other_client.headers["From"], "john.doe@example.com")
+
+    def test_current_user_refresh_and_invalidation(self):
+        """Test that refreshing or invalidating fetches the user again."""
+        get_current_user(self.mock_client)
+        get_current_user(self.mock_client, refresh=True)
+        self.assertEqual(self.mock_client.rget.call_count, 2)
+
+        invalidate_current_user(self.mock_client)
+        get_current_user(self.mock_client)
+        self.assertEqual(self.mock_client.rget.call_count, 3)
+
+    def test_mcp_context_for_account_credentials(self):
+        """Test that account level credentials have no user and aren't cached."""
+        self.mock_client.rget.side_effect = HttpError("Bad request", MagicMock(status_code=400))
+
+        self.assertIsNone(get_mcp_context(self.mock_client).user)
+        self.assertIsNone(get_mcp_context(self.mock_client).user)
+        self.assertEqual(self.mock_client.rget.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,22 @@
 ### Imports
 import json
 import os
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 import boto3
 
 # Read environment variables
 BOT_NAME = os.environ.get("BOT_NAME", "Vera")  # Default to "Vera" if not set
+DISPATCH_BACKEND = os.environ.get(
+    "DISPATCH_BACKEND", "lambda"
+)  # lambda (direct async invoke), sqs or memory (local tests)
+DISPATCH_QUEUE_URL = os.environ.get("DISPATCH_QUEUE_URL", "")
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", f"{BOT_NAME}/Receiver")
+BACKLOG_SAMPLE_SECONDS = int(
+    os.environ.get("BACKLOG_SAMPLE_SECONDS", "60")
+)  # How often the SQS backlog depth is read, so most dispatches skip the extra API call
 
 
 ### Execute
@@ -21,16 +33,189 @@ def get_lambda_client():
     return lambda_client
 
 
+# Lazy initialize AWS SQS client
+sqs_client = None
+
+
+def get_sqs_client():
+    """Get SQS client, initializing it lazily on first use"""
+    global sqs_client
+    if sqs_client is None:
+        sqs_client = boto3.client("sqs")
+    return sqs_client
+
+
+### Dispatch
+
+
+def get_ordering_key(body):
+    """Events in the same Slack thread share an ordering key, so they're processed in order"""
+    slack_event = body.get("event", {})
+    channel = slack_event.get("channel", "")
+    thread_ts = slack_event.get("thread_ts", slack_event.get("ts", ""))
+    return f"{channel}:{thread_ts}"
+
+
+def put_backlog_metric(depth):
+    """Emit the dispatch backlog depth as a CloudWatch Embedded Metric Format log line"""
+    print(
+        json.dumps(
+            {
+                "_aws": {
+                    "Timestamp": int(time.time() * 1000),
+                    "CloudWatchMetrics": [
+                        {
+                            "Namespace": METRICS_NAMESPACE,
+                            "Dimensions": [["Backend"]],
+                            "Metrics": [{"Name": "BacklogDepth", "Unit": "Count"}],
+                        }
+                    ],
+                },
+                "Backend": DISPATCH_BACKEND,
+                "BacklogDepth": depth,
+            }
+        )
+    )
+
+
+class LambdaDispatcher:
+    """Invokes the worker asynchronously for every event, Lambda manages the concurrency"""
+
+    def dispatch(self, event, ordering_key, dedupe_id):
+        get_lambda_client().invoke(
+            FunctionName=os.environ.get("PROCESSOR_FUNCTION_NAME"),
+            InvocationType="Event",  # Async invocation
+            Payload=json.dumps(event),
+        )
+
+    def backlog_depth(self):
+        # Async invocations are queued inside Lambda, where we can't see them
+        return None
+
+
+class SQSDispatcher:
+    """Sends events to an SQS queue the worker consumes with capped concurrency
+
+    With a FIFO queue, events in the same thread are delivered in order
+    """
+
+    def __init__(self, queue_url=DISPATCH_QUEUE_URL):
+        self.queue_url = queue_url
+        self.fifo = queue_url.endswith(".fifo")
+        self.backlog_sampled_at = 0.0
+
+    def dispatch(self, event, ordering_key, dedupe_id):
+        message = {"QueueUrl": self.queue_url, "MessageBody": json.dumps(event)}
+        if self.fifo:
+            message["MessageGroupId"] = ordering_key
+            message["MessageDeduplicationId"] = dedupe_id
+        get_sqs_client().send_message(**message)
+
+    def backlog_depth(self):
+        # Dispatch runs inside Slack's 3 second ack window, so the depth is only sampled every BACKLOG_SAMPLE_SECONDS
+        # SQS also publishes ApproximateNumberOfMessagesVisible to CloudWatch for a complete series
+        now = time.time()
+        if now - self.backlog_sampled_at < BACKLOG_SAMPLE_SECONDS:
+            return None
+        self.backlog_sampled_at = now
+
+        attributes = get_sqs_client().get_queue_attributes(
+            QueueUrl=self.queue_url,
+            AttributeNames=[
+                "ApproximateNumberOfMessages",
+                "ApproximateNumberOfMessagesNotVisible",
+            ],
+        )["Attributes"]
+        return int(attributes["ApproximateNumberOfMessages"]) + int(
+            attributes["ApproximateNumberOfMessagesNotVisible"]
+        )
+
+
+class InMemoryDispatcher:
+    """Queues events in memory, for local tests. drain() runs them through a handler"""
+
+    def __init__(self):
+        # Ordering key -> queued events, in arrival order
+        self.queues = OrderedDict()
+        self.seen_dedupe_ids = set()
+        self.lock = threading.Lock()
+
+    def dispatch(self, event, ordering_key, dedupe_id):
+        with self.lock:
+            # Slack retries deliveries, only queue each event once
+            if dedupe_id in self.seen_dedupe_ids:
+                return
+            self.seen_dedupe_ids.add(dedupe_id)
+            self.queues.setdefault(ordering_key, deque()).append(event)
+
+    def backlog_depth(self):
+        with self.lock:
+            return sum(len(queue) for queue in self.queues.values())
+
+    def drain(self, handler, concurrency=1):
+        """Process every queued event, up to concurrency threads at once, and in order within a thread"""
+
+        def consume(queue):
+            while True:
+                with self.lock:
+                    if not queue:
+                        return
+                    event = queue.popleft()
+                handler(event)
+
+        with self.lock:
+            queues = list(self.queues.values())
+            self.queues = OrderedDict()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(consume, queues))
+
+
+# Dispatchers by DISPATCH_BACKEND name
+DISPATCHERS = {
+    "lambda": LambdaDispatcher,
+    "sqs": SQSDispatcher,
+    "memory": InMemoryDispatcher,
+}
+
+# Lazy initialize the dispatcher
+dispatcher = None
+
+
+def get_dispatcher():
+    """Get the configured dispatcher, initializing it lazily on first use"""
+    global dispatcher
+    if dispatcher is None:
+        dispatcher = DISPATCHERS[DISPATCH_BACKEND]()
+    return dispatcher
+
+
+def dispatch_event(event, body):
+    """Hand an event to the worker through the configured dispatcher, and report the backlog"""
+    ordering_key = get_ordering_key(body)
+    dedupe_id = body.get("event_id") or body.get("event", {}).get("ts", "")
+    active_dispatcher = get_dispatcher()
+    active_dispatcher.dispatch(event, ordering_key, dedupe_id)
+
+    # A failed metric shouldn't fail the dispatch
+    try:
+        depth = active_dispatcher.backlog_depth()
+    except Exception as e:
+        print(f"Error reading dispatch backlog depth: {str(e)}")
+        return
+    if depth is not None:
+        print(f"🟢 Dispatch backlog depth: {depth}")
+        put_backlog_metric(depth)
+
+
 # Lambda handler
 def lambda_handler(event, context):
     """
-    Receives Slack events, performs basic validation, and asynchronously invokes the processor Lambda
+    Receives Slack events, performs basic validation, and dispatches them to the processor Lambda
     """
     print(f"🟡 Received event: {json.dumps(event)}")
 
     try:
         # Read environment variables
-        PROCESSOR_FUNCTION_NAME = os.environ.get("PROCESSOR_FUNCTION_NAME")
         SLACK_BOT_ID = os.environ.get("SLACK_BOT_ID")
 
         # Parse the event body
@@ -114,13 +299,8 @@ def lambda_handler(event, context):
             print(f"🟢 Processing event type: {event_type}")
             print(f"🟢 Processing event subtype: {event_subtype}")
 
-            # Asynchronously invoke the processor Lambda
-            client = get_lambda_client()
-            client.invoke(
-                FunctionName=PROCESSOR_FUNCTION_NAME,
-                InvocationType="Event",  # Async invocation
-                Payload=json.dumps(event),
-            )
+            # Hand off to the worker, by direct async invoke or through a queue
+            dispatch_event(event, body)
 
         # Always return 200 OK to Slack quickly
         return {"statusCode": 200, "body": json.dumps({"message": "Event received"})}
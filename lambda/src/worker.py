@@ -8,27 +8,65 @@ from slack_bolt.adapter.aws_lambda import SlackRequestHandler
 # Import all constants and configuration
 from worker_inputs import *
 
+# Ensure AWS region is set for the retrieve tool (knowledge base is in bedrock_region)
+# Set once at startup, before any thread builds boto3 clients
+os.environ["AWS_DEFAULT_REGION"] = bedrock_region
+os.environ["AWS_REGION"] = bedrock_region
 
 ###
 # Local imports
+# Strands, MCP and the agent load in the background once a request needs them, see prepare_agent_tools
 ###
 
-from worker_slack import update_slack_response, register_slack_app
-from worker_aws import (
-    get_secret_with_client,
-    create_bedrock_client,
-    ai_request,
-    enrich_guardrail_block,
-)
-from worker_agent import execute_agent
-from worker_conversation import build_conversation_content, handle_message_event
-from worker_lambda import isolate_event_body, generate_response
+from worker_slack import register_slack_app
+from worker_aws import get_secret_with_client, create_bedrock_client
+from worker_conversation import handle_message_event
+from worker_lambda import isolate_event_body, verify_queued_event
+from worker_deadline import Deadline
+from worker_metrics import start_request_metrics
+from worker_warmup import run_warmup, get_warm_secrets
+
+# Warm up during Lambda INIT, before the first request arrives
+if "AWS_LAMBDA_FUNCTION_NAME" in os.environ:
+    run_warmup()
 
 
 def lambda_handler(event, context):
+    # Events dispatched through the SQS queue arrive in batches, each record is one event from the receiver
+    if "Records" in event:
+        return handle_queue_batch(event, context)
+    return handle_slack_event(event, context)
+
+
+def handle_queue_batch(event, context):
+    """Process a batch of queued events in order, reporting failures so only they are retried"""
+    batch_item_failures = []
+    for record in event["Records"]:
+        # Once a record fails, later records in the batch are retried too, so a thread's order is kept
+        if batch_item_failures:
+            batch_item_failures.append({"itemIdentifier": record["messageId"]})
+            continue
+        try:
+            # SentTimestamp is when the receiver queued the event, in milliseconds
+            queued_at = int(record["attributes"]["SentTimestamp"]) / 1000
+            handle_slack_event(json.loads(record["body"]), context, queued_at)
+        except Exception as error:
+            print(f"🚀 Error processing queued event {record['messageId']}: {error}")
+            batch_item_failures.append({"itemIdentifier": record["messageId"]})
+    return {"batchItemFailures": batch_item_failures}
+
+
+def handle_slack_event(event, context, queued_at=None):
+    """Handle one Slack event, queued_at is set for events that waited in the dispatch queue"""
 
     print("🚀 Lambda execution starting")
 
+    # Every stage of this request checks the same deadline, taken from the Lambda's remaining time
+    deadline = Deadline.from_lambda_context(context)
+
+    # Collect per-phase timings for this request, emitted as CloudWatch EMF when the request finishes
+    metrics = start_request_metrics()
+
     # Isolate body
     event_body = isolate_event_body(event)
 
@@ -39,18 +77,29 @@ def lambda_handler(event, context):
     if debug_enabled == "True":
         print("🚀 Event body:", event_body)
 
-    # Fetch secret package
-    secrets = get_secret_with_client(os.environ.get("SECRET_NAME"), "us-east-1")
+    # Fetch secret package, unless warmup fetched it recently
+    with metrics.timed("secret_fetch"):
+        secrets = get_warm_secrets() or get_secret_with_client(
+            os.environ.get("SECRET_NAME"), "us-east-1"
+        )
 
     # Decode, fetch token
     secrets_json = json.loads(secrets)
     token = secrets_json["SLACK_BOT_TOKEN"]
 
+    # Queued events may be older than Bolt allows, verify them here and skip Bolt's check
+    # A failure raises, so the record is retried and not acknowledged as handled
+    if queued_at is not None:
+        verify_queued_event(event, queued_at, secrets_json["SLACK_SIGNING_SECRET"])
+
     # Register the Slack handler
     print("🚀 Registering the Slack handler")
-    app, registered_bot_id = register_slack_app(
-        token, secrets_json["SLACK_SIGNING_SECRET"]
-    )
+    with metrics.timed("slack_app_registration"):
+        app, registered_bot_id = register_slack_app(
+            token,
+            secrets_json["SLACK_SIGNING_SECRET"],
+            request_verification_enabled=queued_at is None,
+        )
 
     # Register the AWS Bedrock AI client
     print("🚀 Registering the AWS Bedrock client")
@@ -70,6 +119,7 @@ def lambda_handler(event, context):
             token,
             registered_bot_id,
             secrets_json,
+            deadline,
         )
 
     # Respond to file share events
@@ -86,9 +136,14 @@ def lambda_handler(event, context):
             token,
             registered_bot_id,
             secrets_json,
+            deadline,
         )
 
     # Initialize the handler
     print("🚀 Initializing the handler")
     slack_handler = SlackRequestHandler(app=app)
-    return slack_handler.handle(event, context)
+    try:
+        return slack_handler.handle(event, context)
+    finally:
+        # Emit the request's metrics
+        metrics.flush()
@@ -1,62 +1,132 @@
 # Agent execution functions
-import os
-from mcp.client.streamable_http import streamablehttp_client
+import json
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from strands import Agent
-from strands.tools.mcp.mcp_client import MCPClient
-from strands.models import BedrockModel
-from strands.types.tools import AgentTool
+from worker_tool_budget import ToolResultBudget
+from worker_tool_cache import ToolResultCache, get_tool_cache_stats
+from worker_tool_executor import BackendCappedToolExecutor
+from worker_deadline import Deadline
+from worker_deadline_hook import DeadlineHook
+from worker_backend_governor import BackendGovernorHook
+from worker_metrics import RequestMetrics, get_request_metrics, timed
+from worker_metrics_hook import AgentMetricsHook
+from worker_bedrock import is_capacity_error
+from worker_bedrock_model import FailoverBedrockModel
+from worker_answer_cache import store_answer
+from worker_retrieve_cache import CachedRetrieve, get_retrieve_cache_stats
+from worker_prompt import build_system_prompt
+from worker_session_store import save_thread_session
 from worker_inputs import (
     model_id,
     guardrailIdentifier,
     guardrailTracing,
     guardrailVersion,
     token_budget,
-    system_prompt,
     enable_pagerduty_mcp,
     enable_github_mcp,
     enable_atlassian_mcp,
     enable_azure_mcp,
     enable_aws_cli_mcp,
     pagerduty_api_url,
+    enable_tool_cache,
+    enable_retrieve_cache,
+    bot_name,
+    server_mcp_refresh_seconds,
 )
 
+# MCP startup timeouts, backends are skipped if the deadline doesn't leave time to start them
+MCP_STARTUP_TIMEOUT_SECONDS = {"Atlassian": 60}
+DEFAULT_MCP_STARTUP_TIMEOUT_SECONDS = 30
 
-def execute_agent(secrets_json, conversation):
-    """Execute agent with MCP clients - keeps clients open during execution"""
+# Consumer ID that keeps warm MCP clients open between agents, each agent removes only its own ID when it's cleaned up
+WARM_TOOLS_CONSUMER = "warm_agent_tools"
+
+# MCP clients shared by every request in the long-running server. On Lambda each request starts and stops its own
+warm_agent_tools = {"enabled": False, "agent_tools": None, "started_at": 0.0}
+warm_agent_tools_lock = threading.Lock()
+
+
+def mcp_startup_allowed(backend, deadline):
+    """Check the deadline leaves time to start an MCP backend"""
+    startup_timeout = MCP_STARTUP_TIMEOUT_SECONDS.get(
+        backend, DEFAULT_MCP_STARTUP_TIMEOUT_SECONDS
+    )
+    if deadline.has_time_for(startup_timeout):
+        return True
+    print(
+        f"🚀 Skipping {backend} MCP startup, only {deadline.remaining():.0f}s left before the deadline"
+    )
+    return False
+
+
+def start_mcp_client(backend, mcp_client):
+    """Start an MCP client and load its tools, so each backend's startup is timed on its own"""
+    with timed("mcp_startup", Backend=backend):
+        asyncio.run(mcp_client.load_tools())
+
+
+def deadline_fallback_response(agent):
+    """Build an answer from whatever the agent had written when the deadline hit"""
+    for message in reversed(agent.messages):
+        if message["role"] != "assistant":
+            continue
+        text = "".join(block.get("text", "") for block in message["content"])
+        if text.strip():
+            return f"{text}\n\n_{bot_name} ran out of time before finishing, so this answer may be incomplete._"
+    return f"⏱️ {bot_name} ran out of time before finding an answer. Please try a narrower question."
+
+
+def start_agent_tools(secrets_json, deadline):
+    """Start MCP clients and collect tools
+
+    Independent of the conversation, so it can run in its own thread while the conversation is assembled
+    Returns (tools, opened_clients, tool_prefixes, read_only_prefixes)
+    """
 
     # Set up MCP clients and collect tools (opens connections)
-    # Ensure AWS region is set for retrieve tool (knowledge base is in us-west-2)
-    bedrock_region = os.environ.get("BEDROCK_REGION", "us-west-2")
-    os.environ["AWS_DEFAULT_REGION"] = bedrock_region
-    os.environ["AWS_REGION"] = bedrock_region
 
     ###
     # MCP section
     ###
 
-    # Initialize tools list and opened_clients dictionary
+    # Initialize tools list, opened_clients, tool_prefixes and read_only_prefixes dictionaries
     tools = []
     opened_clients = {}
+    tool_prefixes = {}
+    read_only_prefixes = {}
 
-    # Built-in tools
-    from strands_tools import calculator, current_time, retrieve
+    # Built-in tools, the knowledge base retrieve tool is added per conversation in execute_agent
+    from strands_tools import calculator, current_time
 
-    tools.extend([calculator, current_time, retrieve])
+    tools.extend([calculator, current_time])
 
     ##
     # GitHub MCP
     ##
 
-    if enable_github_mcp:
+    if enable_github_mcp and mcp_startup_allowed("GitHub", deadline):
 
         try:
-            from worker_mcp_github import build_github_mcp_client
+            from worker_mcp_github import (
+                build_github_mcp_client,
+                TOOLS_PREFIX as GITHUB_TOOLS_PREFIX,
+                READ_ONLY_PREFIXES as GITHUB_READ_ONLY_PREFIXES,
+            )
 
             # Build GitHub MCP client with only read-only tools
             github_mcp_client = build_github_mcp_client(
                 secrets_json["GITHUB_TOKEN"], "read_only"
             )
+            start_mcp_client("GitHub", github_mcp_client)
             opened_clients["GitHub"] = github_mcp_client
+            tool_prefixes["GitHub"] = GITHUB_TOOLS_PREFIX
+            read_only_prefixes["GitHub"] = [
+                f"{GITHUB_TOOLS_PREFIX}_{prefix}"
+                for prefix in GITHUB_READ_ONLY_PREFIXES
+            ]
             tools.append(github_mcp_client)
         except Exception as error:
             print(f"Error setting up GitHub MCP client: {str(error)}")
@@ -65,9 +135,13 @@ def execute_agent(secrets_json, conversation):
     # Atlassian MCP
     ##
 
-    if enable_atlassian_mcp:
+    if enable_atlassian_mcp and mcp_startup_allowed("Atlassian", deadline):
         try:
-            from worker_mcp_atlassian import build_atlassian_mcp_client
+            from worker_mcp_atlassian import (
+                build_atlassian_mcp_client,
+                TOOLS_PREFIX as ATLASSIAN_TOOLS_PREFIX,
+                READ_ONLY_PREFIXES as ATLASSIAN_READ_ONLY_PREFIXES,
+            )
 
             # Build Atlassian MCP client with only read-only tools
             atlassian_mcp_client = build_atlassian_mcp_client(
@@ -75,7 +149,13 @@ def execute_agent(secrets_json, conversation):
                 secrets_json["ATLASSIAN_CLIENT_ID"],
                 "read_only",
             )
+            start_mcp_client("Atlassian", atlassian_mcp_client)
             opened_clients["Atlassian"] = atlassian_mcp_client
+            tool_prefixes["Atlassian"] = ATLASSIAN_TOOLS_PREFIX
+            read_only_prefixes["Atlassian"] = [
+                f"{ATLASSIAN_TOOLS_PREFIX}_{prefix}"
+                for prefix in ATLASSIAN_READ_ONLY_PREFIXES
+            ]
             tools.append(atlassian_mcp_client)
         except Exception as error:
             print(f"Error setting up Atlassian MCP client: {str(error)}")
@@ -84,10 +164,14 @@ def execute_agent(secrets_json, conversation):
     # PagerDuty MCP
     ##
 
-    if enable_pagerduty_mcp:
+    if enable_pagerduty_mcp and mcp_startup_allowed("PagerDuty", deadline):
 
         try:
-            from worker_mcp_pagerduty import build_pagerduty_mcp_client
+            from worker_mcp_pagerduty import (
+                build_pagerduty_mcp_client,
+                TOOLS_PREFIX as PAGERDUTY_TOOLS_PREFIX,
+                READ_ONLY_PREFIXES as PAGERDUTY_READ_ONLY_PREFIXES,
+            )
 
             # Build PagerDuty MCP client with only read-only tools
             pagerduty_mcp_client = build_pagerduty_mcp_client(
@@ -95,7 +179,13 @@ def execute_agent(secrets_json, conversation):
                 pagerduty_api_url,
                 "read_only",
             )
+            start_mcp_client("PagerDuty", pagerduty_mcp_client)
             opened_clients["PagerDuty"] = pagerduty_mcp_client
+            tool_prefixes["PagerDuty"] = PAGERDUTY_TOOLS_PREFIX
+            read_only_prefixes["PagerDuty"] = [
+                f"{PAGERDUTY_TOOLS_PREFIX}_{prefix}"
+                for prefix in PAGERDUTY_READ_ONLY_PREFIXES
+            ]
             tools.append(pagerduty_mcp_client)
         except Exception as error:
             print(f"Error setting up PagerDuty MCP client: {str(error)}")
@@ -104,9 +194,12 @@ def execute_agent(secrets_json, conversation):
     # Azure MCP
     ##
 
-    if enable_azure_mcp:
+    if enable_azure_mcp and mcp_startup_allowed("Azure", deadline):
         try:
-            from worker_mcp_azure import build_azure_mcp_client
+            from worker_mcp_azure import (
+                build_azure_mcp_client,
+                TOOLS_PREFIX as AZURE_TOOLS_PREFIX,
+            )
 
             # Build Azure MCP client
             azure_mcp_client = build_azure_mcp_client(
@@ -114,7 +207,9 @@ def execute_agent(secrets_json, conversation):
                 secrets_json["AZURE_CLIENT_ID"],
                 secrets_json["AZURE_CLIENT_SECRET"],
             )
+            start_mcp_client("Azure", azure_mcp_client)
             opened_clients["Azure"] = azure_mcp_client
+            tool_prefixes["Azure"] = AZURE_TOOLS_PREFIX
             tools.append(azure_mcp_client)
         except Exception as error:
             print(f"Error setting up Azure MCP client: {str(error)}")
@@ -123,26 +218,186 @@ def execute_agent(secrets_json, conversation):
     # AWS CLI MCP
     ##
 
-    if enable_aws_cli_mcp:
+    if enable_aws_cli_mcp and mcp_startup_allowed("AWS_CLI", deadline):
         try:
-            from worker_mcp_aws_cli import build_aws_cli_mcp_client
+            from worker_mcp_aws_cli import (
+                build_aws_cli_mcp_client,
+                TOOLS_PREFIX as AWS_CLI_TOOLS_PREFIX,
+            )
 
             # Build AWS CLI MCP client
             aws_cli_mcp_client = build_aws_cli_mcp_client(
                 aws_region="us-east-1",
             )
+            start_mcp_client("AWS_CLI", aws_cli_mcp_client)
             opened_clients["AWS_CLI"] = aws_cli_mcp_client
+            tool_prefixes["AWS_CLI"] = AWS_CLI_TOOLS_PREFIX
             tools.append(aws_cli_mcp_client)
         except Exception as error:
             print(f"Error setting up AWS CLI MCP client: {str(error)}")
 
+    return tools, opened_clients, tool_prefixes, read_only_prefixes
+
+
+def stop_agent_tools(agent_tools):
+    """Stop MCP clients started by start_agent_tools, for requests that end before the agent runs"""
+    # Warm clients are shared with other requests, they stay open
+    if warm_agent_tools["enabled"]:
+        return
+    tools, opened_clients, tool_prefixes, read_only_prefixes = agent_tools
+    for backend, mcp_client in opened_clients.items():
+        try:
+            mcp_client.stop(None, None, None)
+        except Exception as error:
+            print(f"Error stopping {backend} MCP client: {str(error)}")
+
+
+###
+# Warm MCP clients
+###
+
+
+def enable_warm_agent_tools():
+    """Keep MCP clients open across requests, for the long-running server"""
+    warm_agent_tools["enabled"] = True
+
+
+def release_warm_agent_tools():
+    """Let go of the warm MCP clients, each stops once the agents still using it are cleaned up"""
+    with warm_agent_tools_lock:
+        if warm_agent_tools["agent_tools"] is None:
+            return
+        tools, opened_clients, tool_prefixes, read_only_prefixes = warm_agent_tools[
+            "agent_tools"
+        ]
+        warm_agent_tools["agent_tools"] = None
+
+    for backend, mcp_client in opened_clients.items():
+        try:
+            mcp_client.remove_consumer(WARM_TOOLS_CONSUMER)
+        except Exception as error:
+            print(f"Error stopping {backend} MCP client: {str(error)}")
+
+
+def get_agent_tools(secrets_json, deadline):
+    """Start MCP clients for a request, or share the warm ones when the long-running server turned them on"""
+    if not warm_agent_tools["enabled"]:
+        return start_agent_tools(secrets_json, deadline)
+
+    # Restart warm clients once they're old enough for backend tokens to expire
+    if (
+        warm_agent_tools["agent_tools"] is not None
+        and time.time() - warm_agent_tools["started_at"] > server_mcp_refresh_seconds
+    ):
+        print("🚀 Refreshing warm MCP clients")
+        release_warm_agent_tools()
+
+    with warm_agent_tools_lock:
+        if warm_agent_tools["agent_tools"] is None:
+            # Started with a full deadline, a request that's nearly out of time shouldn't leave backends out for everyone
+            agent_tools = start_agent_tools(
+                secrets_json, Deadline.from_lambda_context(None)
+            )
+            for mcp_client in agent_tools[1].values():
+                mcp_client.add_consumer(WARM_TOOLS_CONSUMER)
+            warm_agent_tools["agent_tools"] = agent_tools
+            warm_agent_tools["started_at"] = time.time()
+            print(f"🚀 Started warm MCP clients: {', '.join(agent_tools[1]) or 'none'}")
+
+        tools, opened_clients, tool_prefixes, read_only_prefixes = warm_agent_tools[
+            "agent_tools"
+        ]
+
+    # Each request adds its own per-conversation tools to the list, so it gets a copy
+    return list(tools), opened_clients, tool_prefixes, read_only_prefixes
+
+
+def execute_agent(
+    secrets_json,
+    conversation,
+    deadline=None,
+    agent_tools=None,
+    answer_cache_lookup=None,
+    thread_session=None,
+):
+    """Execute agent with MCP clients - keeps clients open during execution
+
+    agent_tools can be passed in from start_agent_tools when MCP startup was run ahead of time
+    answer_cache_lookup is passed in from an answer cache miss, so the answer can be cached
+    thread_session has the channel_id, thread_ts and answered message last_ts to save the agent's session under
+    """
+
+    # Without a deadline from the Lambda context, use the full worker timeout
+    if deadline is None:
+        deadline = Deadline.from_lambda_context(None)
+
+    # Start MCP clients here unless they were started ahead of time
+    if agent_tools is None:
+        agent_tools = get_agent_tools(secrets_json, deadline)
+    tools, opened_clients, tool_prefixes, read_only_prefixes = agent_tools
+
+    ###
+    # Knowledge base
+    ###
+
+    # Serve repeated knowledge base queries from the cross-request cache, and skip chunks the agent already has
+    cached_retrieve = None
+    if enable_retrieve_cache:
+        cached_retrieve = CachedRetrieve()
+        tools.append(cached_retrieve.tool)
+    else:
+        from strands_tools import retrieve
+
+        tools.append(retrieve)
+
+    ###
+    # Tool result budget
+    ###
+
+    # Compact oversized MCP tool results, spilled overflow is readable with a follow-up tool
+    tool_result_budget = ToolResultBudget(
+        tool_prefixes=[f"{prefix}_" for prefix in tool_prefixes.values()]
+    )
+    tools.append(tool_result_budget.overflow_tool)
+    hooks = [tool_result_budget]
+
+    # Serve repeated read-only tool calls from the cross-request cache
+    # Registered after the budget so the cache stores raw results, hook cleanup runs in reverse order
+    tool_result_cache = None
+    if enable_tool_cache:
+        tool_result_cache = ToolResultCache(read_only_prefixes)
+        hooks.append(tool_result_cache)
+
+    # Time each Bedrock turn and tool call. The agent runs in its own thread, so pass the request's metrics in
+    request_metrics = get_request_metrics() or RequestMetrics()
+    hooks.append(
+        AgentMetricsHook(
+            request_metrics,
+            {backend: f"{prefix}_" for backend, prefix in tool_prefixes.items()},
+        )
+    )
+
+    # Limit tool calls per backend across every conversation, throttled calls queue until the deadline
+    hooks.append(
+        BackendGovernorHook(
+            {backend: f"{prefix}_" for backend, prefix in tool_prefixes.items()},
+            deadline,
+            request_metrics,
+        )
+    )
+
+    # Bound tool calls by the deadline, and make the agent answer when it's close
+    # Registered last so it wraps whatever tool the other hooks selected
+    hooks.append(DeadlineHook(deadline))
+
     ###
     # Build agent
     ###
 
     # Create agent with all collected tools
     agent = Agent(
-        model=BedrockModel(
+        # Fails over to alternate inference profiles or regions when Bedrock is throttled
+        model=FailoverBedrockModel(
             model_id=model_id,
             guardrail_id=guardrailIdentifier,
             guardrail_trace=guardrailTracing,
@@ -151,12 +406,77 @@ def execute_agent(secrets_json, conversation):
                 "thinking": {"type": "enabled", "budget_tokens": token_budget}
             },
         ),
-        system_prompt=system_prompt,
+        # Only describe the MCP backends that actually started
+        # Answers that may be cached aren't addressed to the asker
+        system_prompt=build_system_prompt(
+            tool_prefixes.keys(), shared_answer=answer_cache_lookup is not None
+        ),
         tools=tools,
+        hooks=hooks,
+        # Run independent tool calls from one turn concurrently, capped per MCP backend
+        tool_executor=BackendCappedToolExecutor(
+            {backend: f"{prefix}_" for backend, prefix in tool_prefixes.items()}
+        ),
     )
 
     # Execute agent while all MCP clients remain open
-    response = agent(conversation)
+    # The agent runs in a worker thread, so a run that overshoots the deadline can't stop us answering
+    agent_pool = ThreadPoolExecutor(max_workers=1)
+    agent_future = agent_pool.submit(agent, conversation)
+    agent_pool.shutdown(wait=False)
+    try:
+        response = agent_future.result(timeout=deadline.remaining())
+    except TimeoutError:
+        print("🚀 Agent didn't finish before the deadline, answering with what it has")
+        return deadline_fallback_response(agent)
+    except Exception as error:
+        if not is_capacity_error(error):
+            raise
+        print(f"🚀 Bedrock capacity exhausted on every target: {error}")
+        return (
+            f"😔 *{bot_name} is very busy right now and couldn't get an answer from the AI model.*\n\n"
+            f"Please try again in a few minutes."
+        )
+
+    # Export tool cache hit rates
+    if tool_result_cache is not None:
+        for backend, backend_stats in tool_result_cache.request_stats.items():
+            request_metrics.put(
+                "tool_cache", "Hits", backend_stats["hits"], "Count", Backend=backend
+            )
+            request_metrics.put(
+                "tool_cache",
+                "Misses",
+                backend_stats["misses"],
+                "Count",
+                Backend=backend,
+            )
+        print("🚀 Tool cache stats:", json.dumps(get_tool_cache_stats()))
+
+    # Export retrieve cache hit rates
+    if cached_retrieve is not None:
+        request_metrics.put(
+            "retrieve_cache", "Hits", cached_retrieve.request_stats["hits"], "Count"
+        )
+        request_metrics.put(
+            "retrieve_cache", "Misses", cached_retrieve.request_stats["misses"], "Count"
+        )
+        print("🚀 Retrieve cache stats:", json.dumps(get_retrieve_cache_stats()))
 
     # Extract text from AgentResult object
-    return str(response)
+    response_text = str(response)
+
+    # Cache the answer for similar questions, if it was grounded in the knowledge base and the guardrail didn't intervene
+    if answer_cache_lookup is not None:
+        store_answer(
+            answer_cache_lookup,
+            response_text,
+            agent.event_loop_metrics.tool_metrics.keys(),
+            response.stop_reason,
+        )
+
+    # Save the full message history, tool calls included, for follow-ups in this thread
+    if thread_session is not None:
+        save_thread_session(messages=agent.messages, **thread_session)
+
+    return response_text
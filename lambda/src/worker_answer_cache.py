@@ -0,0 +1,251 @@
+# Answer cache for repeated questions
+# Many questions are near duplicates ("how do I request VPN access"), and each one is a full agent run
+# Answers to single-message questions that were grounded in the knowledge base, and used no other tools, are cached
+# by question embedding, and reused for new questions similar enough to a cached one
+# Cached answers are served to other people, so they're generated without addressing the asker, and answers that
+# still name the asker, or that the guardrail intervened in, aren't cached
+# Lives at module level so it's shared across requests served by a warm container
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+import boto3
+from worker_bedrock import get_bedrock_client
+from worker_inputs import (
+    debug_enabled,
+    bedrock_region,
+    knowledge_base_id,
+    knowledge_base_version,
+    answer_cache_embedder,
+    answer_cache_embedding_model_id,
+    answer_cache_similarity_threshold,
+    answer_cache_ttl_seconds,
+    answer_cache_max_entries,
+    answer_cache_kb_version_check_seconds,
+)
+
+# Tools an answer may have used and still be cached, anything else may depend on live data or the asker
+# Answers that used none of these aren't grounded in the knowledge base, so aren't cached either
+CACHEABLE_TOOLS = {"retrieve"}
+
+# Agent stop reason for a complete answer, anything else (e.g. guardrail_intervened) isn't cached
+CACHEABLE_STOP_REASON = "end_turn"
+
+# Added to answers served from the cache
+CACHED_ANSWER_NOTE = "_This answer was reused from a recent, similar question._"
+
+# Cached answers, oldest first
+answer_cache = []
+answer_cache_lock = threading.Lock()
+
+# Knowledge base version, and when it was last checked
+knowledge_base_version_state = {"version": None, "checked_at": 0.0}
+
+
+class LocalHashEmbedder:
+    """Deterministic embedder with no API calls, hashes words and character trigrams into a fixed size vector
+
+    Only matches near-identical wording, used for tests and local development
+    """
+
+    def __init__(self, dimensions=512):
+        self.dimensions = dimensions
+
+    def embed(self, text):
+        vector = [0.0] * self.dimensions
+        words = text.split()
+        features = words + [
+            f"#{word[i : i + 3]}" for word in words for i in range(len(word) - 2)
+        ]
+        for feature in features:
+            digest = hashlib.md5(feature.encode()).digest()
+            index = int.from_bytes(digest[:4], "big") % self.dimensions
+            vector[index] += 1.0 if digest[4] % 2 == 0 else -1.0
+        return vector
+
+
+class BedrockEmbedder:
+    """Embeds text with a Bedrock Titan embeddings model"""
+
+    def __init__(
+        self, model_id=answer_cache_embedding_model_id, region_name=bedrock_region
+    ):
+        self.model_id = model_id
+        self.region_name = region_name
+
+    def embed(self, text):
+        response = get_bedrock_client(self.region_name).invoke_model(
+            modelId=self.model_id,
+            body=json.dumps({"inputText": text, "normalize": True}),
+        )
+        return json.loads(response["body"].read())["embedding"]
+
+
+# Embedders by ANSWER_CACHE_EMBEDDER name
+EMBEDDERS = {"bedrock": BedrockEmbedder, "local": LocalHashEmbedder}
+embedder_state = {"embedder": None, "loaded": False}
+embedder_lock = threading.Lock()
+
+
+def get_embedder():
+    """Get the configured embedder on first use, or None if ANSWER_CACHE_EMBEDDER isn't a known embedder"""
+    with embedder_lock:
+        if not embedder_state["loaded"]:
+            embedder_state["loaded"] = True
+            if answer_cache_embedder in EMBEDDERS:
+                embedder_state["embedder"] = EMBEDDERS[answer_cache_embedder]()
+            else:
+                print(
+                    f"🚀 Unknown answer cache embedder {answer_cache_embedder}, expected one of "
+                    f"{', '.join(EMBEDDERS)}. The answer cache is disabled"
+                )
+        return embedder_state["embedder"]
+
+
+def normalize_question(text):
+    """Lowercase and strip Slack mentions, punctuation and extra whitespace"""
+    text = re.sub(r"<[@#!][^>]*>", " ", text.lower())
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def cosine_similarity(first, second):
+    dot = sum(a * b for a, b in zip(first, second))
+    norms = math.sqrt(sum(a * a for a in first)) * math.sqrt(sum(b * b for b in second))
+    return dot / norms if norms else 0.0
+
+
+def fetch_knowledge_base_version():
+    """Latest completed ingestion job of each knowledge base data source, so a sync expires cached answers"""
+    bedrock_agent_client = boto3.client("bedrock-agent", region_name=bedrock_region)
+    data_sources = bedrock_agent_client.list_data_sources(
+        knowledgeBaseId=knowledge_base_id
+    )["dataSourceSummaries"]
+
+    job_ids = []
+    for data_source in data_sources:
+        ingestion_jobs = bedrock_agent_client.list_ingestion_jobs(
+            knowledgeBaseId=knowledge_base_id,
+            dataSourceId=data_source["dataSourceId"],
+            filters=[{"attribute": "STATUS", "operator": "EQ", "values": ["COMPLETE"]}],
+            sortBy={"attribute": "STARTED_AT", "order": "DESCENDING"},
+            maxResults=1,
+        )["ingestionJobSummaries"]
+        job_ids.extend(job["ingestionJobId"] for job in ingestion_jobs)
+    return ",".join(sorted(job_ids))
+
+
+def get_knowledge_base_version():
+    """Current knowledge base version, re-checked every few minutes. None if it can't be found"""
+    if knowledge_base_version:
+        return knowledge_base_version
+    if not knowledge_base_id:
+        return None
+
+    now = time.time()
+    if (
+        now - knowledge_base_version_state["checked_at"]
+        > answer_cache_kb_version_check_seconds
+    ):
+        try:
+            knowledge_base_version_state["version"] = fetch_knowledge_base_version()
+        except Exception as error:
+            # TTL still expires answers if the version can't be found
+            print(f"🚀 Error checking knowledge base version: {error}")
+            knowledge_base_version_state["version"] = None
+        knowledge_base_version_state["checked_at"] = now
+    return knowledge_base_version_state["version"]
+
+
+def answer_cache_eligible(event):
+    """Only single-message questions with plain text, outside of threads, are cached"""
+    return (
+        "thread_ts" not in event
+        and not event.get("files")
+        and not event.get("attachments")
+        and normalize_question(event.get("text", "")) != ""
+    )
+
+
+def find_cached_answer(question):
+    """Look for a cached answer to a similar question
+
+    Returns (answer, lookup). answer is None on a miss, and lookup is passed to store_answer once the agent answers
+    lookup is None too when the answer cache is disabled by an unknown embedder
+    """
+    embedder = get_embedder()
+    if embedder is None:
+        return None, None
+
+    lookup = {
+        "question": normalize_question(question),
+        "embedding": None,
+        "kb_version": get_knowledge_base_version(),
+        "asker_name": None,
+    }
+    try:
+        lookup["embedding"] = embedder.embed(lookup["question"])
+    except Exception as error:
+        print(f"🚀 Error embedding question for the answer cache: {error}")
+        return None, lookup
+
+    now = time.time()
+    with answer_cache_lock:
+        # Drop expired answers, and answers from an older knowledge base
+        answer_cache[:] = [
+            entry
+            for entry in answer_cache
+            if entry["expires_at"] > now and entry["kb_version"] == lookup["kb_version"]
+        ]
+
+        best_entry = None
+        best_similarity = answer_cache_similarity_threshold
+        for entry in answer_cache:
+            similarity = cosine_similarity(lookup["embedding"], entry["embedding"])
+            if similarity >= best_similarity:
+                best_entry, best_similarity = entry, similarity
+
+    if best_entry is None:
+        return None, lookup
+
+    print(f"🚀 Answer cache hit, similarity {best_similarity:.3f}")
+    if debug_enabled == "True":
+        print(
+            f"🚀 Answer cache matched '{lookup['question']}' to '{best_entry['question']}'"
+        )
+    return f"{best_entry['answer']}\n\n{CACHED_ANSWER_NOTE}", lookup
+
+
+def answer_cacheable(lookup, answer, tools_used, stop_reason):
+    """Only complete answers grounded in the knowledge base, that don't name the asker, are cached"""
+    tools_used = set(tools_used)
+    if lookup["embedding"] is None or stop_reason != CACHEABLE_STOP_REASON:
+        return False
+    if not tools_used or not tools_used <= CACHEABLE_TOOLS:
+        return False
+    asker_name = lookup.get("asker_name")
+    return not (asker_name and asker_name.lower() in answer.lower())
+
+
+def store_answer(lookup, answer, tools_used, stop_reason):
+    """Cache an agent's answer, if answer_cacheable allows it"""
+    if not answer_cacheable(lookup, answer, tools_used, stop_reason):
+        if debug_enabled == "True":
+            print(
+                f"🚀 Answer not cached, stop reason {stop_reason}, tools {list(tools_used)}"
+            )
+        return
+
+    with answer_cache_lock:
+        answer_cache.append(
+            {
+                "question": lookup["question"],
+                "embedding": lookup["embedding"],
+                "kb_version": lookup["kb_version"],
+                "answer": answer,
+                "expires_at": time.time() + answer_cache_ttl_seconds,
+            }
+        )
+        del answer_cache[:-answer_cache_max_entries]
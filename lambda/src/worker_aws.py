@@ -3,7 +3,17 @@ import os
 import boto3
 import requests
 from worker_inputs import debug_enabled, bot_name
-from worker_mcp_github import *
+from worker_metrics import timed
+
+# Guardrail assessment policies, and the list of matched entries in each
+GUARDRAIL_POLICY_ENTRIES = [
+    ("topicPolicy", "topics"),
+    ("contentPolicy", "filters"),
+    ("wordPolicy", "customWords"),
+    ("wordPolicy", "managedWordLists"),
+    ("sensitiveInformationPolicy", "piiEntities"),
+    ("sensitiveInformationPolicy", "regexes"),
+]
 
 
 def get_secret_with_client(secret_name, region_name):
@@ -30,7 +40,10 @@ def get_secret_with_client(secret_name, region_name):
 
 
 def create_bedrock_client(region_name):
-    return boto3.client("bedrock-runtime", region_name=region_name)
+    from worker_bedrock import get_bedrock_client
+
+    # Shared client, so the adaptive rate limiter covers every request in the container
+    return get_bedrock_client(region_name)
 
 
 def ai_request(
@@ -53,6 +66,7 @@ def ai_request(
         guardrailTracing,
     )
     from worker_slack import update_slack_response
+    from worker_bedrock import converse_with_failover
 
     # Format model system prompt for the request
     system = [{"text": system_prompt}]
@@ -98,8 +112,8 @@ def ai_request(
     # Catch any exceptions and return an error message
     try:
 
-        # Request entire body response
-        response_raw = bedrock_client.converse(**converse_body)
+        # Request entire body response, failing over to alternate targets if throttled
+        response_raw = converse_with_failover(bedrock_client, converse_body)
 
         # Check for empty response
         if not response_raw.get("output", {}).get("message", {}).get("content", []):
@@ -138,89 +152,118 @@ def ai_request(
         )
 
 
-def enrich_guardrail_block(response, full_event_payload):
+def find_guardrail_assessments(full_event_payload):
+    """Collect this guardrail's input and output assessments from Converse events"""
     from worker_inputs import guardrailIdentifier
-    import os
-
-    if debug_enabled == "True":
-        print("🚀 Full event payload:", full_event_payload)
 
-    # Check if the trace.guardrail.inputAssessment.4raioni9cwpe.contentPolicy.filters[0] path exists
+    assessments = []
     for event in full_event_payload:
-        try:
-            # If we're blocked by conent policy, this will be present
-            try:
-                # Try input assessment
-                guardrail_trace = event["metadata"]["trace"]["guardrail"][
-                    "inputAssessment"
-                ][guardrailIdentifier]["contentPolicy"]["filters"][0]
-            except:
-                # Try output assessment
-                guardrail_trace = event["metadata"]["trace"]["guardrail"][
-                    "outputAssessment"
-                ][guardrailIdentifier]["contentPolicy"]["filters"][0]
-
-            # Set vars to values
-            guardrail_type = guardrail_trace.get("type")
-            guardrail_confidence = guardrail_trace.get("confidence")
-            guardrail_filter_strength = guardrail_trace.get("filterStrength")
+        guardrail_trace = (
+            event.get("metadata", {}).get("trace", {}).get("guardrail", {})
+        )
+
+        # Input assessments are keyed by guardrail ID, output assessments are a list per guardrail ID
+        input_assessment = guardrail_trace.get("inputAssessment", {}).get(
+            guardrailIdentifier
+        )
+        if input_assessment:
+            assessments.append(input_assessment)
+        assessments.extend(
+            guardrail_trace.get("outputAssessments", {}).get(guardrailIdentifier, [])
+        )
+    return assessments
+
+
+def format_guardrail_block(response, assessments):
+    """Format a guardrail block for Slack, enriched with the first content or topic policy that matched"""
+    for assessment in assessments:
+        # If we're blocked by content policy, this will be present
+        content_filters = assessment.get("contentPolicy", {}).get("filters", [])
+        if content_filters:
+            guardrail_trace = content_filters[0]
 
             # Enrich blocked message with guardrail trace info
-            response = (
+            return (
                 f"🛑 *Our security guardrail blocked this conversation*\n"
                 f"> {response}\n\n"
-                f"• *Guardrail blocked type:* {guardrail_type}\n"
-                f"• *Strength our guardrail config is set to:* {guardrail_filter_strength}\n"
-                f"• *Confidence this conversation breaks the rules:* {guardrail_confidence}\n\n"
+                f"• *Guardrail blocked type:* {guardrail_trace.get('type')}\n"
+                f"• *Strength our guardrail config is set to:* {guardrail_trace.get('filterStrength')}\n"
+                f"• *Confidence this conversation breaks the rules:* {guardrail_trace.get('confidence')}\n\n"
                 f"*You can try rephrasing your question, or open a ticket with the DevOps Team to investigate*\n"
             )
 
-            # Return response
-            return response
-
-        # If didn't find in this event, continue
-        except:
-            # If the request fails, print the error
-            print(
-                f"🚀 Didn't find guardrail content policy block in this event: {event}"
-            )
-
-        # Check the event to see if we're blocked by topic policy
-        try:
-            try:
-                # Try input assessment
-                guardrail_trace = event["metadata"]["trace"]["guardrail"][
-                    "inputAssessment"
-                ][guardrailIdentifier]["topicPolicy"]["topics"][0]
-            except:
-                # Try output assessment
-                guardrail_trace = event["metadata"]["trace"]["guardrail"][
-                    "outputAssessments"
-                ][guardrailIdentifier][0]["topicPolicy"]["topics"][0]
-
-            # Extract individual values
-            guardrail_name = guardrail_trace["name"]  # 'healthcare_topic'
-
+        # If we're blocked by topic policy, this will be present
+        topics = assessment.get("topicPolicy", {}).get("topics", [])
+        if topics:
             # Enrich the response
-            response = (
+            return (
                 f"🛑 *Our security guardrail blocked this conversation based on the topic*\n"
                 f"> {response}\n"
-                f"• *Guardrail block name:* {guardrail_name}\n"
+                f"• *Guardrail block name:* {topics[0].get('name')}\n"
                 f"*You can try rephrasing your question, or open a ticket with DevOps to investigate*"
             )
 
-            # return response
-            return response
-
-        # If didn't find in this event, continue
-        except:
-            # If the request fails, print the error
-            print(f"🚀 Didn't find guardrail topic block in this event: {event}")
-
-    # Not configured to enrich the response with guardrail trace information, just send back response
-    response = (
+    # No content or topic policy details, just send back response
+    return (
         f"🛑 *Our security guardrail blocked this conversation*\n\n"
         f"> {response}\n\n"
         f"*You can try rephrasing your question, or open a ticket with DevOps to investigate*"
     )
-    return response
+
+
+def enrich_guardrail_block(response, full_event_payload):
+    if debug_enabled == "True":
+        print("🚀 Full event payload:", full_event_payload)
+
+    return format_guardrail_block(
+        response, find_guardrail_assessments(full_event_payload)
+    )
+
+
+def guardrail_assessment_blocked(assessment):
+    """True if any policy in a guardrail assessment blocked, rather than only masked, the content"""
+    for policy, entries in GUARDRAIL_POLICY_ENTRIES:
+        for entry in assessment.get(policy, {}).get(entries, []):
+            if entry.get("action") == "BLOCKED":
+                return True
+    return False
+
+
+def screen_with_guardrail(bedrock_client, text):
+    """Check the user's message against the guardrail before the rest of the request is paid for
+
+    Returns the formatted block message if the guardrail blocked it, otherwise None
+    """
+    from worker_inputs import guardrailIdentifier, guardrailVersion
+
+    if not text.strip():
+        return None
+
+    try:
+        with timed("guardrail_prescreen"):
+            guardrail_response = bedrock_client.apply_guardrail(
+                guardrailIdentifier=guardrailIdentifier,
+                guardrailVersion=guardrailVersion,
+                source="INPUT",
+                content=[{"text": {"text": text}}],
+            )
+    except Exception as error:
+        # The model call still applies the guardrail, so a failed pre-screen doesn't fail the request
+        print(f"🚀 Error pre-screening message with guardrail: {error}")
+        return None
+
+    # Debug
+    if debug_enabled == "True":
+        print("🚀 Guardrail pre-screen response:", guardrail_response)
+
+    assessments = guardrail_response.get("assessments", [])
+    if guardrail_response.get("action") != "GUARDRAIL_INTERVENED" or not any(
+        guardrail_assessment_blocked(assessment) for assessment in assessments
+    ):
+        return None
+
+    print("🚀 Guardrail pre-screen blocked the request")
+    blocked_text = "".join(
+        output.get("text", "") for output in guardrail_response.get("outputs", [])
+    )
+    return format_guardrail_block(blocked_text, assessments)
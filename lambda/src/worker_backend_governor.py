@@ -0,0 +1,353 @@
+# Backend concurrency and rate governor
+# Concurrent conversations each call GitHub, Atlassian and PagerDuty with no coordination, and together they trip
+# GitHub's secondary rate limits and PagerDuty 429s. Every MCP tool call first takes a concurrency slot and a rate
+# token for its backend, and calls over the limits queue until the deadline instead of failing
+# Limits are kept in a counter store, in this process by default or shared by every container through DynamoDB
+import asyncio
+import random
+import threading
+import time
+import uuid
+import boto3
+from botocore.exceptions import ClientError
+from strands.hooks import HookProvider, HookRegistry, BeforeToolCallEvent
+from strands.tools.mcp.mcp_agent_tool import MCPAgentTool
+from strands.types.tools import AgentTool
+from worker_inputs import (
+    governor_store_type,
+    governor_table_name,
+    backend_max_concurrency,
+    backend_rate_per_second,
+    backend_queue_timeout_seconds,
+    backend_slot_lease_seconds,
+    deadline_wrap_up_seconds,
+)
+
+# Longest pause between attempts while a call is queued
+MAX_QUEUE_POLL_SECONDS = 1.0
+
+
+class LocalCounterStore:
+    """Counters in this process, shared by every conversation the process handles"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Backend -> {lease_id: expires_at}
+        self.slots = {}
+        # Backend -> (tokens, updated_at)
+        self.buckets = {}
+
+    def try_acquire_slot(self, backend, limit, lease_seconds):
+        """Take a concurrency slot. Returns a lease ID, or None if every slot is taken"""
+        now = time.time()
+        with self.lock:
+            leases = self.slots.setdefault(backend, {})
+            for lease_id, expires_at in list(leases.items()):
+                if expires_at <= now:
+                    del leases[lease_id]
+            if len(leases) >= limit:
+                return None
+            lease_id = uuid.uuid4().hex
+            leases[lease_id] = now + lease_seconds
+            return lease_id
+
+    def release_slot(self, backend, lease_id):
+        with self.lock:
+            self.slots.get(backend, {}).pop(lease_id, None)
+
+    def try_take_token(self, backend, rate, burst):
+        """Take a rate token. Returns 0 if one was taken, or the seconds until one is available"""
+        now = time.time()
+        with self.lock:
+            tokens, updated_at = self.buckets.get(backend, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                self.buckets[backend] = (tokens - 1, now)
+                return 0.0
+            self.buckets[backend] = (tokens, now)
+            return (1 - tokens) / rate
+
+
+class DynamoDBCounterStore:
+    """Counters in a DynamoDB table, shared by every container
+
+    The table needs a string partition key named counter_key. Each concurrency slot is an item leased with a
+    conditional write, and each backend's token bucket is an item updated with optimistic locking
+    """
+
+    def __init__(self, table_name=governor_table_name, client=None):
+        self.table_name = table_name
+        self.client = client or boto3.client("dynamodb")
+
+    def try_acquire_slot(self, backend, limit, lease_seconds):
+        now = time.time()
+        lease_id = uuid.uuid4().hex
+        # Try slots in random order, so containers don't all contend for the first one
+        for slot in random.sample(range(limit), limit):
+            try:
+                self.client.put_item(
+                    TableName=self.table_name,
+                    Item={
+                        "counter_key": {"S": f"{backend}#slot#{slot}"},
+                        "lease_id": {"S": lease_id},
+                        "expires_at": {"N": str(now + lease_seconds)},
+                    },
+                    ConditionExpression="attribute_not_exists(counter_key) OR expires_at < :now",
+                    ExpressionAttributeValues={":now": {"N": str(now)}},
+                )
+                return f"{slot}:{lease_id}"
+            except ClientError as error:
+                if error.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+        return None
+
+    def release_slot(self, backend, lease_id):
+        slot, lease_id = lease_id.split(":", 1)
+        try:
+            self.client.delete_item(
+                TableName=self.table_name,
+                Key={"counter_key": {"S": f"{backend}#slot#{slot}"}},
+                ConditionExpression="lease_id = :lease_id",
+                ExpressionAttributeValues={":lease_id": {"S": lease_id}},
+            )
+        except ClientError as error:
+            # The lease expired and another container took the slot
+            if error.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+
+    def try_take_token(self, backend, rate, burst):
+        key = {"counter_key": {"S": f"{backend}#bucket"}}
+        item = self.client.get_item(
+            TableName=self.table_name, Key=key, ConsistentRead=True
+        ).get("Item")
+
+        now = time.time()
+        if item is None:
+            tokens = burst
+            condition = {"ConditionExpression": "attribute_not_exists(counter_key)"}
+        else:
+            previous_update = item["updated_at"]["N"]
+            tokens = min(
+                burst,
+                float(item["tokens"]["N"]) + (now - float(previous_update)) * rate,
+            )
+            condition = {
+                "ConditionExpression": "updated_at = :previous_update",
+                "ExpressionAttributeValues": {
+                    ":previous_update": {"N": previous_update}
+                },
+            }
+        if tokens < 1:
+            return (1 - tokens) / rate
+
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    **key,
+                    "tokens": {"N": str(tokens - 1)},
+                    "updated_at": {"N": str(now)},
+                },
+                **condition,
+            )
+            return 0.0
+        except ClientError as error:
+            if error.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            # Another container took a token first, check again shortly
+            return 0.05
+
+
+# Counter stores by GOVERNOR_STORE name
+COUNTER_STORES = {"local": LocalCounterStore, "dynamodb": DynamoDBCounterStore}
+counter_store = None
+counter_store_lock = threading.Lock()
+
+
+def get_counter_store():
+    """Get the configured counter store, initializing it lazily on first use"""
+    global counter_store
+    with counter_store_lock:
+        if counter_store is None:
+            counter_store = COUNTER_STORES[governor_store_type]()
+        return counter_store
+
+
+class BackendGovernor:
+    """Concurrency slot and rate token for each call to one backend"""
+
+    def __init__(self, backend, store=None):
+        self.backend = backend
+        self.store = store or get_counter_store()
+        self.max_concurrency = backend_max_concurrency[backend]
+        self.rate = backend_rate_per_second[backend]
+        self.burst = max(1.0, self.rate)
+
+    async def acquire(self, timeout_seconds):
+        """Wait for a slot and a rate token. Returns a lease ID, or None if the wait ran out
+
+        Store calls block, a DynamoDB round trip for the shared store, so they run in a worker thread and
+        don't stall the other tool calls on the executor's event loop
+        """
+        give_up_at = time.monotonic() + timeout_seconds
+        pause = 0.05
+        lease_id = None
+        try:
+            while lease_id is None:
+                lease_id = await asyncio.to_thread(
+                    self.store.try_acquire_slot,
+                    self.backend,
+                    self.max_concurrency,
+                    backend_slot_lease_seconds,
+                )
+                if lease_id is None:
+                    if time.monotonic() + pause > give_up_at:
+                        return None
+                    await asyncio.sleep(pause)
+                    pause = min(pause * 2, MAX_QUEUE_POLL_SECONDS)
+
+            while True:
+                wait_seconds = await asyncio.to_thread(
+                    self.store.try_take_token, self.backend, self.rate, self.burst
+                )
+                if wait_seconds == 0:
+                    return lease_id
+                if time.monotonic() + wait_seconds > give_up_at:
+                    self.release_soon(lease_id)
+                    return None
+                await asyncio.sleep(wait_seconds)
+        except asyncio.CancelledError:
+            if lease_id is not None:
+                self.release_soon(lease_id)
+            raise
+
+    def release(self, lease_id):
+        try:
+            self.store.release_slot(self.backend, lease_id)
+        except Exception as error:
+            # The lease expires on its own
+            print(f"🚀 Error releasing {self.backend} concurrency slot: {error}")
+
+    def release_soon(self, lease_id):
+        """Release a slot from the event loop without waiting on the store, the call runs in a worker thread"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Not on an event loop, e.g. a tool stream finalized outside one, so release it here
+            self.release(lease_id)
+            return
+        loop.run_in_executor(None, self.release, lease_id)
+
+
+# Governors by backend, shared by every conversation in this process
+backend_governors = {}
+backend_governors_lock = threading.Lock()
+
+
+def get_backend_governor(backend):
+    """Get the governor for a backend, or None if the backend isn't limited"""
+    if backend not in backend_max_concurrency or backend not in backend_rate_per_second:
+        return None
+    with backend_governors_lock:
+        if backend not in backend_governors:
+            backend_governors[backend] = BackendGovernor(backend)
+    return backend_governors[backend]
+
+
+class GovernedTool(AgentTool):
+    """Wraps an MCP tool so each call waits for its backend's governor"""
+
+    def __init__(self, tool, governor, timeout_seconds, request_metrics=None):
+        super().__init__()
+        self.tool = tool
+        self.governor = governor
+        self.timeout_seconds = timeout_seconds
+        self.request_metrics = request_metrics
+
+    @property
+    def tool_name(self):
+        return self.tool.tool_name
+
+    @property
+    def tool_spec(self):
+        return self.tool.tool_spec
+
+    @property
+    def tool_type(self):
+        return self.tool.tool_type
+
+    async def stream(self, tool_use, invocation_state, **kwargs):
+        queued_at = time.perf_counter()
+        try:
+            lease_id = await self.governor.acquire(self.timeout_seconds)
+        except Exception as error:
+            # A counter store outage shouldn't stop tool calls, run this one ungoverned
+            print(f"🚀 Error reaching the {self.governor.backend} governor: {error}")
+            async for event in self.tool.stream(tool_use, invocation_state, **kwargs):
+                yield event
+            return
+        queue_ms = round((time.perf_counter() - queued_at) * 1000, 1)
+        if self.request_metrics is not None:
+            self.request_metrics.put(
+                "backend_queue", "Duration", queue_ms, Backend=self.governor.backend
+            )
+
+        if lease_id is None:
+            print(
+                f"🚀 {self.governor.backend} busy, gave up on {self.tool_name} after {queue_ms / 1000:.0f}s"
+            )
+            # The last event is taken as the tool result
+            yield {
+                "toolUseId": tool_use["toolUseId"],
+                "status": "error",
+                "content": [
+                    {
+                        "text": f"{self.governor.backend} is busy with other requests and this call couldn't start in time. Answer with the information already gathered, or try again later."
+                    }
+                ],
+            }
+            return
+
+        try:
+            async for event in self.tool.stream(tool_use, invocation_state, **kwargs):
+                yield event
+        finally:
+            self.governor.release_soon(lease_id)
+
+
+class BackendGovernorHook(HookProvider):
+    """Routes each MCP tool call through its backend's governor"""
+
+    def __init__(self, tool_prefixes, deadline, request_metrics=None):
+        # Backend name -> tool name prefix, e.g. {"GitHub": "github_"}
+        self.tool_prefixes = tool_prefixes
+        self.deadline = deadline
+        self.request_metrics = request_metrics
+
+    def register_hooks(self, registry: HookRegistry, **kwargs) -> None:
+        registry.add_callback(BeforeToolCallEvent, self.govern_tool_call)
+
+    def backend_for_tool(self, tool_name):
+        for backend, prefix in self.tool_prefixes.items():
+            if tool_name.startswith(prefix):
+                return backend
+        return None
+
+    def govern_tool_call(self, event: BeforeToolCallEvent) -> None:
+        # Only calls that reach the backend, results served from the cache aren't governed
+        if not isinstance(event.selected_tool, MCPAgentTool):
+            return
+
+        backend = self.backend_for_tool(event.tool_use["name"])
+        governor = get_backend_governor(backend) if backend else None
+        if governor is None:
+            return
+
+        # Queue no longer than the deadline leaves for the call itself
+        timeout_seconds = min(
+            backend_queue_timeout_seconds,
+            self.deadline.remaining() - deadline_wrap_up_seconds,
+        )
+        event.selected_tool = GovernedTool(
+            event.selected_tool, governor, timeout_seconds, self.request_metrics
+        )
@@ -0,0 +1,136 @@
+# Bedrock model invocation with throttling handling
+# During incident storms Bedrock throttles us. Instead of failing, or stalling in minutes of backoff, we:
+# - Share one adaptive-retry client per region, so its client-side rate limiter covers every request in the container
+# - Keep retries bounded and jittered
+# - Fail over to alternate inference profiles or regions when the primary is throttled
+# The Strands model that fails over is in worker_bedrock_model, so the Converse path doesn't import Strands
+import random
+import threading
+import time
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from worker_inputs import (
+    bedrock_max_attempts,
+    bedrock_failover_rounds,
+    bedrock_failover_backoff_seconds,
+    bedrock_failover_targets,
+    bedrock_endpoint_url,
+    enable_guardrails,
+)
+
+# Errors that mean the target is out of capacity, and another target may still serve us
+CAPACITY_ERROR_CODES = ["ThrottlingException", "ServiceUnavailableException"]
+
+# Shared clients, region -> bedrock-runtime client
+bedrock_clients = {}
+bedrock_clients_lock = threading.Lock()
+
+
+class BedrockCapacityError(Exception):
+    """Every Bedrock target was throttled, even after bounded retries"""
+
+
+def get_bedrock_client_config():
+    """Botocore config with adaptive client-side rate limiting and bounded jittered retries"""
+    return Config(
+        retries={"mode": "adaptive", "total_max_attempts": bedrock_max_attempts},
+        read_timeout=300,  # Thinking turns can take a while to start streaming
+        user_agent_extra="strands-agents",
+    )
+
+
+def get_bedrock_client(region_name):
+    """Get the shared bedrock-runtime client for a region
+
+    Adaptive retry mode rate limits per client, so sharing the client shares the rate limiter
+    across every concurrent request in this container
+    """
+    with bedrock_clients_lock:
+        if region_name not in bedrock_clients:
+            bedrock_clients[region_name] = boto3.client(
+                "bedrock-runtime",
+                region_name=region_name,
+                config=get_bedrock_client_config(),
+                endpoint_url=bedrock_endpoint_url,
+            )
+        return bedrock_clients[region_name]
+
+
+def parse_failover_target(target, default_region):
+    """Split a model_id@region failover target, returns (model_id, region)"""
+    model_id, _, region = target.partition("@")
+    return model_id, region or default_region
+
+
+def get_failover_targets(model_id, region_name):
+    """Primary target followed by configured failover targets, as (model_id, region) pairs"""
+    targets = [(model_id, region_name)]
+    for target in bedrock_failover_targets:
+        target_model_id, target_region = parse_failover_target(target, region_name)
+
+        # Guardrails are regional, never fail over to a region where ours doesn't exist
+        if enable_guardrails and target_region != region_name:
+            print(
+                f"🚀 Skipping Bedrock failover target {target}, guardrails only exist in {region_name}"
+            )
+            continue
+
+        if (target_model_id, target_region) not in targets:
+            targets.append((target_model_id, target_region))
+    return targets
+
+
+def is_capacity_error(error):
+    """True if the error, or anything that caused it, means the Bedrock target is out of capacity"""
+    while error is not None:
+        if isinstance(error, BedrockCapacityError):
+            return True
+        if isinstance(error, ClientError):
+            if error.response.get("Error", {}).get("Code") in CAPACITY_ERROR_CODES:
+                return True
+        else:
+            # Only the agent raises Strands' throttling error, so Strands is already loaded by then
+            from strands.types.exceptions import ModelThrottledException
+
+            if isinstance(error, ModelThrottledException):
+                return True
+        error = error.__cause__
+    return False
+
+
+def failover_pause_seconds(failover_round):
+    """Full jitter backoff between failover rounds"""
+    return random.uniform(0, bedrock_failover_backoff_seconds * 2**failover_round)
+
+
+def converse_with_failover(bedrock_client, converse_body):
+    """Call Converse, failing over to alternate targets when throttled"""
+    targets = get_failover_targets(
+        converse_body["modelId"], bedrock_client.meta.region_name
+    )
+
+    for failover_round in range(bedrock_failover_rounds):
+        for target_model_id, target_region in targets:
+            # The primary uses the caller's client, failover targets use the shared client for their region
+            if (target_model_id, target_region) == targets[0]:
+                client = bedrock_client
+            else:
+                client = get_bedrock_client(target_region)
+
+            try:
+                return client.converse(**{**converse_body, "modelId": target_model_id})
+            except ClientError as error:
+                if not is_capacity_error(error):
+                    raise
+                print(
+                    f"🚀 Bedrock target {target_model_id} in {target_region} throttled, trying the next target"
+                )
+
+        # Every target throttled, pause before the next round
+        if failover_round + 1 < bedrock_failover_rounds:
+            time.sleep(failover_pause_seconds(failover_round))
+
+    raise BedrockCapacityError(
+        f"All Bedrock targets throttled: {', '.join(model for model, region in targets)}"
+    )
@@ -0,0 +1,90 @@
+# Strands model for the agent, failing over between Bedrock targets when throttled
+# Shares the clients, targets and pacing of worker_bedrock
+import asyncio
+from strands.models import BedrockModel, Model
+from worker_bedrock import (
+    BedrockCapacityError,
+    get_bedrock_client,
+    get_bedrock_client_config,
+    get_failover_targets,
+    is_capacity_error,
+    failover_pause_seconds,
+)
+from worker_inputs import bedrock_region, bedrock_failover_rounds, bedrock_endpoint_url
+
+
+class FailoverBedrockModel(Model):
+    """Strands model that fails over between Bedrock targets when throttled
+
+    Failover only happens before the first streamed event, a response is never stitched together from two targets
+    """
+
+    def __init__(self, model_id, region_name=bedrock_region, **model_config):
+        self.models = []
+        for target_model_id, target_region in get_failover_targets(
+            model_id, region_name
+        ):
+            model = BedrockModel(
+                model_id=target_model_id,
+                region_name=target_region,
+                boto_client_config=get_bedrock_client_config(),
+                endpoint_url=bedrock_endpoint_url,
+                **model_config,
+            )
+            # Use the shared client, so the adaptive rate limiter is shared with other requests
+            model.client = get_bedrock_client(target_region)
+            self.models.append(model)
+
+    @property
+    def config(self):
+        return self.models[0].config
+
+    def update_config(self, **model_config):
+        for model in self.models:
+            model.update_config(**model_config)
+
+    def get_config(self):
+        return self.models[0].get_config()
+
+    async def with_failover(self, stream_from_model):
+        """Yield events from the first target that isn't throttled"""
+        for failover_round in range(bedrock_failover_rounds):
+            for model in self.models:
+                started = False
+                try:
+                    async for event in stream_from_model(model):
+                        started = True
+                        yield event
+                    return
+                except Exception as error:
+                    # Once events have been yielded we can't switch targets
+                    if started or not is_capacity_error(error):
+                        raise
+                    print(
+                        f"🚀 Bedrock target {model.config['model_id']} in {model.client.meta.region_name} throttled, trying the next target"
+                    )
+
+            # Every target throttled, pause before the next round
+            if failover_round + 1 < bedrock_failover_rounds:
+                await asyncio.sleep(failover_pause_seconds(failover_round))
+
+        # Not a ModelThrottledException, Strands would otherwise add minutes of its own backoff
+        raise BedrockCapacityError(
+            f"All Bedrock targets throttled: {', '.join(model.config['model_id'] for model in self.models)}"
+        )
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        async for event in self.with_failover(
+            lambda model: model.stream(messages, tool_specs, system_prompt, **kwargs)
+        ):
+            yield event
+
+    async def structured_output(
+        self, output_model, prompt, system_prompt=None, **kwargs
+    ):
+        async for event in self.with_failover(
+            lambda model: model.structured_output(
+                output_model, prompt, system_prompt, **kwargs
+            )
+        ):
+            yield event
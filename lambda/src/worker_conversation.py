@@ -1,13 +1,19 @@
 # Conversation handling functions
 import os
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from worker_slack import update_slack_response, delete_slack_response
-from worker_agent import execute_agent
-from worker_aws import ai_request
-from worker_inputs import debug_enabled
+from worker_slack_scheduler import slack_scheduler
+from worker_aws import ai_request, screen_with_guardrail
+from worker_answer_cache import answer_cache_eligible, find_cached_answer
+from worker_session_store import load_thread_session, continue_thread_session
+from worker_inputs import debug_enabled, enable_guardrails, enable_answer_cache
+from worker_deadline import Deadline
+from worker_metrics import get_request_metrics, timed
 
 
-def build_conversation_content(payload, token):
+def build_conversation_content(payload, token, deadline=None):
     # Initialize unsupported file type found canary var
     unsupported_file_type_found = False
 
@@ -29,10 +35,14 @@ def build_conversation_content(payload, token):
     speaker_name = user_id  # Default speaker name if user info cannot be fetched
 
     # Fetch user information from Slack API
-    user_info = requests.get(
-        f"https://slack.com/api/users.info?user={user_id}",
-        headers={"Authorization": "Bearer " + token},
-    )
+    with timed("user_lookup"):
+        user_info = slack_scheduler.call(
+            "users.info",
+            lambda: requests.get(
+                f"https://slack.com/api/users.info?user={user_id}",
+                headers={"Authorization": "Bearer " + token},
+            ),
+        )
     user_info_json = user_info.json()
 
     # Debug
@@ -100,6 +110,13 @@ def build_conversation_content(payload, token):
             if debug_enabled == "True":
                 print("🚀 File found in payload:", file)
 
+            # Skip attachment downloads once the deadline is close, the agent needs the time to answer
+            if deadline is not None and deadline.wrapping_up():
+                print(
+                    f"🚀 Deadline close, skipping attachment download: {file['name']}"
+                )
+                continue
+
             # Isolate name of the file and remove characters before the final period
             file_name = file["name"].split(".")[0]
 
@@ -107,9 +124,10 @@ def build_conversation_content(payload, token):
             file_url = file["url_private_download"]
 
             # Fetch the file and continue
-            file_object = requests.get(
-                file_url, headers={"Authorization": "Bearer " + token}
-            )
+            with timed("attachment_download"):
+                file_object = requests.get(
+                    file_url, headers={"Authorization": "Bearer " + token}
+                )
 
             # Decode object into binary file
             file_content = file_object.content
@@ -195,9 +213,10 @@ def build_conversation_content(payload, token):
                 snippet_file_url = file["url_private_download"]
 
                 # Fetch the file and continue
-                snippet_file_object = requests.get(
-                    snippet_file_url, headers={"Authorization": "Bearer " + token}
-                )
+                with timed("attachment_download"):
+                    snippet_file_object = requests.get(
+                        snippet_file_url, headers={"Authorization": "Bearer " + token}
+                    )
 
                 # Decode the file into plaintext
                 snippet_text = snippet_file_object.content.decode("utf-8")
@@ -216,118 +235,184 @@ def build_conversation_content(payload, token):
                 continue
 
     # Return
-    return bot_id, content, unsupported_file_type_found
+    return bot_id, content, unsupported_file_type_found, speaker_name
 
 
-def build_conversation_context(body, token, registered_bot_id, app):
-    """Build conversation context with full thread history"""
+def assemble_thread(body, token, app, deadline=None):
+    """Fetch the thread's messages and build each message's content, once per request
 
-    conversation = []
+    Outside a thread only the event itself is built. Returns a list of (message, bot_id, content, speaker_name), shared by the
+    initial context step and the agent's conversation so Slack calls and attachment downloads aren't repeated
+    """
+    event = body["event"]
 
-    # Check for thread context
-    if "thread_ts" in body["event"]:
-        # Get thread messages using app client
-        thread_ts = body["event"]["thread_ts"]
-        messages = app.client.conversations_replies(
-            channel=body["event"]["channel"], ts=thread_ts
+    # Single message conversation
+    if "thread_ts" not in event:
+        bot_id_from_message, content, unsupported_file_type_found, speaker_name = (
+            build_conversation_content(event, token, deadline)
+        )
+        return [(event, bot_id_from_message, content, speaker_name)]
+
+    # Get thread messages using app client
+    with timed("thread_fetch"):
+        messages = slack_scheduler.call(
+            "conversations.replies",
+            lambda: app.client.conversations_replies(
+                channel=event["channel"], ts=event["thread_ts"]
+            ),
         )
 
-        # Iterate through every message in the thread
-        for message in messages["messages"]:
-            # Build the content array
-            (
-                bot_id_from_message,
-                thread_conversation_content,
-                unsupported_file_type_found,
-            ) = build_conversation_content(message, token)
+    # Iterate through every message in the thread
+    thread = []
+    for message in messages["messages"]:
+        # The request was cancelled, e.g. the guardrail blocked it, the rest of the thread isn't needed
+        if deadline is not None and deadline.expired():
+            break
+
+        # Build the content array
+        (
+            bot_id_from_message,
+            thread_conversation_content,
+            unsupported_file_type_found,
+            speaker_name,
+        ) = build_conversation_content(message, token, deadline)
 
-            if debug_enabled == "True":
-                print("🚀 Thread conversation content:", thread_conversation_content)
+        if debug_enabled == "True":
+            print("🚀 Thread conversation content:", thread_conversation_content)
 
-            # Check if the thread conversation content is empty
-            if thread_conversation_content != []:
-                # Check if message came from our bot
-                if bot_id_from_message == registered_bot_id:
-                    conversation.append(
-                        {
-                            "role": "assistant",
-                            "content": [{"text": message["text"]}],
-                        }
-                    )
-                # If not, the message came from a user
-                else:
-                    # Convert thread_conversation_content to simple text if it's a list
-                    if isinstance(thread_conversation_content, list):
-                        # Extract text from content blocks if needed
-                        content_text = ""
-                        for item in thread_conversation_content:
-                            if isinstance(item, dict) and "text" in item:
-                                content_text += item["text"]
-                            elif isinstance(item, str):
-                                content_text += item
-                        user_content = content_text if content_text else "Empty message"
-                    else:
-                        user_content = (
-                            str(thread_conversation_content)
-                            if thread_conversation_content
-                            else "Empty message"
-                        )
-
-                    conversation.append(
+        thread.append(
+            (message, bot_id_from_message, thread_conversation_content, speaker_name)
+        )
+
+    return thread
+
+
+def build_initial_conversation(body, thread, registered_bot_id):
+    """Build the conversation for the initial context step, keeping attachments as content blocks"""
+
+    # We're not in a thread, so we just need to add the user's message to the conversation
+    if "thread_ts" not in body["event"]:
+        return [{"role": "user", "content": thread[0][2]}]
+
+    conversation = []
+    for message, bot_id_from_message, thread_conversation_content, _ in thread:
+        # Check if the thread conversation content is empty. This happens when a user sends an unsupported doc type only, with no message
+        if thread_conversation_content == []:
+            continue
+
+        # Check if message came from our bot
+        # We're assuming our bot only generates text content, which is true of Claude v3.5 Sonnet v2
+        if bot_id_from_message == registered_bot_id:
+            conversation.append(
+                {
+                    "role": "assistant",
+                    "content": [
                         {
-                            "role": "user",
-                            "content": (
-                                [{"text": user_content}]
-                                if isinstance(user_content, str)
-                                else user_content
-                            ),
+                            "text": message["text"],
                         }
-                    )
+                    ],
+                }
+            )
+        # If not, the message came from a user
+        else:
+            conversation.append(
+                {"role": "user", "content": thread_conversation_content}
+            )
 
-                    if debug_enabled == "True":
-                        print(
-                            "🚀 State of conversation after threaded message append:",
-                            conversation,
-                        )
-    else:
-        # Single message conversation
-        event = body["event"]
-        bot_id_from_message, user_conversation_content, unsupported_file_type_found = (
-            build_conversation_content(event, token)
-        )
+    return conversation
+
+
+def content_text(content):
+    """Convert a message's content blocks to the simple text format Strands is given"""
+    text = ""
+    for item in content:
+        if isinstance(item, dict) and "text" in item:
+            text += item["text"]
+        elif isinstance(item, str):
+            text += item
+    return text if text else "Empty message"
+
+
+def build_conversation_context(body, thread, registered_bot_id, after_ts=None):
+    """Build the agent's conversation with full thread history from an assembled thread
+
+    With after_ts, only thread messages posted after that Slack timestamp are included
+    """
 
-        # Convert to simple text format for Strands
-        if isinstance(user_conversation_content, list):
-            content_text = ""
-            for item in user_conversation_content:
-                if isinstance(item, dict) and "text" in item:
-                    content_text += item["text"]
-                elif isinstance(item, str):
-                    content_text += item
-            user_content = content_text if content_text else "Empty message"
+    # Single message conversation
+    if "thread_ts" not in body["event"]:
+        return [{"role": "user", "content": [{"text": content_text(thread[0][2])}]}]
+
+    conversation = []
+    for message, bot_id_from_message, thread_conversation_content, _ in thread:
+        # Skip messages already covered by a saved agent session
+        if after_ts is not None and float(message["ts"]) <= float(after_ts):
+            continue
+
+        # Check if the thread conversation content is empty
+        if thread_conversation_content == []:
+            continue
+
+        # Check if message came from our bot
+        if bot_id_from_message == registered_bot_id:
+            conversation.append(
+                {
+                    "role": "assistant",
+                    "content": [{"text": message["text"]}],
+                }
+            )
+        # If not, the message came from a user
         else:
-            user_content = (
-                str(user_conversation_content)
-                if user_conversation_content
-                else "Empty message"
+            conversation.append(
+                {
+                    "role": "user",
+                    "content": [{"text": content_text(thread_conversation_content)}],
+                }
             )
 
-        conversation.append(
-            {
-                "role": "user",
-                "content": (
-                    [{"text": user_content}]
-                    if isinstance(user_content, str)
-                    else user_content
-                ),
-            }
-        )
+            if debug_enabled == "True":
+                print(
+                    "🚀 State of conversation after threaded message append:",
+                    conversation,
+                )
 
     return conversation
 
 
+def prepare_agent_tools(secrets_json, deadline):
+    """Load the agent stack and start MCP clients
+
+    Strands and MCP are only imported here, in the background, so their import time overlaps the rest of setup
+    and requests that never reach the agent don't pay for it
+    """
+    from worker_agent import get_agent_tools
+
+    return get_agent_tools(secrets_json, deadline)
+
+
+def cancel_setup(deadline, agent_tools_future):
+    """Stop background setup for a request that won't reach the agent"""
+    # Expire the deadline, so MCP startup and attachment downloads still in progress skip their remaining work
+    deadline.cancel()
+
+    # Stop MCP clients once they've finished starting
+    from worker_agent import stop_agent_tools
+
+    agent_tools_future.add_done_callback(
+        lambda future: stop_agent_tools(future.result())
+    )
+
+
 def handle_message_event(
-    client, body, say, bedrock_client, app, token, registered_bot_id, secrets_json
+    client,
+    body,
+    say,
+    bedrock_client,
+    app,
+    token,
+    registered_bot_id,
+    secrets_json,
+    deadline=None,
 ):
     from worker_inputs import (
         bot_name,
@@ -336,6 +421,10 @@ def handle_message_event(
         initial_model_system_prompt,
     )
 
+    # Without a deadline from the Lambda context, use the full worker timeout
+    if deadline is None:
+        deadline = Deadline.from_lambda_context(None)
+
     # Initialize message_ts as None
     # This is used to track the slack message timestamp for updating the message
     message_ts = None
@@ -346,78 +435,87 @@ def handle_message_event(
     # Determine the thread timestamp
     thread_ts = body["event"].get("thread_ts", body["event"]["ts"])
 
-    # Initialize conversation context
-    conversation = []
+    # Repeated single-message questions are answered from the answer cache, before anything else is started
+    answer_cache_lookup = None
+    if enable_answer_cache and answer_cache_eligible(event):
+        with timed("answer_cache_lookup"):
+            cached_answer, answer_cache_lookup = find_cached_answer(event["text"])
+
+        # No lookup means the answer cache is disabled, so it isn't counted as a miss
+        request_metrics = get_request_metrics()
+        if request_metrics is not None and answer_cache_lookup is not None:
+            request_metrics.put(
+                "answer_cache",
+                "Hits" if cached_answer is not None else "Misses",
+                1,
+                "Count",
+            )
 
-    # Check to see if we're in a thread
-    # If yes, read previous messages in the thread, append to conversation context for AI response
-    if "thread_ts" in body["event"]:
-        # Get the messages in the thread
-        thread_ts = body["event"]["thread_ts"]
-        messages = app.client.conversations_replies(
-            channel=body["event"]["channel"], ts=thread_ts
+        if cached_answer is not None:
+            # The question still has to pass the guardrail
+            guardrail_block_message = (
+                screen_with_guardrail(bedrock_client, event["text"])
+                if enable_guardrails
+                else None
+            )
+            update_slack_response(
+                say,
+                client,
+                None,
+                channel_id,
+                thread_ts,
+                guardrail_block_message or cached_answer,
+            )
+            print("🚀 Successfully completed response from the answer cache")
+            return
+
+    # Follow-ups in a thread continue the agent's saved session, so earlier tool results are reused
+    thread_session = None
+    if "thread_ts" in event:
+        thread_session = load_thread_session(channel_id, thread_ts)
+
+    # Start MCP sessions and assemble the thread in the background
+    # MCP startup doesn't depend on the initial context step, so it's only joined just before the agent runs
+    # Each task runs in a copy of this context, so its timings land in this request's metrics
+    setup_pool = ThreadPoolExecutor(max_workers=3)
+
+    # Screen the user's message with the guardrail alongside the rest of setup, so a block doesn't pay for it
+    guardrail_future = None
+    if enable_guardrails:
+        guardrail_future = setup_pool.submit(
+            copy_context().run,
+            screen_with_guardrail,
+            bedrock_client,
+            event.get("text", ""),
         )
 
-        # Iterate through every message in the thread
-        for message in messages["messages"]:
-
-            # Build the content array
-            (
-                bot_id_from_message,
-                thread_conversation_content,
-                unsupported_file_type_found,
-            ) = build_conversation_content(message, token)
-
-            if debug_enabled == "True":
-                print("🚀 Thread conversation content:", thread_conversation_content)
-
-            # Check if the thread conversation content is empty. This happens when a user sends an unsupported doc type only, with no message
-            if thread_conversation_content != []:
-                # Conversation content is not empty, append to conversation
-
-                # Check if message came from our bot
-                # We're assuming our bot only generates text content, which is true of Claude v3.5 Sonnet v2
-                if bot_id_from_message == registered_bot_id:
-                    conversation.append(
-                        {
-                            "role": "assistant",
-                            "content": [
-                                {
-                                    "text": message["text"],
-                                }
-                            ],
-                        }
-                    )
-                # If not, the message came from a user
-                else:
-                    conversation.append(
-                        {"role": "user", "content": thread_conversation_content}
-                    )
-
-                    if debug_enabled == "True":
-                        print(
-                            "🚀 State of conversation after threaded message append:",
-                            conversation,
-                        )
-
-    else:
-        # We're not in a thread, so we just need to add the user's message to the conversation
-
-        # Build the user's part of the conversation
-        bot_id_from_message, user_conversation_content, unsupported_file_type_found = (
-            build_conversation_content(event, token)
-        )
+    agent_tools_future = setup_pool.submit(
+        copy_context().run, prepare_agent_tools, secrets_json, deadline
+    )
+    # The thread is fetched and its attachments downloaded once, for both the initial context step and the agent
+    thread_future = setup_pool.submit(
+        copy_context().run, assemble_thread, body, token, app, deadline
+    )
+    setup_pool.shutdown(wait=False)
+
+    # If the guardrail blocked the message, stop the background setup and answer with the block now
+    # Checked before the thread is joined, so cancelling the deadline stops its remaining user lookups and downloads
+    if guardrail_future is not None:
+        guardrail_block_message = guardrail_future.result()
+        if guardrail_block_message is not None:
+            cancel_setup(deadline, agent_tools_future)
+            update_slack_response(
+                say, client, None, channel_id, thread_ts, guardrail_block_message
+            )
+            return
 
-        # Append to the conversation
-        conversation.append(
-            {
-                "role": "user",
-                "content": user_conversation_content,
-            }
-        )
+    # Build the conversation for the initial context step, with attachments as content blocks
+    thread = thread_future.result()
+    conversation = build_initial_conversation(body, thread, registered_bot_id)
 
-        if debug_enabled == "True":
-            print("🚀 State of conversation after append user's prompt:", conversation)
+    # Answers naming the asker aren't cached, since they'd be served to other people
+    if answer_cache_lookup is not None:
+        answer_cache_lookup["asker_name"] = thread[0][3]
 
     # Check if conversation content is empty, this happens when a user sends an unsupported doc type only, with no message
     # Conversation looks like this: [{'role': 'user', 'text': []}]
@@ -429,53 +527,23 @@ def handle_message_event(
             print("🚀 Conversation is empty, exiting")
 
         # Announce the error
-        say(
-            text=f"> `Error`: Unsupported file type found, please ensure you are sending a supported file type. Supported file types are: images (png, jpeg, gif, webp).",
-            thread_ts=thread_ts,
-        )
-        return
-
-    # Before we fetch the knowledge base, do an initial turn with the AI to add context
-    if enable_initial_model_context_step:
-        message_ts = update_slack_response(
-            say,
-            client,
-            message_ts,
-            channel_id,
-            thread_ts,
-            initial_model_user_status_message,
-        )
-
-        # Ask the AI for a response
-        ai_response = ai_request(
-            bedrock_client,
-            conversation,
-            say,
-            thread_ts,
-            client,
-            message_ts,
+        slack_scheduler.call(
+            "chat.postMessage",
+            lambda: say(
+                text=f"> `Error`: Unsupported file type found, please ensure you are sending a supported file type. Supported file types are: images (png, jpeg, gif, webp).",
+                thread_ts=thread_ts,
+            ),
             channel_id,
-            initial_model_system_prompt,
-        )
-
-        # Append to conversation
-        conversation.append(
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "text": f"Initialization information from the model: {ai_response}",
-                    }
-                ],
-            }
         )
 
-        # Debug
-        if debug_enabled == "True":
-            print("🚀 State of conversation after context request:", conversation)
+        # The agent won't run, stop the background setup
+        cancel_setup(deadline, agent_tools_future)
+        return
 
     # Initial message to user
     initial_message = f"🚀 {bot_name} is connecting to platforms and analyzing your request.\n\n{bot_name} can be slow, since she's connecting to platforms and using tools. Please give her 1-2 minutes to respond.\n\nWhen {bot_name} has finished, Slack will alert you of a new message in this thread.\n\n:turtle::turtle::turtle::turtle::turtle::turtle::turtle::turtle::turtle::turtle:"
+    if enable_initial_model_context_step:
+        initial_message += f"\n\n{initial_model_user_status_message}"
     message_ts = update_slack_response(
         say,
         client,
@@ -485,14 +553,57 @@ def handle_message_event(
         initial_message,
     )
 
-    # Build conversation in bedrock format
-    conversation = build_conversation_context(body, token, registered_bot_id, app)
+    # Do an initial turn with the AI to add context, while MCP sessions start in the background
+    context_response = None
+    if enable_initial_model_context_step:
+        with timed("initial_context"):
+            context_response = ai_request(
+                bedrock_client,
+                conversation,
+                say,
+                thread_ts,
+                client,
+                message_ts,
+                channel_id,
+                initial_model_system_prompt,
+            )
+
+    # Join the background setup, this is only as slow as whichever step finishes last
+    with timed("setup_wait"):
+        agent_tools = agent_tools_future.result()
 
-    # Execute bedrock agent to fetch response
-    response = execute_agent(
-        secrets_json,
-        conversation,
+    # Build the agent's conversation from the same thread. A saved session already covers the earlier messages
+    conversation = build_conversation_context(
+        body,
+        thread,
+        registered_bot_id,
+        thread_session["last_ts"] if thread_session else None,
     )
+    if thread_session is not None:
+        conversation = continue_thread_session(thread_session, conversation)
+
+    # Add the context to the latest user message. Bedrock won't accept a trailing assistant message with thinking on
+    if context_response and conversation and conversation[-1]["role"] == "user":
+        conversation[-1]["content"].append(
+            {"text": f"Initialization information from the model: {context_response}"}
+        )
+
+        # Debug
+        if debug_enabled == "True":
+            print("🚀 State of conversation after context request:", conversation)
+
+    # Execute bedrock agent to fetch response, the agent stack was already imported by prepare_agent_tools
+    from worker_agent import execute_agent
+
+    with timed("agent_run"):
+        response = execute_agent(
+            secrets_json,
+            conversation,
+            deadline,
+            agent_tools,
+            answer_cache_lookup,
+            {"channel_id": channel_id, "thread_ts": thread_ts, "last_ts": event["ts"]},
+        )
 
     # Delete the initial "researching" message
     delete_slack_response(client, channel_id, message_ts)
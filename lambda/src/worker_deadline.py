@@ -0,0 +1,44 @@
+# Request-scoped deadline
+# The worker Lambda has a 900 second budget shared by thread assembly, MCP startup, model turns and tool calls
+# Every stage checks the same deadline, so a slow stage can't use up the whole budget and leave the user with no answer
+import time
+from worker_inputs import (
+    worker_timeout_seconds,
+    deadline_reserve_seconds,
+    deadline_wrap_up_seconds,
+)
+
+
+class Deadline:
+    """Tracks the time left for a single request"""
+
+    def __init__(self, remaining_seconds):
+        self.expires_at = time.monotonic() + remaining_seconds
+
+    @classmethod
+    def from_lambda_context(cls, context):
+        """Build a deadline from the Lambda context's remaining time, less the time held back to post to Slack"""
+        if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+            remaining_seconds = context.get_remaining_time_in_millis() / 1000
+        else:
+            remaining_seconds = worker_timeout_seconds
+        return cls(remaining_seconds - deadline_reserve_seconds)
+
+    def remaining(self):
+        """Seconds left before the deadline, never negative"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def has_time_for(self, seconds):
+        """True if a stage taking up to this long still leaves time to wrap up"""
+        return self.remaining() - deadline_wrap_up_seconds >= seconds
+
+    def wrapping_up(self):
+        """True once the agent should stop working and answer"""
+        return self.remaining() < deadline_wrap_up_seconds
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def cancel(self):
+        """End the request now, so stages still setting up skip their remaining work"""
+        self.expires_at = time.monotonic()
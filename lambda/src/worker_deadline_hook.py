@@ -0,0 +1,103 @@
+# Deadline enforcement inside the agent, tool calls are bounded and the agent is told to answer once time is short
+import asyncio
+import time
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeModelCallEvent,
+    BeforeToolCallEvent,
+)
+from strands.types.tools import AgentTool
+from worker_inputs import deadline_wrap_up_seconds
+
+# Message sent to the model once the deadline is close
+WRAP_UP_MESSAGE = "Time is nearly up for this request. Do not call any more tools. Answer now with the information already gathered, and say what you weren't able to check."
+
+
+class DeadlineBoundTool(AgentTool):
+    """Wraps a tool so a hung call is abandoned when its time runs out"""
+
+    def __init__(self, tool, timeout_seconds):
+        super().__init__()
+        self.tool = tool
+        self.timeout_seconds = timeout_seconds
+
+    @property
+    def tool_name(self):
+        return self.tool.tool_name
+
+    @property
+    def tool_spec(self):
+        return self.tool.tool_spec
+
+    @property
+    def tool_type(self):
+        return self.tool.tool_type
+
+    async def stream(self, tool_use, invocation_state, **kwargs):
+        tool_events = self.tool.stream(tool_use, invocation_state, **kwargs)
+        stop_at = time.monotonic() + self.timeout_seconds
+        try:
+            while True:
+                yield await asyncio.wait_for(
+                    anext(tool_events), timeout=max(0.0, stop_at - time.monotonic())
+                )
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            print(
+                f"🚀 Tool call {self.tool_name} timed out after {self.timeout_seconds:.0f}s"
+            )
+            # The last event is taken as the tool result
+            yield {
+                "toolUseId": tool_use["toolUseId"],
+                "status": "error",
+                "content": [
+                    {
+                        "text": f"Tool call timed out after {self.timeout_seconds:.0f} seconds and was abandoned to stay within the response time budget."
+                    }
+                ],
+            }
+
+
+class DeadlineHook(HookProvider):
+    """Stops the agent calling tools and makes it answer once the deadline is close"""
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.wrap_up_sent = False
+
+    def register_hooks(self, registry: HookRegistry, **kwargs) -> None:
+        registry.add_callback(BeforeModelCallEvent, self.check_model_turn)
+        registry.add_callback(BeforeToolCallEvent, self.check_tool_call)
+
+    def check_model_turn(self, event: BeforeModelCallEvent) -> None:
+        if self.wrap_up_sent or not self.deadline.wrapping_up():
+            return
+
+        messages = event.agent.messages
+        if not messages or messages[-1]["role"] != "user":
+            return
+
+        # Ask the model to answer now, on the user turn it's about to respond to
+        print(
+            f"🚀 Deadline close ({self.deadline.remaining():.0f}s left), asking the agent to answer now"
+        )
+        messages[-1]["content"].append({"text": WRAP_UP_MESSAGE})
+        self.wrap_up_sent = True
+
+    def check_tool_call(self, event: BeforeToolCallEvent) -> None:
+        if event.selected_tool is None:
+            return
+
+        # Out of time, skip the tool so the model answers with what it has
+        if self.deadline.wrapping_up():
+            print(f"🚀 Deadline close, skipping tool call {event.tool_use['name']}")
+            event.cancel_tool = WRAP_UP_MESSAGE
+            return
+
+        # Otherwise the tool may run until the wrap up window starts
+        event.selected_tool = DeadlineBoundTool(
+            event.selected_tool,
+            self.deadline.remaining() - deadline_wrap_up_seconds,
+        )
@@ -0,0 +1,170 @@
+# Fake Bedrock Converse endpoint for local testing
+# Serves Converse and ConverseStream, and can throttle chosen models so failover can be exercised without AWS
+# Run: python worker_fake_bedrock.py --port 8089 --throttle us.anthropic.claude-sonnet-4-20250514-v1:0=5
+# Then point the worker at it: BEDROCK_ENDPOINT_URL=http://localhost:8089
+import argparse
+import binascii
+import json
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+FAKE_RESPONSE_TEXT = "This is a response from the fake Bedrock endpoint."
+
+
+def encode_event_stream_message(event_type, payload):
+    """Encode one AWS event stream message, the binary framing ConverseStream responses use"""
+    headers = b""
+    for name, value in (
+        (":event-type", event_type),
+        (":content-type", "application/json"),
+        (":message-type", "event"),
+    ):
+        name_bytes = name.encode()
+        value_bytes = value.encode()
+        # Header value type 7 is a string
+        headers += struct.pack("B", len(name_bytes)) + name_bytes
+        headers += struct.pack("!BH", 7, len(value_bytes)) + value_bytes
+
+    payload_bytes = json.dumps(payload).encode()
+    total_length = 12 + len(headers) + len(payload_bytes) + 4
+    prelude = struct.pack("!II", total_length, len(headers))
+    prelude += struct.pack("!I", binascii.crc32(prelude) & 0xFFFFFFFF)
+    message = prelude + headers + payload_bytes
+    return message + struct.pack("!I", binascii.crc32(message) & 0xFFFFFFFF)
+
+
+class FakeBedrock:
+    """Request counts and throttling settings shared by every handler thread"""
+
+    def __init__(self, throttle=None):
+        # Model ID -> number of requests to throttle before serving
+        self.throttle = dict(throttle or {})
+        self.requests = {}
+        self.lock = threading.Lock()
+
+    def should_throttle(self, model_id):
+        with self.lock:
+            self.requests[model_id] = self.requests.get(model_id, 0) + 1
+            return self.requests[model_id] <= self.throttle.get(model_id, 0)
+
+
+def build_handler(fake_bedrock):
+    class FakeBedrockHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            # Paths look like /model/{modelId}/converse or /model/{modelId}/converse-stream
+            _, _, model_id, operation = self.path.split("/", 3)
+            model_id = unquote(model_id)
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            if fake_bedrock.should_throttle(model_id):
+                print(f"🚀 Fake Bedrock throttling {model_id}")
+                self.send_json(
+                    429,
+                    {"message": "Too many requests, please wait before trying again."},
+                    {"x-amzn-ErrorType": "ThrottlingException"},
+                )
+                return
+
+            print(f"🚀 Fake Bedrock serving {operation} for {model_id}")
+            if operation == "converse-stream":
+                self.send_stream(model_id)
+            else:
+                self.send_json(
+                    200,
+                    {
+                        "output": {
+                            "message": {
+                                "role": "assistant",
+                                "content": [{"text": FAKE_RESPONSE_TEXT}],
+                            }
+                        },
+                        "stopReason": "end_turn",
+                        "usage": {
+                            "inputTokens": 10,
+                            "outputTokens": 10,
+                            "totalTokens": 20,
+                        },
+                        "metrics": {"latencyMs": 1},
+                    },
+                )
+
+        def send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def send_stream(self, model_id):
+            events = [
+                ("messageStart", {"role": "assistant"}),
+                (
+                    "contentBlockDelta",
+                    {"contentBlockIndex": 0, "delta": {"text": FAKE_RESPONSE_TEXT}},
+                ),
+                ("contentBlockStop", {"contentBlockIndex": 0}),
+                ("messageStop", {"stopReason": "end_turn"}),
+                (
+                    "metadata",
+                    {
+                        "usage": {
+                            "inputTokens": 10,
+                            "outputTokens": 10,
+                            "totalTokens": 20,
+                        },
+                        "metrics": {"latencyMs": 1},
+                    },
+                ),
+            ]
+            data = b"".join(
+                encode_event_stream_message(event_type, payload)
+                for event_type, payload in events
+            )
+            self.send_response(200)
+            self.send_header("Content-Type", "application/vnd.amazon.eventstream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeBedrockHandler
+
+
+def start_fake_bedrock(port=8089, throttle=None):
+    """Start the fake endpoint in a background thread, returns the server"""
+    server = ThreadingHTTPServer(
+        ("localhost", port), build_handler(FakeBedrock(throttle))
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🚀 Fake Bedrock listening on http://localhost:{server.server_port}")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Bedrock Converse endpoint")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument(
+        "--throttle",
+        action="append",
+        default=[],
+        help="model_id=N, throttle the first N requests to this model",
+    )
+    args = parser.parse_args()
+
+    throttle = {}
+    for setting in args.throttle:
+        throttled_model_id, _, count = setting.rpartition("=")
+        throttle[throttled_model_id] = int(count)
+
+    server = ThreadingHTTPServer(
+        ("localhost", args.port), build_handler(FakeBedrock(throttle))
+    )
+    print(f"🚀 Fake Bedrock listening on http://localhost:{args.port}")
+    server.serve_forever()
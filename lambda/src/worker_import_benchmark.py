@@ -0,0 +1,99 @@
+# Import time benchmark for the worker modules
+# Cold starts on Lambda are dominated by imports. Each module is imported in a fresh interpreter with
+# python -X importtime, and its cumulative import cost is reported along with the heaviest packages it pulls in
+# Run it in the Lambda image to measure on the same ARM runtime:
+#   python worker_import_benchmark.py --repeat 5
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules measured by default, entrypoints first
+DEFAULT_MODULES = [
+    "worker",
+    "worker_conversation",
+    "worker_agent",
+    "worker_local",
+    "receiver",
+]
+
+
+def parse_importtime(output):
+    """Parse -X importtime output into {module: cumulative_microseconds}"""
+    cumulative = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        # A module is only imported once per interpreter, keep the first measurement
+        cumulative.setdefault(name.strip(), int(cumulative_us))
+    return cumulative
+
+
+def measure_module(module):
+    """Import a module in a fresh interpreter, returns {module: cumulative_microseconds}"""
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=source_dir)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=source_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def benchmark_module(module, repeat):
+    """Median cumulative import cost of a module and each top-level package it loads, in milliseconds"""
+    runs = [measure_module(module) for _ in range(repeat)]
+
+    # Top-level packages, e.g. strands, mcp and boto3, and the worker's own modules
+    packages = {
+        name for run in runs for name in run if "." not in name and name != module
+    }
+    return {
+        "module": module,
+        "total_ms": statistics.median(run[module] for run in runs) / 1000,
+        "packages_ms": {
+            package: statistics.median(run.get(package, 0) for run in runs) / 1000
+            for package in packages
+        },
+    }
+
+
+def print_report(results, top):
+    for result in results:
+        print(f"\n🚀 {result['module']}: {result['total_ms']:.1f} ms cumulative")
+        heaviest = sorted(
+            result["packages_ms"].items(), key=lambda item: item[1], reverse=True
+        )[:top]
+        for package, package_ms in heaviest:
+            print(f"    {package_ms:8.1f} ms  {package}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Report the cumulative import cost of each worker module"
+    )
+    parser.add_argument(
+        "modules", nargs="*", default=DEFAULT_MODULES, help="Modules to measure"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Fresh interpreters per module"
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="Heaviest packages listed per module"
+    )
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results = [benchmark_module(module, args.repeat) for module in args.modules]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results, args.top)
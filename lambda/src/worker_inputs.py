@@ -1,6 +1,5 @@
 # Configuration and constants for the worker
 import os
-from strands_tools import calculator, current_time, retrieve
 
 ###
 # Constants
@@ -13,7 +12,8 @@ bot_name = os.environ.get(
 
 # Slack
 slack_buffer_token_size = 10  # Number of tokens to buffer before updating Slack
-slack_message_size_limit_words = 350  # Slack limit of characters in response is 4k. That's ~420 words. 350 words is a safe undershot of words that'll fit in a slack response. Used in the system prompt.
+slack_message_size_limit_chars = 3500  # Slack displays up to ~4k characters per message. Longer answers are split into consecutive thread messages below this size
+slack_max_retries = 3  # Rate limited Slack calls are retried this many times, each after waiting out Retry-After
 
 # Enable debug
 debug_enabled = os.environ.get("DEBUG_ENABLED", "False")
@@ -47,7 +47,9 @@ initial_model_system_prompt = f"""
     Assistant should...
 """
 
-system_prompt = f"""Assistant is a helpful large language model named {bot_name} who is trained to support our employees.
+# System prompt, assembled per request from the sections for the tools the agent actually has
+# Sections are joined in this order, tool sections are only included when their MCP backend started
+system_prompt_base = f"""Assistant is a helpful large language model named {bot_name} who is trained to support our employees.
 
     # Brand voice
     Assistant response should reflect core brand values of being Insightful, Forward-Thinking, Customer-Centric, and Collaborative.
@@ -61,7 +63,6 @@ system_prompt = f"""Assistant is a helpful large language model named {bot_name}
     Assistant must encode all hyperlinks like this: "<https://www.google.com|Google>".
     Assistant should use formatting to make the response easy to read.
     When possible, data should be broken into sections with headers. Bullets help too.
-    Assistant must limit messages to {slack_message_size_limit_words} words. For longer responses Assistant should provide the first part of the response, and then prompt User to ask for the next part of the response.
     Assistant should respond naturally to the conversation flow and can address multiple users when appropriate. Assistant should acknowledge users who tag or mention {bot_name}, and can directly address other users mentioned in the conversation (e.g., "User1: I have a question about xxx...\\n\\nUser2: @{bot_name}, can you help with that? \\n\\n{bot_name}: User2, I can help with that! User1, here's what I found...").
     Assistant should address users by name, and shouldn't echo users' pronouns.
 
@@ -71,20 +72,25 @@ system_prompt = f"""Assistant is a helpful large language model named {bot_name}
     Assistant should use the retrieve tool to search our internal knowledge bases first, and only use external knowledge sources if the internal knowledge bases don't have the information needed.
     Assistant should provide a source for any information it provides. The source should be a link to the knowledge base, a URL, or a link to a document in S3.
     When assistant provides information from a Confluence URL, Assistant should always provide a citation URL link. The URL label should be the name of the page, and the URL should be the full URL, encoded with pipe syntax.
-
-    # MCP and Tools
+"""
+system_prompt_tools_intro = """    # MCP and Tools
     Assistant has access to our third-party tools and internal knowledge bases to help the assistant provide accurate and up-to-date information.
     Assistant's access will be as a bot user, but assistant can identify the user in the  conversation, and search these third-party tools for information about that user with their name and/or email address.
     Team could refer to an actual team in GitHub, or is could mean a project inside Jira or Confluence.
-    ## Atlassian (Jira and Confluence)
+"""
+system_prompt_tool_sections = {
+    "Atlassian": """    ## Atlassian (Jira and Confluence)
     When users ask about their "tickets" or issues, check Jira using JQL for tickets that are assigned to them.
     When users ask about documentation, check Confluence for relevant pages first.
-    ## PagerDuty
+""",
+    "PagerDuty": """    ## PagerDuty
     When users ask about incidents, outages, or on-call schedules, check PagerDuty first.
-    ## Azure
+""",
+    "Azure": """    ## Azure
     When users ask about Azure resources (VMs, storage accounts, resource groups, subscriptions, etc.), use the Azure MCP tools.
     Azure MCP provides tools for querying Azure resources across subscriptions.
-    ## AWS
+""",
+    "AWS_CLI": """    ## AWS
     When users ask about AWS resources (EC2 instances, S3 buckets, EKS clusters, RDS databases, Lambda functions, etc.), use the AWS CLI MCP tools.
     The AWS CLI MCP supports multi-account access using the --profile flag.
     ### AWS Account Directory
@@ -94,14 +100,18 @@ system_prompt = f"""Assistant is a helpful large language model named {bot_name}
     - *Production* (prod): 345678901234 - Production workloads
     When a user asks about resources in a specific account, use the appropriate profile name with the --profile flag in AWS CLI commands.
     Example: "aws eks list-clusters --region us-east-1 --profile prod"
-
-    # References
+""",
+}
+system_prompt_trailer = f"""    # References
     The assistant should include links to any Github resource or other external tool utilized to create an answer. It's preferrable to make a resource names a hyperlink to the real resource, for example GitHub Repo names hyperlinks to the Github Repo URL.
 
     # Message Trailers
     At the end of every message, assistant should include the following:
     - An italicized reminder that {bot_name} is in beta and may not always be accurate.
 """
+system_prompt_shared_answer = """    # Shared Answers
+    This answer may be reused for other employees who ask a similar question. Assistant shouldn't address the user by name, or mention who asked.
+"""
 
 # MCP
 pagerduty_api_url = os.environ.get("PAGERDUTY_API_URL")
@@ -110,3 +120,148 @@ enable_github_mcp = os.environ.get("ENABLE_GITHUB_MCP", "false").lower() == "tru
 enable_atlassian_mcp = os.environ.get("ENABLE_ATLASSIAN_MCP", "false").lower() == "true"
 enable_azure_mcp = os.environ.get("ENABLE_AZURE_MCP", "false").lower() == "true"
 enable_aws_cli_mcp = os.environ.get("ENABLE_AWS_CLI_MCP", "false").lower() == "true"
+
+# Tool result budget
+tool_result_token_budget = int(
+    os.environ.get("TOOL_RESULT_TOKEN_BUDGET", "5000")
+)  # Max tokens a single tool result may add to the agent context, the rest is spilled to overflow
+tool_result_chars_per_token = 4  # Rough estimate of characters per token, used to convert the token budget into characters
+
+# Read-only tool call cache, shared across requests in a warm container
+enable_tool_cache = os.environ.get("ENABLE_TOOL_CACHE", "true").lower() == "true"
+tool_cache_max_entries = 512  # Oldest entries are evicted past this
+tool_cache_ttl_seconds = {
+    "GitHub": int(os.environ.get("TOOL_CACHE_TTL_GITHUB", "300")),
+    "Atlassian": int(os.environ.get("TOOL_CACHE_TTL_ATLASSIAN", "300")),
+    "PagerDuty": int(
+        os.environ.get("TOOL_CACHE_TTL_PAGERDUTY", "60")
+    ),  # Incidents change quickly, keep this short
+}
+
+# Parallel tool execution
+tool_max_concurrency_per_backend = int(
+    os.environ.get("TOOL_MAX_CONCURRENCY_PER_BACKEND", "4")
+)  # Max tool calls running at once against a single MCP backend within an agent turn
+
+# Backend governor, limits MCP tool calls per backend across every conversation
+governor_store_type = os.environ.get(
+    "GOVERNOR_STORE", "local"
+)  # local (per process) or dynamodb (shared by every container, needs GOVERNOR_TABLE_NAME)
+governor_table_name = os.environ.get(
+    "GOVERNOR_TABLE_NAME", ""
+)  # Partition key counter_key (string), with TTL on expires_at
+backend_max_concurrency = {
+    "GitHub": int(os.environ.get("BACKEND_MAX_CONCURRENCY_GITHUB", "4")),
+    "Atlassian": int(os.environ.get("BACKEND_MAX_CONCURRENCY_ATLASSIAN", "4")),
+    "PagerDuty": int(os.environ.get("BACKEND_MAX_CONCURRENCY_PAGERDUTY", "4")),
+    "Azure": int(os.environ.get("BACKEND_MAX_CONCURRENCY_AZURE", "4")),
+    "AWS_CLI": int(os.environ.get("BACKEND_MAX_CONCURRENCY_AWS_CLI", "4")),
+}  # Max tool calls running at once against a backend, across every conversation
+backend_rate_per_second = {
+    "GitHub": float(
+        os.environ.get("BACKEND_RATE_GITHUB", "2")
+    ),  # GitHub's secondary rate limits punish bursts, keep this low
+    "Atlassian": float(os.environ.get("BACKEND_RATE_ATLASSIAN", "5")),
+    "PagerDuty": float(os.environ.get("BACKEND_RATE_PAGERDUTY", "8")),
+    "Azure": float(os.environ.get("BACKEND_RATE_AZURE", "10")),
+    "AWS_CLI": float(os.environ.get("BACKEND_RATE_AWS_CLI", "10")),
+}  # Tool calls started per second against a backend, the bucket holds up to one second's worth for bursts
+backend_queue_timeout_seconds = (
+    60  # Longest a throttled tool call waits for its backend before giving up
+)
+backend_slot_lease_seconds = 300  # Concurrency slots expire after this, so a container that dies mid-call can't hold one
+
+# Request deadline
+worker_timeout_seconds = 900  # Worker Lambda timeout, used as the deadline when there's no Lambda context (local mode)
+deadline_reserve_seconds = 20  # Held back from the deadline to post the answer to Slack
+deadline_wrap_up_seconds = 90  # When less than this remains, the agent stops calling tools and answers with what it has
+
+# Metrics, emitted as CloudWatch Embedded Metric Format
+metrics_namespace = os.environ.get("METRICS_NAMESPACE", f"{bot_name}/Worker")
+metrics_file = os.environ.get(
+    "METRICS_FILE", ""
+)  # Local mode, when set metrics are appended to this file instead of printed to CloudWatch logs
+
+# Bedrock throttling and failover
+bedrock_region = os.environ.get("BEDROCK_REGION", model_region_name)
+bedrock_max_attempts = int(
+    os.environ.get("BEDROCK_MAX_ATTEMPTS", "3")
+)  # Attempts per target, botocore adaptive retries with jittered backoff and a shared client-side rate limiter
+bedrock_failover_rounds = (
+    2  # Passes over the primary and failover targets before giving up
+)
+bedrock_failover_backoff_seconds = (
+    2  # Base of the jittered pause between failover rounds
+)
+bedrock_failover_targets = [
+    target.strip()
+    for target in os.environ.get("BEDROCK_FAILOVER_TARGETS", "").split(",")
+    if target.strip()
+]  # Alternate inference profiles, formatted model_id or model_id@region, tried in order when the primary is throttled
+bedrock_endpoint_url = (
+    os.environ.get("BEDROCK_ENDPOINT_URL") or None
+)  # Override the Bedrock endpoint, e.g. http://localhost:8089 for the fake Converse endpoint in worker_fake_bedrock
+
+# Knowledge base, also read by the strands retrieve tool
+knowledge_base_id = os.environ.get("KNOWLEDGE_BASE_ID", "")
+knowledge_base_version = os.environ.get(
+    "KNOWLEDGE_BASE_VERSION", ""
+)  # Optional, e.g. set by the sync pipeline. When blank the latest completed ingestion job is used as the version
+
+# Answer cache, for repeated single-message questions answered from the knowledge base
+enable_answer_cache = (
+    os.environ.get("ENABLE_ANSWER_CACHE", "false").lower() == "true"
+)  # Off by default, cached answers are served to people other than the original asker
+answer_cache_embedder = os.environ.get(
+    "ANSWER_CACHE_EMBEDDER", "bedrock"
+)  # bedrock (Titan embeddings) or local (deterministic hashing, no API calls)
+answer_cache_embedding_model_id = "amazon.titan-embed-text-v2:0"
+answer_cache_similarity_threshold = float(
+    os.environ.get("ANSWER_CACHE_SIMILARITY_THRESHOLD", "0.92")
+)  # Cosine similarity a new question needs with a cached one to reuse its answer
+answer_cache_ttl_seconds = int(os.environ.get("ANSWER_CACHE_TTL_SECONDS", "3600"))
+answer_cache_max_entries = 256  # Oldest entries are evicted past this
+answer_cache_kb_version_check_seconds = (
+    300  # How often to re-check the knowledge base version
+)
+
+# Knowledge base retrieve cache, shared across requests in a warm container
+enable_retrieve_cache = (
+    os.environ.get("ENABLE_RETRIEVE_CACHE", "true").lower() == "true"
+)
+retrieve_cache_ttl_seconds = int(os.environ.get("RETRIEVE_CACHE_TTL_SECONDS", "600"))
+retrieve_cache_max_entries = 256  # Oldest entries are evicted past this
+retrieve_min_score = float(
+    os.environ.get("MIN_SCORE", "0.4")
+)  # Same default as strands_tools.retrieve
+
+# Agent session state, persisted per Slack thread so follow-ups can reuse earlier tool calls and results
+session_store_type = os.environ.get(
+    "SESSION_STORE", "sqlite"
+)  # sqlite (local file, per container), dynamodb (shared, needs SESSION_TABLE_NAME) or none
+session_sqlite_path = os.environ.get("SESSION_SQLITE_PATH", "/tmp/agent_sessions.db")
+session_table_name = os.environ.get(
+    "SESSION_TABLE_NAME", ""
+)  # Partition key thread_key (string), with TTL on expires_at
+session_ttl_seconds = int(os.environ.get("SESSION_TTL_SECONDS", "86400"))
+session_max_bytes = (
+    350000  # Oldest turns are dropped past this, DynamoDB items are limited to 400KB
+)
+
+# Long-running server mode, python worker_local.py --server
+server_max_conversations = int(
+    os.environ.get("SERVER_MAX_CONVERSATIONS", "16")
+)  # Conversations handled at once, more wait their turn
+server_mcp_refresh_seconds = int(
+    os.environ.get("SERVER_MCP_REFRESH_SECONDS", "1800")
+)  # Warm MCP clients are restarted after this, so backend tokens obtained at startup don't expire under them
+
+# INIT phase warmup, see worker_warmup
+enable_warmup = os.environ.get("ENABLE_WARMUP", "true").lower() == "true"
+warmup_budget_seconds = float(
+    os.environ.get("WARMUP_BUDGET_SECONDS", "6")
+)  # Lambda INIT is limited to 10 seconds, warmup steps still running after this finish during the first request
+warmup_start_mcp = (
+    os.environ.get("WARMUP_START_MCP", "false").lower() == "true"
+)  # Start MCP clients during INIT and keep them open across invocations. Best suited to the stdio backends
+warmup_secret_max_age_seconds = 300  # Requests reuse the secrets fetched during warmup for this long, then fetch their own
@@ -1,13 +1,35 @@
-# Main function, primarily for local development
-if __name__ == "__main__":
-    # Run in local development mode
-    print("🚀 Local server starting starting")
+# Local development and long-running server entrypoints
+# python worker_local.py runs the synchronous Bolt app, handling one conversation at a time, for local development
+# python worker_local.py --server runs an async Bolt app for a persistent container, handling many threads at once
+# with warm MCP clients, caches and connection pools shared between requests
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from slack_bolt.context.say import Say
 
-    # Fetch secret package
-    secrets = get_secret_with_client(bot_secret_name, "us-east-1")
+# Import all constants and configuration
+from worker_inputs import *
 
-    # Disambiguate the secrets with json lookups
-    secrets_json = json.loads(secrets)
+# Ensure AWS region is set for the retrieve tool (knowledge base is in bedrock_region)
+# Set once at startup, before any thread builds boto3 clients
+os.environ["AWS_DEFAULT_REGION"] = bedrock_region
+os.environ["AWS_REGION"] = bedrock_region
+
+from worker_slack import register_slack_app
+from worker_aws import get_secret_with_client, create_bedrock_client
+from worker_agent import enable_warm_agent_tools, release_warm_agent_tools
+from worker_conversation import handle_message_event
+from worker_deadline import Deadline
+from worker_metrics import start_request_metrics
+
+# Event subtypes the receiver throws away, the server receives events directly so it skips them too
+IGNORED_EVENT_SUBTYPES = ["message_changed", "message_deleted"]
+
+
+def run_local(secrets_json, port):
+    """Synchronous Bolt app, each event is handled in full before the next"""
     token = secrets_json["SLACK_BOT_TOKEN"]
     signing_secret = secrets_json["SLACK_SIGNING_SECRET"]
 
@@ -53,6 +75,123 @@ if __name__ == "__main__":
 
     # Start the app in websocket mode for local development
     print("🚀 Starting the slack app listener")
-    app.start(
-        port=int(os.environ.get("PORT", 3000)),
+    app.start(port=port)
+
+
+def run_server(secrets_json, port):
+    """Async Bolt app for a persistent container
+
+    Events are acknowledged on the event loop, and conversations run on a bounded thread pool.
+    MCP clients are started once and shared, and the backend governor limits tool calls across every conversation
+    """
+    from slack_bolt.async_app import AsyncApp
+
+    token = secrets_json["SLACK_BOT_TOKEN"]
+    signing_secret = secrets_json["SLACK_SIGNING_SECRET"]
+
+    # The sync app is never started, its client is shared by every conversation so Slack connections are reused
+    print("🚀 Registering the Slack handler")
+    app, registered_bot_id = register_slack_app(token, signing_secret)
+    async_app = AsyncApp(token=token, signing_secret=signing_secret)
+
+    # Bedrock clients are pooled per region, so every conversation shares this one
+    print("🚀 Registering the AWS Bedrock client")
+    bedrock_client = create_bedrock_client(model_region_name)
+
+    # Share MCP clients between conversations. The backend governor caps their tool calls across all of them
+    enable_warm_agent_tools()
+
+    # Conversations beyond the pool size wait for a free thread
+    conversation_pool = ThreadPoolExecutor(
+        max_workers=server_max_conversations, thread_name_prefix="conversation"
     )
+
+    # Ordering key -> [lock, events holding or waiting for it], so messages in one thread are answered in order
+    thread_locks = {}
+
+    def handle_conversation(body):
+        """Handle one event on a pool thread, with its own metrics and deadline"""
+        metrics = start_request_metrics()
+        try:
+            handle_message_event(
+                app.client,
+                body,
+                Say(app.client, body["event"]["channel"]),
+                bedrock_client,
+                app,
+                token,
+                registered_bot_id,
+                secrets_json,
+                Deadline.from_lambda_context(None),
+            )
+        except Exception as error:
+            print(f"🚀 Error handling conversation: {error}")
+        finally:
+            metrics.flush()
+
+    async def dispatch_conversation(body):
+        event = body["event"]
+        if "edited" in event or event.get("subtype") in IGNORED_EVENT_SUBTYPES:
+            print("🚮 Server: Discarding edited or ignored event")
+            return
+
+        ordering_key = f"{event['channel']}:{event.get('thread_ts', event['ts'])}"
+        thread_lock = thread_locks.setdefault(ordering_key, [asyncio.Lock(), 0])
+        thread_lock[1] += 1
+        try:
+            async with thread_lock[0]:
+                await asyncio.get_running_loop().run_in_executor(
+                    conversation_pool, handle_conversation, body
+                )
+        finally:
+            # Only the event loop thread touches thread_locks, so this can't race
+            thread_lock[1] -= 1
+            if thread_lock[1] == 0:
+                del thread_locks[ordering_key]
+
+    # Responds to app mentions
+    @async_app.event("app_mention")
+    async def handle_app_mention_events(body):
+        print("🚀 Server: Handling app mention event")
+        await dispatch_conversation(body)
+
+    # Respond to message events
+    @async_app.event("message")
+    async def handle_message_events(body):
+        print("🚀 Server: Handling message event")
+        await dispatch_conversation(body)
+
+    print(
+        f"🚀 Starting the async slack app server, up to {server_max_conversations} conversations at once"
+    )
+    try:
+        async_app.start(port=port)
+    finally:
+        conversation_pool.shutdown(wait=False, cancel_futures=True)
+        release_warm_agent_tools()
+
+
+# Main function, primarily for local development
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Slack bot outside of Lambda")
+    parser.add_argument(
+        "--server",
+        action="store_true",
+        help="Run the long-running async server, handling many conversations at once",
+    )
+    args = parser.parse_args()
+
+    # Run in local development mode
+    print("🚀 Local server starting starting")
+
+    # Fetch secret package
+    secrets = get_secret_with_client(bot_secret_name, "us-east-1")
+
+    # Disambiguate the secrets with json lookups
+    secrets_json = json.loads(secrets)
+
+    port = int(os.environ.get("PORT", 3000))
+    if args.server:
+        run_server(secrets_json, port)
+    else:
+        run_local(secrets_json, port)
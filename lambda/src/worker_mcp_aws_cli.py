@@ -6,6 +6,16 @@ from strands.tools.mcp.mcp_client import MCPClient
 TOOLS_PREFIX = "aws"
 
 
+def prepare_aws_cli_mcp_dirs():
+    """Create the AWS CLI MCP working directory and config in /tmp, Lambda isn't writeable elsewhere"""
+    # Create working directory in /tmp for runtime files
+    os.makedirs("/tmp/aws-mcp-working", exist_ok=True)
+    os.makedirs("/tmp/.aws", exist_ok=True)
+
+    # Copy AWS config file with pre-configured profiles to /tmp
+    shutil.copy("/opt/aws_config", "/tmp/.aws/config")
+
+
 def build_aws_cli_mcp_client(
     aws_region="us-east-1",
 ):
@@ -13,12 +23,8 @@ def build_aws_cli_mcp_client(
 
     opt_aws_cli_mcp_dir = "/opt/aws-cli-mcp-server"
 
-    # Create working directory in /tmp for runtime files
-    os.makedirs("/tmp/aws-mcp-working", exist_ok=True)
-    os.makedirs("/tmp/.aws", exist_ok=True)
-
-    # Copy AWS config file with pre-configured profiles to /tmp
-    shutil.copy("/opt/aws_config", "/tmp/.aws/config")
+    # Cheap enough to repeat, warmup may already have done it
+    prepare_aws_cli_mcp_dirs()
 
     # Build environment variables for AWS CLI MCP
     env = {
@@ -1,28 +1,45 @@
 import os
 import shutil
+import threading
 from mcp import stdio_client, StdioServerParameters
 from strands.tools.mcp.mcp_client import MCPClient
 
 TOOLS_PREFIX = "pagerduty"
 READ_ONLY_PREFIXES = ["get_", "list_"]
 
+# Lambda annoyingly makes most of the file system read-only except /tmp
+# Can't directly load stuff into /tmp using Dockerfile because lambda clears /tmp on launch
+# So we copy it from /opt where it lived and put into a new /tmp location lol
+TMP_PAGERDUTY_DIR = "/tmp/pagerduty-mcp-server"
+OPT_PAGERDUTY_DIR = "/opt/pagerduty-mcp-server"
+
+# The copy is made once per process, by warmup during INIT or by the first request
+pagerduty_mcp_dir_state = {"ready": False}
+pagerduty_mcp_dir_lock = threading.Lock()
+
+
+def prepare_pagerduty_mcp_dir():
+    """Copy the PagerDuty MCP server into /tmp, once per process"""
+    with pagerduty_mcp_dir_lock:
+        if pagerduty_mcp_dir_state["ready"]:
+            return TMP_PAGERDUTY_DIR
+
+        # Remove any existing copy and copy fresh from /opt
+        # Handle warm Lambda invocations where /tmp persists
+        if os.path.exists(TMP_PAGERDUTY_DIR):
+            shutil.rmtree(TMP_PAGERDUTY_DIR)
+        shutil.copytree(OPT_PAGERDUTY_DIR, TMP_PAGERDUTY_DIR)
+        pagerduty_mcp_dir_state["ready"] = True
+        return TMP_PAGERDUTY_DIR
+
 
 def build_pagerduty_mcp_client(
     pagerduty_api_key, pagerduty_api_url, build_pagerduty_mcp_client="read_only"
 ):
     """Build PagerDuty MCP client."""
 
-    # Lambda annoyingly makes most of the file system read-only except /tmp
-    # Can't directly load stuff into /tmp using Dockerfile because lambda clears /tmp on launch
-    # So we copy it from /opt where it lived and put into a new /tmp location lol
-    tmp_pagerduty_dir = "/tmp/pagerduty-mcp-server"
-    opt_pagerduty_dir = "/opt/pagerduty-mcp-server"
-
-    # Remove any existing copy and copy fresh from /opt
-    # Handle warm Lambda invocations where /tmp persists
-    if os.path.exists(tmp_pagerduty_dir):
-        shutil.rmtree(tmp_pagerduty_dir)
-    shutil.copytree(opt_pagerduty_dir, tmp_pagerduty_dir)
+    # Copy the server into /tmp, unless warmup or an earlier request already did
+    tmp_pagerduty_dir = prepare_pagerduty_mcp_dir()
 
     # Define tool filters for read-only mode
     tool_filters = None
@@ -0,0 +1,120 @@
+# Per-phase latency and usage metrics
+# Emitted as CloudWatch Embedded Metric Format (EMF) JSON, one log line per measurement, so CloudWatch
+# turns them into metrics without any API calls. In local mode the same lines are written to a file
+# The agent's per-turn and per-tool hook is in worker_metrics_hook, so timing a request doesn't import Strands
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from worker_inputs import debug_enabled, metrics_namespace, metrics_file
+
+# Metrics for the request being handled by the current thread
+current_request_metrics = ContextVar("current_request_metrics", default=None)
+
+# Properties that are also used as metric dimensions, everything else is just logged alongside
+DIMENSION_KEYS = ["Backend"]
+
+
+class RequestMetrics:
+    """Collects metrics for a single request, and emits them as EMF when flushed"""
+
+    def __init__(self, namespace=metrics_namespace, output_file=metrics_file):
+        self.namespace = namespace
+        self.output_file = output_file
+        self.records = []
+        self.lock = threading.Lock()
+
+    def put(self, phase, name, value, unit="Milliseconds", **properties):
+        """Record a single measurement for a phase"""
+        with self.lock:
+            self.records.append(
+                {
+                    "timestamp": int(time.time() * 1000),
+                    "phase": phase,
+                    "name": name,
+                    "value": value,
+                    "unit": unit,
+                    "properties": properties,
+                }
+            )
+
+    @contextmanager
+    def timed(self, phase, **properties):
+        """Time a block of work as the Duration of a phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.put(
+                phase,
+                "Duration",
+                round((time.perf_counter() - start) * 1000, 1),
+                "Milliseconds",
+                **properties,
+            )
+
+    def to_emf(self, record):
+        """Format a record as a CloudWatch Embedded Metric Format document"""
+        dimension_keys = ["Phase"] + [
+            key for key in DIMENSION_KEYS if key in record["properties"]
+        ]
+        return {
+            "_aws": {
+                "Timestamp": record["timestamp"],
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": self.namespace,
+                        "Dimensions": [dimension_keys],
+                        "Metrics": [{"Name": record["name"], "Unit": record["unit"]}],
+                    }
+                ],
+            },
+            "Phase": record["phase"],
+            record["name"]: record["value"],
+            **record["properties"],
+        }
+
+    def flush(self):
+        """Emit all recorded metrics and clear them"""
+        with self.lock:
+            records, self.records = self.records, []
+
+        lines = [json.dumps(self.to_emf(record), default=str) for record in records]
+        if not lines:
+            return
+
+        # Local mode, append to the metrics file
+        if self.output_file:
+            with open(self.output_file, "a") as metrics_output:
+                metrics_output.write("\n".join(lines) + "\n")
+            if debug_enabled == "True":
+                print(f"🚀 Wrote {len(lines)} metrics to {self.output_file}")
+            return
+
+        # Lambda, CloudWatch picks EMF documents out of the log stream
+        for line in lines:
+            print(line)
+
+
+def start_request_metrics():
+    """Start collecting metrics for a new request on the current thread"""
+    metrics = RequestMetrics()
+    current_request_metrics.set(metrics)
+    return metrics
+
+
+def get_request_metrics():
+    """Metrics for the current request, or None outside a request"""
+    return current_request_metrics.get()
+
+
+@contextmanager
+def timed(phase, **properties):
+    """Time a phase against the current request's metrics, does nothing outside a request"""
+    metrics = get_request_metrics()
+    if metrics is None:
+        yield
+        return
+    with metrics.timed(phase, **properties):
+        yield
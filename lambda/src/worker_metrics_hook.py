@@ -0,0 +1,92 @@
+# Agent metrics hook, records Bedrock turns and tool calls against a request's metrics from worker_metrics
+import time
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeModelCallEvent,
+    AfterModelCallEvent,
+    BeforeToolCallEvent,
+    AfterToolCallEvent,
+    AfterInvocationEvent,
+)
+
+
+class AgentMetricsHook(HookProvider):
+    """Records the latency and token usage of each Bedrock turn, and the latency of each tool call"""
+
+    def __init__(self, metrics, tool_prefixes):
+        self.metrics = metrics
+        # Backend name -> tool name prefix, e.g. {"GitHub": "github_"}
+        self.tool_prefixes = tool_prefixes
+        self.model_turn = 0
+        self.model_turn_started = None
+        self.usage_reported = {"inputTokens": 0, "outputTokens": 0}
+        self.tool_calls_started = {}
+
+    def register_hooks(self, registry: HookRegistry, **kwargs) -> None:
+        registry.add_callback(BeforeModelCallEvent, self.start_model_turn)
+        registry.add_callback(AfterModelCallEvent, self.end_model_turn)
+        registry.add_callback(BeforeToolCallEvent, self.start_tool_call)
+        registry.add_callback(AfterToolCallEvent, self.end_tool_call)
+        registry.add_callback(AfterInvocationEvent, self.end_invocation)
+
+    def backend_for_tool(self, tool_name):
+        for backend, prefix in self.tool_prefixes.items():
+            if tool_name.startswith(prefix):
+                return backend
+        return "BuiltIn"
+
+    def report_token_usage(self, agent):
+        # Usage is added to the agent's totals after the turn's hooks run, so report the
+        # previous turn's tokens at the start of the next turn and at the end of the run
+        if self.model_turn == 0:
+            return
+        usage = agent.event_loop_metrics.accumulated_usage
+        for name, metric_name in [
+            ("inputTokens", "InputTokens"),
+            ("outputTokens", "OutputTokens"),
+        ]:
+            tokens = usage.get(name, 0) - self.usage_reported[name]
+            self.usage_reported[name] = usage.get(name, 0)
+            self.metrics.put(
+                "bedrock_turn", metric_name, tokens, "Count", Turn=self.model_turn
+            )
+
+    def start_model_turn(self, event: BeforeModelCallEvent) -> None:
+        self.report_token_usage(event.agent)
+        self.model_turn += 1
+        self.model_turn_started = time.perf_counter()
+
+    def end_model_turn(self, event: AfterModelCallEvent) -> None:
+        if self.model_turn_started is None:
+            return
+        self.metrics.put(
+            "bedrock_turn",
+            "Duration",
+            round((time.perf_counter() - self.model_turn_started) * 1000, 1),
+            "Milliseconds",
+            Turn=self.model_turn,
+            Error=type(event.exception).__name__ if event.exception else "",
+        )
+        self.model_turn_started = None
+
+    def start_tool_call(self, event: BeforeToolCallEvent) -> None:
+        self.tool_calls_started[event.tool_use["toolUseId"]] = time.perf_counter()
+
+    def end_tool_call(self, event: AfterToolCallEvent) -> None:
+        started = self.tool_calls_started.pop(event.tool_use["toolUseId"], None)
+        if started is None:
+            return
+        tool_name = event.tool_use["name"]
+        self.metrics.put(
+            "tool_call",
+            "Duration",
+            round((time.perf_counter() - started) * 1000, 1),
+            "Milliseconds",
+            Backend=self.backend_for_tool(tool_name),
+            Tool=tool_name,
+            Status=event.result.get("status"),
+        )
+
+    def end_invocation(self, event: AfterInvocationEvent) -> None:
+        self.report_token_usage(event.agent)
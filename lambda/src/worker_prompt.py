@@ -0,0 +1,40 @@
+# System prompt assembly
+# The prompt only describes the tools the agent actually has, so no input tokens go on tools it can't call
+# Each combination of backends always assembles to the same text, so it's a stable prefix for prompt caching
+from functools import lru_cache
+from worker_inputs import (
+    system_prompt_base,
+    system_prompt_tools_intro,
+    system_prompt_tool_sections,
+    system_prompt_trailer,
+    system_prompt_shared_answer,
+)
+
+
+@lru_cache(maxsize=None)
+def assemble_system_prompt(backends, shared_answer=False):
+    """Assemble the prompt for a sorted tuple of backend names, memoized per combination"""
+    sections = [system_prompt_base]
+    if backends:
+        sections.append(
+            "\n"
+            + system_prompt_tools_intro
+            + "".join(
+                section
+                for backend, section in system_prompt_tool_sections.items()
+                if backend in backends
+            )
+        )
+    sections.append("\n" + system_prompt_trailer)
+    # Last, so shared and personal answers keep the same cached prefix
+    if shared_answer:
+        sections.append("\n" + system_prompt_shared_answer)
+    return "".join(sections)
+
+
+def build_system_prompt(backends, shared_answer=False):
+    """Build the system prompt for the MCP backends that started, e.g. ["GitHub", "PagerDuty"]
+
+    With shared_answer, the answer may be cached and served to other people, so it isn't addressed to the asker
+    """
+    return assemble_system_prompt(tuple(sorted(backends)), shared_answer)
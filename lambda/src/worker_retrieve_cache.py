@@ -0,0 +1,168 @@
+# Knowledge base retrieve cache
+# The agent often calls retrieve several times per conversation, with the same or slightly reworded queries,
+# and the same questions come up across conversations. Raw retrieval results are cached per query and knowledge
+# base, and chunks the agent has already seen in this conversation aren't sent to it again
+import hashlib
+import json
+import threading
+import time
+import boto3
+from botocore.config import Config
+from strands.tools.tools import PythonAgentTool
+from strands_tools import retrieve
+from strands_tools.retrieve import filter_results_by_score, format_results_for_display
+from worker_inputs import (
+    debug_enabled,
+    bedrock_region,
+    knowledge_base_id,
+    retrieve_cache_ttl_seconds,
+    retrieve_cache_max_entries,
+    retrieve_min_score,
+)
+
+# Cached retrieval results, key -> (expires_at, results). Dicts keep insertion order, so the first key is the oldest
+retrieve_cache = {}
+retrieve_cache_lock = threading.Lock()
+
+# Hit and miss counts across requests
+retrieve_cache_stats = {"hits": 0, "misses": 0}
+
+# Shared bedrock-agent-runtime clients, region -> client
+retrieve_clients = {}
+
+
+def get_retrieve_client(region_name):
+    """Get the shared bedrock-agent-runtime client for a region"""
+    with retrieve_cache_lock:
+        if region_name not in retrieve_clients:
+            retrieve_clients[region_name] = boto3.client(
+                "bedrock-agent-runtime",
+                region_name=region_name,
+                config=Config(user_agent_extra="strands-agents-retrieve"),
+            )
+        return retrieve_clients[region_name]
+
+
+def retrieve_cache_key(query, kb_id, region_name, number_of_results):
+    """Build a cache key from the knowledge base and normalized query"""
+    normalized_query = " ".join(query.lower().split())
+    return f"{region_name}:{kb_id}:{number_of_results}:{normalized_query}"
+
+
+def chunk_key(result):
+    """Identify a retrieved chunk by its source location and content"""
+    content = result.get("content", {}).get("text", "")
+    location = json.dumps(result.get("location", {}), sort_keys=True)
+    return hashlib.sha256(f"{location}:{content}".encode()).hexdigest()
+
+
+def get_retrieve_cache_stats():
+    """Return hit, miss and hit rate numbers across requests"""
+    with retrieve_cache_lock:
+        lookups = retrieve_cache_stats["hits"] + retrieve_cache_stats["misses"]
+        return {
+            "hits": retrieve_cache_stats["hits"],
+            "misses": retrieve_cache_stats["misses"],
+            "hit_rate": retrieve_cache_stats["hits"] / lookups if lookups else 0.0,
+        }
+
+
+def fetch_retrieval_results(query, kb_id, region_name, number_of_results):
+    """Get raw retrieval results from the cache, or the knowledge base on a miss. Returns (results, hit)"""
+    key = retrieve_cache_key(query, kb_id, region_name, number_of_results)
+
+    with retrieve_cache_lock:
+        entry = retrieve_cache.get(key)
+        hit = entry is not None and entry[0] >= time.time()
+        retrieve_cache_stats["hits" if hit else "misses"] += 1
+        if hit:
+            return entry[1], True
+
+    response = get_retrieve_client(region_name).retrieve(
+        retrievalQuery={"text": query},
+        knowledgeBaseId=kb_id,
+        retrievalConfiguration={
+            "vectorSearchConfiguration": {"numberOfResults": number_of_results}
+        },
+    )
+    results = response.get("retrievalResults", [])
+
+    with retrieve_cache_lock:
+        retrieve_cache.pop(key, None)
+        retrieve_cache[key] = (time.time() + retrieve_cache_ttl_seconds, results)
+        while len(retrieve_cache) > retrieve_cache_max_entries:
+            del retrieve_cache[next(iter(retrieve_cache))]
+
+    return results, False
+
+
+class CachedRetrieve:
+    """Per-conversation retrieve tool, backed by the cross-request retrieval cache
+
+    Uses the same name and spec as strands_tools.retrieve, so the agent and prompt don't change
+    """
+
+    def __init__(self):
+        # Chunks already returned to the agent in this conversation
+        self.seen_chunks = set()
+        # Hit and miss counts for this request only
+        self.request_stats = {"hits": 0, "misses": 0}
+        self.tool = PythonAgentTool(
+            retrieve.TOOL_SPEC["name"], retrieve.TOOL_SPEC, self.retrieve
+        )
+
+    def retrieve(self, tool_use, **kwargs):
+        tool_input = tool_use["input"]
+
+        # Filters and profiles are rare, leave them to the original tool uncached
+        if tool_input.get("retrieveFilter") or tool_input.get("profile_name"):
+            return retrieve.retrieve(tool_use, **kwargs)
+
+        query = tool_input["text"]
+        number_of_results = tool_input.get("numberOfResults", 10)
+        kb_id = tool_input.get("knowledgeBaseId", knowledge_base_id)
+        region_name = tool_input.get("region", bedrock_region)
+        min_score = tool_input.get("score", retrieve_min_score)
+
+        try:
+            results, hit = fetch_retrieval_results(
+                query, kb_id, region_name, number_of_results
+            )
+        except Exception as error:
+            return {
+                "toolUseId": tool_use["toolUseId"],
+                "status": "error",
+                "content": [{"text": f"Error during retrieval: {str(error)}"}],
+            }
+
+        self.request_stats["hits" if hit else "misses"] += 1
+        if hit:
+            print(f"🚀 Retrieve cache hit for query: {query}")
+
+        # Drop chunks the agent already has from an earlier call in this conversation
+        filtered_results = filter_results_by_score(results, min_score)
+        new_results = []
+        for result in filtered_results:
+            key = chunk_key(result)
+            if key not in self.seen_chunks:
+                self.seen_chunks.add(key)
+                new_results.append(result)
+        repeated_count = len(filtered_results) - len(new_results)
+
+        # Debug
+        if debug_enabled == "True":
+            print(
+                f"🚀 Retrieve returned {len(filtered_results)} results, {repeated_count} already seen in this conversation"
+            )
+
+        text = f"Retrieved {len(new_results)} results with score >= {min_score}:\n"
+        if new_results or not repeated_count:
+            text += format_results_for_display(new_results)
+        if repeated_count:
+            text += f"\n{repeated_count} more matching results were omitted, they were already returned earlier in this conversation."
+
+        return {
+            "toolUseId": tool_use["toolUseId"],
+            "status": "success",
+            "content": [{"text": text}],
+        }
@@ -0,0 +1,235 @@
+# Agent session state per Slack thread
+# Follow-ups used to rebuild the conversation from Slack text alone, so the agent redid every tool call
+# The agent's full message history, tool use and tool result blocks included, is persisted per thread
+# and reused for the next message in that thread
+import json
+import sqlite3
+import threading
+import time
+import boto3
+from worker_inputs import (
+    debug_enabled,
+    session_store_type,
+    session_sqlite_path,
+    session_table_name,
+    session_ttl_seconds,
+    session_max_bytes,
+)
+
+# Content blocks that hold raw bytes, replaced with a short note when persisted
+BINARY_BLOCK_TYPES = ["image", "document", "video"]
+
+# Saved result of a tool call the deadline skipped, in place of that request's wrap up instruction
+SKIPPED_TOOL_RESULT = "[Tool call skipped, the request ran out of time]"
+
+
+class SQLiteSessionStore:
+    """Sessions in a local SQLite file, shared by requests served by the same container"""
+
+    def __init__(self, path=session_sqlite_path):
+        self.path = path
+        self.lock = threading.Lock()
+        with self.lock, sqlite3.connect(self.path) as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (thread_key TEXT PRIMARY KEY, last_ts TEXT, messages TEXT, expires_at REAL)"
+            )
+
+    def get(self, thread_key):
+        with self.lock, sqlite3.connect(self.path) as connection:
+            row = connection.execute(
+                "SELECT last_ts, messages FROM sessions WHERE thread_key = ? AND expires_at > ?",
+                (thread_key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"last_ts": row[0], "messages": json.loads(row[1])}
+
+    def put(self, thread_key, last_ts, messages_json):
+        with self.lock, sqlite3.connect(self.path) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                (thread_key, last_ts, messages_json, time.time() + session_ttl_seconds),
+            )
+            # Expired sessions are cleaned up as new ones are written
+            connection.execute(
+                "DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)
+            )
+
+
+class DynamoDBSessionStore:
+    """Sessions in a DynamoDB table, shared by every container
+
+    The table needs a string partition key named thread_key, and TTL enabled on expires_at
+    """
+
+    def __init__(self, table_name=session_table_name, client=None):
+        self.table_name = table_name
+        self.client = client or boto3.client("dynamodb")
+
+    def get(self, thread_key):
+        item = self.client.get_item(
+            TableName=self.table_name,
+            Key={"thread_key": {"S": thread_key}},
+            ConsistentRead=True,
+        ).get("Item")
+        # DynamoDB removes expired items lazily, so check the TTL here too
+        if item is None or float(item["expires_at"]["N"]) <= time.time():
+            return None
+        return {
+            "last_ts": item["last_ts"]["S"],
+            "messages": json.loads(item["messages"]["S"]),
+        }
+
+    def put(self, thread_key, last_ts, messages_json):
+        self.client.put_item(
+            TableName=self.table_name,
+            Item={
+                "thread_key": {"S": thread_key},
+                "last_ts": {"S": last_ts},
+                "messages": {"S": messages_json},
+                "expires_at": {"N": str(int(time.time() + session_ttl_seconds))},
+            },
+        )
+
+
+# Stores by SESSION_STORE name
+SESSION_STORES = {"sqlite": SQLiteSessionStore, "dynamodb": DynamoDBSessionStore}
+session_store = None
+session_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Get the configured session store, or None if sessions are turned off"""
+    global session_store
+    if session_store_type not in SESSION_STORES:
+        return None
+    with session_store_lock:
+        if session_store is None:
+            session_store = SESSION_STORES[session_store_type]()
+        return session_store
+
+
+def thread_session_key(channel_id, thread_ts):
+    return f"{channel_id}:{thread_ts}"
+
+
+def persistable_content(content):
+    """Copy content blocks, dropping reasoning and replacing raw bytes with a note
+
+    Overflow from the tool result budget belongs to the request that spilled it, so notes offering to read it are
+    reworded to say the output was truncated. The deadline's wrap up instruction only applied to the request that
+    sent it, so it's dropped
+    """
+    # Imported here, the agent stack is already loaded by the time a session is saved
+    from worker_tool_budget import expire_overflow_references
+    from worker_deadline_hook import WRAP_UP_MESSAGE
+
+    blocks = []
+    for block in content:
+        # Thinking from earlier turns isn't needed again, and redacted thinking is raw bytes
+        if "reasoningContent" in block:
+            continue
+        binary_type = next((key for key in BINARY_BLOCK_TYPES if key in block), None)
+        if binary_type is not None:
+            blocks.append({"text": f"[{binary_type} omitted from the saved session]"})
+        elif "toolResult" in block:
+            tool_result = dict(block["toolResult"])
+            tool_result["content"] = persistable_content(tool_result.get("content", []))
+            # Tool calls skipped at the deadline have only the wrap up instruction as their result
+            if not tool_result["content"]:
+                tool_result["content"] = [{"text": SKIPPED_TOOL_RESULT}]
+            blocks.append({"toolResult": tool_result})
+        elif block.get("text") == WRAP_UP_MESSAGE:
+            continue
+        elif "text" in block:
+            blocks.append({**block, "text": expire_overflow_references(block["text"])})
+        else:
+            blocks.append(block)
+    return blocks
+
+
+def starts_turn(message):
+    """True for a user message that isn't a tool result, where a saved history can safely start"""
+    return message["role"] == "user" and not any(
+        "toolResult" in block for block in message["content"]
+    )
+
+
+def trim_session_messages(messages):
+    """Drop the oldest turns until the history fits the size limit. Returns (messages, messages_json)"""
+    messages = [
+        {"role": message["role"], "content": persistable_content(message["content"])}
+        for message in messages
+    ]
+    messages = [message for message in messages if message["content"]]
+
+    while messages:
+        messages_json = json.dumps(messages, separators=(",", ":"), default=str)
+        if len(messages_json.encode()) <= session_max_bytes:
+            return messages, messages_json
+
+        # Drop up to the next user turn, so tool use and tool result blocks stay paired
+        next_turn = next(
+            (
+                index
+                for index, message in enumerate(messages)
+                if index > 0 and starts_turn(message)
+            ),
+            len(messages),
+        )
+        messages = messages[next_turn:]
+
+    return [], "[]"
+
+
+def load_thread_session(channel_id, thread_ts):
+    """Load the saved session for a thread, or None"""
+    store = get_session_store()
+    if store is None:
+        return None
+    try:
+        session = store.get(thread_session_key(channel_id, thread_ts))
+    except Exception as error:
+        # The conversation can always be rebuilt from Slack
+        print(f"🚀 Error loading agent session: {error}")
+        return None
+
+    if session is not None:
+        print(
+            f"🚀 Loaded agent session with {len(session['messages'])} messages for thread {thread_ts}"
+        )
+    return session
+
+
+def save_thread_session(channel_id, thread_ts, last_ts, messages):
+    """Save the agent's message history for a thread, last_ts is the Slack message it answered"""
+    store = get_session_store()
+    if store is None:
+        return
+
+    messages, messages_json = trim_session_messages(messages)
+    if not messages:
+        print("🚀 Agent session too large to save, follow-ups will start from Slack")
+        return
+
+    try:
+        store.put(thread_session_key(channel_id, thread_ts), last_ts, messages_json)
+    except Exception as error:
+        print(f"🚀 Error saving agent session: {error}")
+        return
+
+    # Debug
+    if debug_enabled == "True":
+        print(
+            f"🚀 Saved agent session with {len(messages)} messages, {len(messages_json)} bytes"
+        )
+
+
+def continue_thread_session(session, new_messages):
+    """Build the agent conversation from a saved session and the thread messages posted since
+
+    The bot's own answer is already the last message in the session, so it isn't added again from Slack
+    """
+    while new_messages and new_messages[0]["role"] == "assistant":
+        new_messages = new_messages[1:]
+    return session["messages"] + new_messages
@@ -1,52 +1,191 @@
 # Slack related functions
 import os
+import re
 import requests
 from slack_bolt import App
-from worker_inputs import debug_enabled
+from worker_inputs import debug_enabled, slack_message_size_limit_chars
+from worker_slack_scheduler import slack_scheduler
+
+# Slack mrkdwn code block fence
+CODE_FENCE = "```"
+
+# Words, whitespace, and links like <https://example.com|Example page> that may contain spaces but must stay whole
+LINE_TOKEN_PATTERN = re.compile(r"\S*<[^>]*>\S*|\S+|\s+")
+
+
+def split_long_line(line, limit):
+    """Split a single line at spaces, never inside a link"""
+    pieces = []
+    piece = ""
+    for token in LINE_TOKEN_PATTERN.findall(line):
+        if len(piece) + len(token) > limit and piece.strip():
+            pieces.append(piece.rstrip())
+            piece = token.lstrip()
+        else:
+            piece += token
+
+        # A single word or link longer than the limit has to be cut
+        while len(piece) > limit:
+            pieces.append(piece[:limit])
+            piece = piece[limit:]
+
+    if piece.strip():
+        pieces.append(piece.rstrip())
+    return pieces
+
+
+def split_code_block(lines, limit):
+    """Split a code block into pieces that each fit the limit, closing and reopening the fence between them"""
+    code_block = "\n".join(lines)
+    if len(code_block) <= limit:
+        return [code_block]
+
+    # Leave room for the fences added between pieces
+    budget = limit - 2 * (len(CODE_FENCE) + 1)
+    pieces = []
+    piece = []
+    for line in lines:
+        for part in [line[i : i + budget] for i in range(0, max(len(line), 1), budget)]:
+            if piece and len("\n".join(piece + [part])) > budget:
+                pieces.append(piece)
+                piece = []
+            piece.append(part)
+    pieces.append(piece)
+
+    split_blocks = []
+    for index, piece in enumerate(pieces):
+        split_block = "\n".join(piece)
+        if index > 0:
+            split_block = f"{CODE_FENCE}\n{split_block}"
+        if index < len(pieces) - 1:
+            split_block = f"{split_block}\n{CODE_FENCE}"
+        split_blocks.append(split_block)
+    return split_blocks
+
+
+def build_message_atoms(text, limit):
+    """Break text into pieces that must never be split: single lines, and whole code blocks where they fit"""
+    atoms = []
+    code_lines = None
+    for line in text.split("\n"):
+        # An odd number of fences on a line opens or closes a code block
+        toggles_code_block = line.count(CODE_FENCE) % 2 == 1
+
+        if code_lines is not None:
+            code_lines.append(line)
+            if toggles_code_block:
+                atoms.extend(split_code_block(code_lines, limit))
+                code_lines = None
+        elif toggles_code_block:
+            code_lines = [line]
+        else:
+            atoms.extend(split_long_line(line, limit) or [""])
+
+    # Close a code block the model never closed
+    if code_lines is not None:
+        atoms.extend(split_code_block(code_lines + [CODE_FENCE], limit))
+    return atoms
+
+
+def split_slack_message(text, limit=slack_message_size_limit_chars):
+    """Split an answer of any length into mrkdwn-safe chunks that each fit in one Slack message
+
+    Chunks break at paragraph breaks where possible, otherwise between lines, so code blocks,
+    links and bullets are never cut in half. The same text always splits the same way
+    """
+    text = text.strip()
+    if len(text) <= limit:
+        return [text]
+
+    chunks = []
+    current = []
+    for atom in build_message_atoms(text, limit):
+        if current and len("\n".join(current + [atom])) > limit:
+            # Prefer breaking at the last blank line, as long as that doesn't leave the chunk less than half full
+            blank_lines = [index for index, line in enumerate(current) if line == ""]
+            if blank_lines and len("\n".join(current[: blank_lines[-1]])) >= limit // 2:
+                chunks.append("\n".join(current[: blank_lines[-1]]))
+                current = current[blank_lines[-1] + 1 :]
+            else:
+                chunks.append("\n".join(current))
+                current = []
+
+            # The rest of the paragraph may still not leave room for the next atom
+            if current and len("\n".join(current + [atom])) > limit:
+                chunks.append("\n".join(current))
+                current = []
+        current.append(atom)
+    chunks.append("\n".join(current))
+
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
 
 
 def update_slack_response(say, client, message_ts, channel_id, thread_ts, message_text):
-    # If message_ts is None, we're posting a new message
-    if message_ts is None:
-        slack_response = say(
-            text=message_text,
-            thread_ts=thread_ts,
-        )
-        # Set message_ts
-        message_ts = slack_response["ts"]
-    else:
-        # We're updating an existing message
-        slack_response = client.chat_update(
-            text=message_text,
-            channel=channel_id,
-            ts=message_ts,
-        )
-
-        # Debug
-        if debug_enabled == "True":
-            print("🚀 Slack chat update response:", slack_response)
-
-    # Check to see if the response was successful
-    # Sucessful response: {'ok': True, 'channel': 'D088U5DEXGW', 'ts': '1748898172.661379', 'text': "Hi Kyler! :wa
-    if not slack_response.get("ok"):
-        error_type = slack_response.get("error")
-        print(f"🚀 Error updating Slack message: {error_type}")
-
-        # Message the user that there was an error
-        say(
-            text=f"🚨 There was an error updating your message: {error_type}\n\nPlease ask your question again",
-            thread_ts=thread_ts,
-        )
-
-    # Return the message_ts
-    return message_ts
+    # Answers over the Slack message size are posted as consecutive messages in the thread
+    message_chunks = split_slack_message(message_text)
+    if len(message_chunks) > 1:
+        print(f"🚀 Splitting Slack response into {len(message_chunks)} messages")
+
+    first_message_ts = None
+    for message_chunk in message_chunks:
+        # If message_ts is None, we're posting a new message
+        if message_ts is None:
+            slack_response = slack_scheduler.call(
+                "chat.postMessage",
+                lambda: say(
+                    text=message_chunk,
+                    thread_ts=thread_ts,
+                ),
+                channel_id,
+            )
+        else:
+            # We're updating an existing message, only the latest text is sent if updates queue up
+            slack_response = slack_scheduler.chat_update(
+                client, channel_id, message_ts, message_chunk
+            )
+
+            # Debug
+            if debug_enabled == "True":
+                print("🚀 Slack chat update response:", slack_response)
+
+        # Remember the first message, following chunks are always new messages
+        if first_message_ts is None:
+            first_message_ts = message_ts or slack_response.get("ts")
+
+        # Check to see if the response was successful
+        # Sucessful response: {'ok': True, 'channel': 'D088U5DEXGW', 'ts': '1748898172.661379', 'text': "Hi Kyler! :wa
+        if not slack_response.get("ok"):
+            error_type = slack_response.get("error")
+            print(f"🚀 Error updating Slack message: {error_type}")
+
+            # Message the user that there was an error
+            slack_scheduler.call(
+                "chat.postMessage",
+                lambda: say(
+                    text=f"🚨 There was an error updating your message: {error_type}\n\nPlease ask your question again",
+                    thread_ts=thread_ts,
+                ),
+                channel_id,
+            )
+            break
+
+        message_ts = None
+
+    # Return the message_ts of the first message
+    return first_message_ts
 
 
 def delete_slack_response(client, channel_id, message_ts):
+    # Updates still waiting for this message don't need to be sent
+    slack_scheduler.forget_message(channel_id, message_ts)
+
     # Delete the message using the Slack API
-    slack_response = client.chat_delete(
-        channel=channel_id,
-        ts=message_ts,
+    slack_response = slack_scheduler.call(
+        "chat.delete",
+        lambda: client.chat_delete(
+            channel=channel_id,
+            ts=message_ts,
+        ),
     )
 
     # Debug
@@ -63,16 +202,22 @@ def delete_slack_response(client, channel_id, message_ts):
     return True
 
 
-def register_slack_app(token, signing_secret):
+def register_slack_app(token, signing_secret, request_verification_enabled=True):
     app = App(
         process_before_response=True,  # Required for AWS Lambda
         token=token,
         signing_secret=signing_secret,
+        # Off only for queued events, which are verified against when they were queued
+        request_verification_enabled=request_verification_enabled,
     )
 
     # Find the bot name
-    bot_info = requests.get(
-        "https://slack.com/api/auth.test", headers={"Authorization": f"Bearer {token}"}
+    bot_info = slack_scheduler.call(
+        "auth.test",
+        lambda: requests.get(
+            "https://slack.com/api/auth.test",
+            headers={"Authorization": f"Bearer {token}"},
+        ),
     )
 
     bot_info_json = bot_info.json()
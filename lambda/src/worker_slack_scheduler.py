@@ -0,0 +1,174 @@
+# Slack API call scheduler
+# Slack rate limits each Web API method by tier, per workspace, and answers calls over the limit with a 429 and
+# Retry-After. Under load the status message updates were the first thing to break
+# Every Slack call goes through the scheduler, which spaces calls per method to stay within its tier, waits out
+# Retry-After and retries, and coalesces chat.update calls so only the latest text for a message is sent
+# Lives at module level so every conversation in the process shares the same limits
+import threading
+import time
+from slack_sdk.errors import SlackApiError
+from worker_inputs import debug_enabled, slack_max_retries
+
+# Calls per minute, and the burst allowed on top, for each method. Tiers from https://api.slack.com/apis/rate-limits
+SLACK_METHOD_LIMITS = {
+    "auth.test": (100, 10),  # Special, treated as Tier 4
+    "users.info": (100, 10),  # Tier 4
+    "conversations.replies": (50, 5),  # Tier 3
+    "chat.update": (50, 5),  # Tier 3
+    "chat.delete": (50, 5),  # Tier 3
+    "chat.postMessage": (60, 3),  # Special, about one message per second per channel
+}
+
+# Methods without a listed limit are treated as Tier 2
+DEFAULT_SLACK_METHOD_LIMIT = (20, 2)
+
+# Methods limited per channel rather than per workspace
+PER_CHANNEL_METHODS = ["chat.postMessage"]
+
+
+class SlackMethodBucket:
+    """Token bucket for one Slack method, calls beyond the burst are spaced out at the method's rate"""
+
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        # Set from Retry-After, no calls go out before this
+        self.blocked_until = 0.0
+
+    def reserve(self):
+        """Reserve the next call, returns the seconds to wait before making it"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        # Tokens go negative as calls queue up, each waits for its own token to refill
+        self.tokens -= 1
+        wait_seconds = max(0.0, -self.tokens / self.rate)
+        return max(wait_seconds, self.blocked_until - now)
+
+    def block(self, retry_after_seconds):
+        """Hold every call to this method until Retry-After has passed"""
+        self.blocked_until = max(
+            self.blocked_until, time.monotonic() + retry_after_seconds
+        )
+        self.tokens = min(self.tokens, 0.0)
+
+
+def get_retry_after(result):
+    """Seconds to wait from a rate limited response or SlackApiError, or None if the call wasn't rate limited"""
+    response = result.response if isinstance(result, SlackApiError) else result
+    if getattr(response, "status_code", None) != 429:
+        return None
+    headers = {key.lower(): value for key, value in response.headers.items()}
+    value = headers.get("retry-after", "1")
+    return float(value[0] if isinstance(value, list) else value)
+
+
+class SlackScheduler:
+    """Schedules Slack API calls within each method's rate limit"""
+
+    def __init__(self, max_retries=slack_max_retries):
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        # Bucket key -> SlackMethodBucket
+        self.buckets = {}
+        # (channel, ts) -> latest text waiting to be sent by chat.update
+        self.pending_updates = {}
+        # (channel, ts) of messages with an update in progress
+        self.updating = set()
+
+    def reserve(self, method, channel=None):
+        """Reserve a call to a method, returns the seconds to wait before making it"""
+        bucket_key = f"{method}:{channel}" if method in PER_CHANNEL_METHODS else method
+        with self.lock:
+            if bucket_key not in self.buckets:
+                self.buckets[bucket_key] = SlackMethodBucket(
+                    *SLACK_METHOD_LIMITS.get(method, DEFAULT_SLACK_METHOD_LIMIT)
+                )
+            return self.buckets[bucket_key].reserve()
+
+    def block(self, method, channel, retry_after_seconds):
+        bucket_key = f"{method}:{channel}" if method in PER_CHANNEL_METHODS else method
+        with self.lock:
+            self.buckets[bucket_key].block(retry_after_seconds)
+
+    def wait_turn(self, method, channel=None):
+        wait_seconds = self.reserve(method, channel)
+        if wait_seconds > 0:
+            if debug_enabled == "True":
+                print(f"🚀 Slack {method} queued for {wait_seconds:.1f}s")
+            time.sleep(wait_seconds)
+
+    def call(self, method, send, channel=None):
+        """Make a Slack call in its turn, retrying after Retry-After when rate limited
+
+        send makes the call, with a Slack SDK client or requests, and returns the response
+        """
+        for attempt in range(self.max_retries + 1):
+            self.wait_turn(method, channel)
+            try:
+                response = send()
+                retry_after = get_retry_after(response)
+                error = None
+            except SlackApiError as api_error:
+                retry_after = get_retry_after(api_error)
+                error = api_error
+                if retry_after is None:
+                    raise
+
+            if retry_after is None:
+                return response
+
+            print(f"🚀 Slack {method} rate limited, retrying after {retry_after:.0f}s")
+            self.block(method, channel, retry_after)
+
+        # Out of retries, hand back the rate limited result
+        if error is not None:
+            raise error
+        return response
+
+    def chat_update(self, client, channel, ts, text):
+        """Update a message, one update per message at a time and only the latest text is sent"""
+        key = (channel, ts)
+        with self.lock:
+            self.pending_updates[key] = text
+            # Another caller is already updating this message, it sends this text once its current update is done
+            if key in self.updating:
+                if debug_enabled == "True":
+                    print(f"🚀 Coalesced Slack chat.update for message {ts}")
+                return {"ok": True, "channel": channel, "ts": ts}
+            self.updating.add(key)
+
+        latest_text = [None]
+
+        def send_latest():
+            # Pick up text that arrived while this update waited its turn, or a rate limited retry
+            with self.lock:
+                latest_text[0] = self.pending_updates.pop(key, latest_text[0])
+            return client.chat_update(channel=channel, ts=ts, text=latest_text[0])
+
+        response = {"ok": True, "channel": channel, "ts": ts}
+        try:
+            while True:
+                with self.lock:
+                    # Nothing newer to send, or the message was deleted while the update waited
+                    if key not in self.pending_updates:
+                        self.updating.discard(key)
+                        return response
+                response = self.call("chat.update", send_latest)
+        except Exception:
+            # Don't leave this message marked as updating, or later updates would never be sent
+            with self.lock:
+                self.updating.discard(key)
+                self.pending_updates.pop(key, None)
+            raise
+
+    def forget_message(self, channel, ts):
+        """Drop pending updates to a message that's being deleted"""
+        with self.lock:
+            self.pending_updates.pop((channel, ts), None)
+
+
+# Shared by every conversation in the process
+slack_scheduler = SlackScheduler()
@@ -0,0 +1,269 @@
+# Tool result budget functions
+# MCP tools can return huge JSON payloads (1000 PagerDuty incidents, GitHub search results, etc.)
+# Everything a tool returns is re-sent to the model on every later turn, so we compact results
+# and spill anything over the per-call budget into an overflow store the agent can page through
+import json
+import re
+import uuid
+from strands import tool
+from strands.hooks import HookProvider, HookRegistry, AfterToolCallEvent
+from worker_inputs import (
+    debug_enabled,
+    tool_result_token_budget,
+    tool_result_chars_per_token,
+)
+
+# Name of the follow-up tool the agent uses to read spilled overflow
+OVERFLOW_TOOL_NAME = "retrieve_tool_overflow"
+
+# Characters held back from the budget for the truncation note
+NOTE_RESERVE_CHARS = 400
+
+# Overflow reads offered by truncation notes and by the overflow tool, only valid in the request that spilled them
+OVERFLOW_READ = re.compile(
+    rf"can be read with {OVERFLOW_TOOL_NAME}\(overflow_id='\w+', offset=\d+\)"
+)
+OVERFLOW_CONTINUE = re.compile(
+    rf"Continue with {OVERFLOW_TOOL_NAME}\(overflow_id='\w+', offset=\d+\)"
+)
+
+
+def expire_overflow_references(text):
+    """Reword overflow reads in a tool result for a later request, where the overflow store no longer exists"""
+    text = OVERFLOW_READ.sub(
+        "aren't available any more, call the original tool again if they're needed",
+        text,
+    )
+    return OVERFLOW_CONTINUE.sub(
+        "The rest isn't available any more, call the original tool again if it's needed",
+        text,
+    )
+
+
+def prune_empty_fields(value):
+    """Recursively drop null and empty fields from decoded JSON"""
+    if isinstance(value, dict):
+        pruned = {}
+        for key, item in value.items():
+            item = prune_empty_fields(item)
+            # Drop null, empty string, empty list and empty dict fields
+            if item is None or item == "" or item == [] or item == {}:
+                continue
+            pruned[key] = item
+        return pruned
+    if isinstance(value, list):
+        return [prune_empty_fields(item) for item in value]
+    return value
+
+
+def minify_json(value):
+    """Serialize a value as compact JSON"""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def compact_tool_text(text):
+    """Minify JSON text and drop empty fields, leave any other text as-is"""
+    try:
+        value = json.loads(text)
+    except (ValueError, TypeError):
+        return text.strip()
+    return minify_json(prune_empty_fields(value))
+
+
+def find_record_list(value):
+    """Find the list of records in a JSON tool result, return (container_key, records) or (None, None)
+
+    Top level lists are returned directly. For objects, the largest list-valued field is used,
+    which covers wrappers like PagerDuty's {"response": [...], "response_summary": "..."}
+    """
+    if isinstance(value, list):
+        return None, value
+    if isinstance(value, dict):
+        candidates = [
+            (key, item) for key, item in value.items() if isinstance(item, list)
+        ]
+        if candidates:
+            return max(candidates, key=lambda candidate: len(minify_json(candidate[1])))
+    return None, None
+
+
+def truncate_records(text, budget_chars):
+    """Keep as many whole JSON records as fit in the budget
+
+    Returns (kept_text, omitted_text, kept_count, total_count), or None if the text isn't a JSON record list
+    """
+    try:
+        value = json.loads(text)
+    except (ValueError, TypeError):
+        return None
+
+    container_key, records = find_record_list(value)
+    if not records:
+        return None
+
+    # Measure the result without any records, so the wrapper fields are always kept
+    if container_key is None:
+        shell = []
+    else:
+        shell = dict(value)
+        shell[container_key] = []
+    used_chars = len(minify_json(shell))
+
+    # Keep records until the budget is spent
+    kept = []
+    for record in records:
+        record_chars = len(minify_json(record)) + 1
+        if used_chars + record_chars > budget_chars:
+            break
+        kept.append(record)
+        used_chars += record_chars
+
+    # Nothing fit, fall back to plain text truncation
+    if not kept:
+        return None
+
+    if container_key is None:
+        kept_value = kept
+    else:
+        kept_value = dict(value)
+        kept_value[container_key] = kept
+
+    # Omitted records are stored one per line so they can be paged through
+    omitted_text = "\n".join(minify_json(record) for record in records[len(kept) :])
+
+    return minify_json(kept_value), omitted_text, len(kept), len(records)
+
+
+class ToolResultBudget(HookProvider):
+    """Compacts MCP tool results and enforces a per-call token budget
+
+    Results over budget are truncated, and the omitted part is kept in a per-request overflow
+    store that the agent can read with the retrieve_tool_overflow tool
+    """
+
+    def __init__(self, tool_prefixes, token_budget=tool_result_token_budget):
+        # Only results from tools with these name prefixes are budgeted, e.g. ("github_", "pagerduty_")
+        self.tool_prefixes = tuple(tool_prefixes)
+        self.budget_chars = token_budget * tool_result_chars_per_token
+        self.overflow = {}
+        self.overflow_tool = self.build_overflow_tool()
+
+    def register_hooks(self, registry: HookRegistry, **kwargs) -> None:
+        registry.add_callback(AfterToolCallEvent, self.budget_tool_result)
+
+    def budget_tool_result(self, event: AfterToolCallEvent) -> None:
+        tool_name = event.tool_use["name"]
+
+        # Only budget MCP tools
+        if not tool_name.startswith(self.tool_prefixes):
+            return
+
+        original_result = event.result
+        event.result = self.apply_budget(tool_name, original_result)
+
+        # Debug
+        if debug_enabled == "True":
+            original_chars = sum(
+                len(block.get("text", "")) for block in original_result["content"]
+            )
+            budgeted_chars = sum(
+                len(block.get("text", "")) for block in event.result["content"]
+            )
+            print(
+                f"🚀 Tool result budget for {tool_name}: {original_chars} -> {budgeted_chars} chars"
+            )
+
+    def apply_budget(self, tool_name, result):
+        """Compact a tool result and truncate it to the budget"""
+
+        # Compact text blocks, and convert JSON blocks to compact text. Images and documents are left alone
+        text_blocks = []
+        other_blocks = []
+        for block in result.get("content", []):
+            if "text" in block:
+                text_blocks.append(compact_tool_text(block["text"]))
+            elif "json" in block:
+                text_blocks.append(minify_json(prune_empty_fields(block["json"])))
+            else:
+                other_blocks.append(block)
+
+        # Structured content duplicates the text content and is never sent to the model
+        budgeted_result = {
+            key: value
+            for key, value in result.items()
+            if key not in ("content", "structuredContent")
+        }
+
+        # Within budget, return the compacted result
+        total_chars = sum(len(text) for text in text_blocks)
+        if total_chars <= self.budget_chars:
+            budgeted_result["content"] = other_blocks + [
+                {"text": text} for text in text_blocks
+            ]
+            return budgeted_result
+
+        # Over budget, spill the overflow and add a note about what was omitted
+        overflow_id = uuid.uuid4().hex[:8]
+        keep_chars = self.budget_chars - NOTE_RESERVE_CHARS
+        full_text = "\n".join(text_blocks)
+
+        truncated = truncate_records(full_text, keep_chars)
+        if truncated is not None:
+            kept_text, omitted_text, kept_count, total_count = truncated
+            note = (
+                f"[Truncated: showing {kept_count} of {total_count} records to save context. "
+                f"The other {total_count - kept_count} records (~{len(omitted_text) // tool_result_chars_per_token} tokens) "
+                f"can be read with {OVERFLOW_TOOL_NAME}(overflow_id='{overflow_id}', offset=0). "
+                f"Prefer a narrower query if you need specific records.]"
+            )
+        else:
+            kept_text = full_text[:keep_chars]
+            omitted_text = full_text[keep_chars:]
+            note = (
+                f"[Truncated: showing the first {keep_chars} of {total_chars} characters to save context. "
+                f"The rest (~{len(omitted_text) // tool_result_chars_per_token} tokens) "
+                f"can be read with {OVERFLOW_TOOL_NAME}(overflow_id='{overflow_id}', offset=0).]"
+            )
+
+        self.overflow[overflow_id] = omitted_text
+        print(
+            f"🚀 Tool result from {tool_name} over budget, spilled {len(omitted_text)} chars to overflow {overflow_id}"
+        )
+
+        budgeted_result["content"] = other_blocks + [
+            {"text": kept_text},
+            {"text": note},
+        ]
+        return budgeted_result
+
+    def build_overflow_tool(self):
+        """Build the follow-up tool that reads spilled overflow from this request"""
+        overflow = self.overflow
+        chunk_chars = self.budget_chars - NOTE_RESERVE_CHARS
+
+        @tool(name=OVERFLOW_TOOL_NAME)
+        def retrieve_tool_overflow(overflow_id: str, offset: int = 0) -> str:
+            """Read the part of a truncated tool result that was omitted to save context.
+
+            Only use this when a tool result says it was truncated and the omitted part is needed to answer.
+
+            Args:
+                overflow_id: The overflow ID given in the truncation note
+                offset: Character offset to read from, starting at 0. Use the next offset given in the previous read to continue.
+            """
+            if overflow_id not in overflow:
+                return f"No overflow found with ID {overflow_id}"
+
+            text = overflow[overflow_id]
+            chunk = text[offset : offset + chunk_chars]
+            next_offset = offset + len(chunk)
+
+            if next_offset >= len(text):
+                return chunk + "\n[End of overflow]"
+            return (
+                chunk
+                + f"\n[{len(text) - next_offset} characters remain. "
+                + f"Continue with {OVERFLOW_TOOL_NAME}(overflow_id='{overflow_id}', offset={next_offset})]"
+            )
+
+        return retrieve_tool_overflow
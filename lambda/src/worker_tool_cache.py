@@ -0,0 +1,151 @@
+# Read-only tool call cache
+# Lives at module level so it's shared across requests served by a warm container
+# During incidents many people ask the same thing, so the same read-only calls repeat constantly
+import copy
+import json
+import threading
+import time
+from strands.hooks import (
+    HookProvider,
+    HookRegistry,
+    BeforeToolCallEvent,
+    AfterToolCallEvent,
+)
+from strands.tools.tools import PythonAgentTool
+from worker_inputs import debug_enabled, tool_cache_max_entries, tool_cache_ttl_seconds
+
+# Cached results, key -> (expires_at, backend, result). Dicts keep insertion order, so the first key is the oldest
+tool_cache = {}
+tool_cache_lock = threading.Lock()
+
+# Hit and miss counts per backend
+tool_cache_stats = {}
+
+
+def canonical_tool_key(tool_name, tool_input):
+    """Build a cache key from the tool name and canonicalized arguments"""
+    arguments = json.dumps(
+        tool_input or {}, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return f"{tool_name}:{arguments}"
+
+
+def record_tool_cache_result(backend, hit):
+    """Count a cache hit or miss for a backend"""
+    with tool_cache_lock:
+        backend_stats = tool_cache_stats.setdefault(backend, {"hits": 0, "misses": 0})
+        backend_stats["hits" if hit else "misses"] += 1
+
+
+def get_tool_cache_stats():
+    """Return hit, miss and hit rate numbers per backend"""
+    with tool_cache_lock:
+        stats = {}
+        for backend, backend_stats in tool_cache_stats.items():
+            lookups = backend_stats["hits"] + backend_stats["misses"]
+            stats[backend] = {
+                "hits": backend_stats["hits"],
+                "misses": backend_stats["misses"],
+                "hit_rate": backend_stats["hits"] / lookups if lookups else 0.0,
+            }
+        return stats
+
+
+def get_cached_tool_result(key):
+    """Return a cached result if present and not expired"""
+    with tool_cache_lock:
+        entry = tool_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, backend, result = entry
+        if expires_at < time.time():
+            del tool_cache[key]
+            return None
+        return result
+
+
+def put_cached_tool_result(key, backend, result, ttl_seconds):
+    """Store a result, evicting the oldest entries past the size limit"""
+    with tool_cache_lock:
+        tool_cache.pop(key, None)
+        tool_cache[key] = (time.time() + ttl_seconds, backend, copy.deepcopy(result))
+        while len(tool_cache) > tool_cache_max_entries:
+            del tool_cache[next(iter(tool_cache))]
+
+
+def build_cached_tool(selected_tool, result):
+    """Build a stand-in tool that serves a cached result without touching the MCP session"""
+
+    def serve_cached_result(tool_use, **kwargs):
+        cached_result = copy.deepcopy(result)
+        cached_result["toolUseId"] = tool_use["toolUseId"]
+        return cached_result
+
+    return PythonAgentTool(
+        selected_tool.tool_name, selected_tool.tool_spec, serve_cached_result
+    )
+
+
+class ToolResultCache(HookProvider):
+    """Serves repeated read-only MCP tool calls from the cross-request cache"""
+
+    def __init__(self, read_only_prefixes):
+        # Backend name -> tuple of prefixed read-only tool names, e.g. {"GitHub": ("github_get_", ...)}
+        # Only tools that pass the backend's READ_ONLY_PREFIXES filter are ever cached
+        self.read_only_prefixes = {
+            backend: tuple(prefixes)
+            for backend, prefixes in read_only_prefixes.items()
+            if backend in tool_cache_ttl_seconds
+        }
+        # Tool use IDs that were served from the cache in this request
+        self.served_from_cache = set()
+        # Hit and miss counts per backend for this request only
+        self.request_stats = {}
+
+    def register_hooks(self, registry: HookRegistry, **kwargs) -> None:
+        registry.add_callback(BeforeToolCallEvent, self.serve_from_cache)
+        registry.add_callback(AfterToolCallEvent, self.store_in_cache)
+
+    def backend_for_tool(self, tool_name):
+        for backend, prefixes in self.read_only_prefixes.items():
+            if tool_name.startswith(prefixes):
+                return backend
+        return None
+
+    def serve_from_cache(self, event: BeforeToolCallEvent) -> None:
+        tool_name = event.tool_use["name"]
+        backend = self.backend_for_tool(tool_name)
+        if backend is None or event.selected_tool is None:
+            return
+
+        key = canonical_tool_key(tool_name, event.tool_use.get("input"))
+        result = get_cached_tool_result(key)
+        record_tool_cache_result(backend, result is not None)
+        backend_stats = self.request_stats.setdefault(backend, {"hits": 0, "misses": 0})
+        backend_stats["hits" if result is not None else "misses"] += 1
+        if result is None:
+            return
+
+        print(f"🚀 Tool cache hit for {tool_name}")
+        if debug_enabled == "True":
+            print("🚀 Tool cache key:", key)
+
+        self.served_from_cache.add(event.tool_use["toolUseId"])
+        event.selected_tool = build_cached_tool(event.selected_tool, result)
+
+    def store_in_cache(self, event: AfterToolCallEvent) -> None:
+        tool_name = event.tool_use["name"]
+        backend = self.backend_for_tool(tool_name)
+        if backend is None:
+            return
+
+        # Don't re-store cached results, and never cache errors
+        if event.tool_use["toolUseId"] in self.served_from_cache:
+            return
+        if event.exception is not None or event.result.get("status") != "success":
+            return
+
+        key = canonical_tool_key(tool_name, event.tool_use.get("input"))
+        put_cached_tool_result(
+            key, backend, event.result, tool_cache_ttl_seconds[backend]
+        )
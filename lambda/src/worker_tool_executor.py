@@ -0,0 +1,58 @@
+# Tool execution strategy for the agent
+# When the model asks for several tools in one turn (e.g. PagerDuty, GitHub and Jira together),
+# run them concurrently across the open MCP clients instead of paying the sum of every backend's latency
+import asyncio
+from strands.tools.executors import ConcurrentToolExecutor
+from worker_inputs import tool_max_concurrency_per_backend
+
+
+class BackendCappedToolExecutor(ConcurrentToolExecutor):
+    """Runs tool calls concurrently, capped per MCP backend, and returns results in the original order"""
+
+    def __init__(
+        self,
+        tool_prefixes,
+        max_concurrency_per_backend=tool_max_concurrency_per_backend,
+    ):
+        # Backend name -> tool name prefix, e.g. {"GitHub": "github_"}
+        self.tool_prefixes = tool_prefixes
+        self.max_concurrency_per_backend = max_concurrency_per_backend
+        self.semaphores = {}
+
+    def backend_for_tool(self, tool_name):
+        for backend, prefix in self.tool_prefixes.items():
+            if tool_name.startswith(prefix):
+                return backend
+        return None
+
+    async def _execute(self, agent, tool_uses, tool_results, *args, **kwargs):
+        # Semaphores are bound to the event loop, so build them fresh for each turn
+        self.semaphores = {
+            backend: asyncio.Semaphore(self.max_concurrency_per_backend)
+            for backend in self.tool_prefixes
+        }
+
+        async for event in super()._execute(
+            agent, tool_uses, tool_results, *args, **kwargs
+        ):
+            yield event
+
+        # Results are appended as tools finish, put them back in the order the model asked for them
+        tool_use_order = {
+            tool_use["toolUseId"]: index for index, tool_use in enumerate(tool_uses)
+        }
+        tool_results.sort(
+            key=lambda result: tool_use_order.get(
+                result["toolUseId"], len(tool_use_order)
+            )
+        )
+
+    async def _task(self, agent, tool_use, *args, **kwargs):
+        backend = self.backend_for_tool(tool_use["name"])
+
+        # Built-in tools aren't capped
+        if backend is None:
+            return await super()._task(agent, tool_use, *args, **kwargs)
+
+        async with self.semaphores[backend]:
+            return await super()._task(agent, tool_use, *args, **kwargs)
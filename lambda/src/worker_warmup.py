@@ -0,0 +1,144 @@
+# INIT phase warmup for the worker Lambda
+# Setup that used to happen inside the handler, while the user waited, runs when the container starts instead:
+# importing the agent stack, fetching secrets, building pooled clients and preparing MCP working directories
+# INIT is limited to 10 seconds, so warmup runs in a background thread and INIT only waits for it up to a budget.
+# Steps still running carry on when the first request arrives, and the handler falls back to doing its own setup
+# Timings are emitted as their own init_* metric phases, separate from request metrics
+import json
+import threading
+import time
+from worker_inputs import (
+    bot_secret_name,
+    model_region_name,
+    bedrock_region,
+    enable_warmup,
+    enable_pagerduty_mcp,
+    enable_aws_cli_mcp,
+    enable_retrieve_cache,
+    warmup_budget_seconds,
+    warmup_start_mcp,
+    warmup_secret_max_age_seconds,
+)
+from worker_metrics import RequestMetrics
+
+# Secrets fetched during warmup, and when
+warm_secrets = {"secrets": None, "fetched_at": 0.0}
+
+
+def get_warm_secrets():
+    """Secrets fetched during warmup, or None once they're too old to reuse"""
+    if time.time() - warm_secrets["fetched_at"] > warmup_secret_max_age_seconds:
+        return None
+    return warm_secrets["secrets"]
+
+
+def import_agent_stack():
+    """Import Strands, MCP and the agent modules, the heaviest imports of a request"""
+    import worker_agent
+    from strands_tools import calculator, current_time, retrieve
+
+
+def fetch_secrets():
+    """Fetch the bot's secrets, reused by requests for warmup_secret_max_age_seconds"""
+    from worker_aws import get_secret_with_client
+
+    warm_secrets["secrets"] = get_secret_with_client(bot_secret_name, "us-east-1")
+    warm_secrets["fetched_at"] = time.time()
+
+
+def build_clients():
+    """Build the shared clients, so the first request doesn't pay for endpoint and credential resolution"""
+    from worker_bedrock import get_bedrock_client
+    from worker_session_store import get_session_store
+
+    get_bedrock_client(model_region_name)
+    get_bedrock_client(bedrock_region)
+    get_session_store()
+    if enable_retrieve_cache:
+        from worker_retrieve_cache import get_retrieve_client
+
+        get_retrieve_client(bedrock_region)
+
+
+def prepare_mcp_directories():
+    """Copy the stdio MCP servers' files into /tmp"""
+    if enable_pagerduty_mcp:
+        from worker_mcp_pagerduty import prepare_pagerduty_mcp_dir
+
+        prepare_pagerduty_mcp_dir()
+    if enable_aws_cli_mcp:
+        from worker_mcp_aws_cli import prepare_aws_cli_mcp_dirs
+
+        prepare_aws_cli_mcp_dirs()
+
+
+def start_mcp_clients():
+    """Start MCP clients and keep them open across invocations"""
+    from worker_agent import enable_warm_agent_tools, get_agent_tools
+    from worker_deadline import Deadline
+
+    secrets = get_warm_secrets()
+    if secrets is None:
+        return
+    enable_warm_agent_tools()
+    get_agent_tools(json.loads(secrets), Deadline.from_lambda_context(None))
+
+
+# Warmup steps, in order. Each one is optional, a failure is logged and the next step still runs
+WARMUP_STEPS = [
+    ("import", import_agent_stack),
+    ("secret_fetch", fetch_secrets),
+    ("clients", build_clients),
+    ("mcp_directories", prepare_mcp_directories),
+]
+if warmup_start_mcp:
+    WARMUP_STEPS.append(("mcp_startup", start_mcp_clients))
+
+
+def run_warmup_steps(metrics, progress):
+    for step, run_step in WARMUP_STEPS:
+        progress["step"] = step
+        try:
+            with metrics.timed(f"init_{step}"):
+                run_step()
+        except Exception as error:
+            print(f"🚀 Warmup step {step} failed: {error}")
+
+    with progress["lock"]:
+        progress["step"] = None
+        timed_out = progress["timed_out"]
+
+    # Steps that outlived the INIT budget are reported once they finish
+    if timed_out:
+        print("🚀 Warmup finished after INIT")
+        metrics.flush()
+
+
+def run_warmup():
+    """Run warmup in the background, waiting up to the warmup budget"""
+    if not enable_warmup:
+        return
+
+    print("🚀 Warmup starting")
+    metrics = RequestMetrics()
+    progress = {"step": "start", "timed_out": False, "lock": threading.Lock()}
+    started = time.perf_counter()
+    warmup_thread = threading.Thread(
+        target=run_warmup_steps, args=(metrics, progress), daemon=True
+    )
+    warmup_thread.start()
+    warmup_thread.join(timeout=warmup_budget_seconds)
+
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    metrics.put("init_warmup", "Duration", elapsed_ms)
+    with progress["lock"]:
+        step = progress["step"]
+        progress["timed_out"] = step is not None
+
+    if step is not None:
+        print(
+            f"🚀 Warmup budget of {warmup_budget_seconds:g}s used up during {step}, finishing in the background"
+        )
+    else:
+        print(f"🚀 Warmup finished in {elapsed_ms:.0f} ms")
+        metrics.flush()
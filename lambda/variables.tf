@@ -32,6 +32,21 @@ variable "bot_name" {
   description = "Name of the bot"
   type        = string
 }
+variable "dispatch_backend" {
+  description = "How the receiver hands events to the worker: lambda (direct async invoke) or sqs (FIFO queue with capped worker concurrency)"
+  type        = string
+  default     = "lambda"
+}
+variable "worker_consumer_concurrency" {
+  description = "Max concurrent workers consuming the SQS dispatch queue, only used when dispatch_backend is sqs"
+  type        = number
+  default     = 10
+}
+variable "bedrock_failover_targets" {
+  description = "Comma separated inference profiles to fail over to when the primary model is throttled, formatted model_id or model_id@region"
+  type        = string
+  default     = ""
+}
 
 # MCP
 variable "enable_pagerduty_mcp" {